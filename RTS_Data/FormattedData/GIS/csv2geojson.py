@@ -1,94 +1,117 @@
-import geojson, json, random
-import pandas as pd
+import argparse, geojson, json, os, random, sys
 import numpy as np
 from copy import deepcopy
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from rts_gmlc.source_data import read_table
 
-bus_df = pd.read_csv('../../SourceData/bus.csv')
-buses = list(bus_df.T.to_dict().values())
 
-bus_features = []
+def create_geojson(folder=None, output='../../FormattedData/GIS', d=0.1):
+    """
+    Write bus.geojson, branch.geojson, gen.geojson and gen_conn.geojson of
+    the SourceData in `folder` to the `output` folder. The generators are
+    placed at a random offset of up to `d` degrees from their bus.
+    """
 
-bus_table = {}
-gen_count = {}
+    bus_df = read_table('bus', folder)
+    buses = list(bus_df.T.to_dict().values())
 
-for x in buses:
-    bus_table[x['Bus ID']] = x
-    gen_count['Bus ID'] = 0
+    bus_features = []
 
-    xy = x['lng'], x['lat']
-    props = deepcopy(x)
-    props.pop('lng')
-    props.pop('lat')
-    geom = geojson.Point(xy)
-    f = geojson.Feature(geometry=geom, properties=props)
-    bus_features.append(f)
+    bus_table = {}
+    gen_count = {}
 
-bus_collect = geojson.FeatureCollection(features=bus_features)
+    for x in buses:
+        bus_table[x['Bus ID']] = x
+        gen_count['Bus ID'] = 0
 
-with open('../../FormattedData/GIS/bus.geojson', 'w') as io:
-    json.dump(bus_collect, io, indent=4)
+        xy = x['lng'], x['lat']
+        props = deepcopy(x)
+        props.pop('lng')
+        props.pop('lat')
+        geom = geojson.Point(xy)
+        f = geojson.Feature(geometry=geom, properties=props)
+        bus_features.append(f)
 
+    bus_collect = geojson.FeatureCollection(features=bus_features)
 
-##### Process branches #####
-branch_df = pd.read_csv('../../SourceData/branch.csv')
-branches = list(branch_df.T.to_dict().values())
+    with open(os.path.join(output, 'bus.geojson'), 'w') as io:
+        json.dump(bus_collect, io, indent=4)
 
-branch_features = []
 
-for x in branches:
-    bf = bus_table[x['From Bus']]
-    bt = bus_table[x['To Bus']]    
+    ##### Process branches #####
+    branch_df = read_table('branch', folder)
+    branches = list(branch_df.T.to_dict().values())
 
-    pf = bf['lng'], bf['lat']
-    pt = bt['lng'], bt['lat']
-    xy = pf, pt
+    branch_features = []
 
-    geom = geojson.LineString(xy)
-    f = geojson.Feature(geometry=geom, properties=x)
-    branch_features.append(f)
+    for x in branches:
+        bf = bus_table[x['From Bus']]
+        bt = bus_table[x['To Bus']]
 
-branch_collect = geojson.FeatureCollection(features=branch_features)
+        pf = bf['lng'], bf['lat']
+        pt = bt['lng'], bt['lat']
+        xy = pf, pt
 
-with open('../../FormattedData/GIS/branch.geojson', 'w') as io:
-    json.dump(branch_collect, io, indent=4)
+        geom = geojson.LineString(xy)
+        f = geojson.Feature(geometry=geom, properties=x)
+        branch_features.append(f)
 
+    branch_collect = geojson.FeatureCollection(features=branch_features)
 
+    with open(os.path.join(output, 'branch.geojson'), 'w') as io:
+        json.dump(branch_collect, io, indent=4)
 
 
-##### Process generators #####
-gen_df = pd.read_csv('../../SourceData/gen.csv')
-gens = list(gen_df.T.to_dict().values())
 
-gen_features = []
-gen_conn_features = []
-d = 0.1
 
-for x in gens:
-    b = bus_table[x['Bus ID']]
-    theta = random.uniform(-np.pi, np.pi)
-    A = random.uniform(0,d)
-    dx = A*np.cos(theta)
-    dy = A*np.sin(theta)
+    ##### Process generators #####
+    gen_df = read_table('gen', folder)
+    gens = list(gen_df.T.to_dict().values())
 
-    pg = b['lng'] + dx, b['lat'] + dy 
-    geom = geojson.Point(pg)
-    f = geojson.Feature(geometry=geom, properties=x)
-    gen_features.append(f)
+    gen_features = []
+    gen_conn_features = []
 
-    pb = b['lng'], b['lat'] 
-    xy = pb, pg
-    geom = geojson.LineString(xy)
-    f = geojson.Feature(geometry=geom, properties=x)
-    gen_conn_features.append(f)
+    for x in gens:
+        b = bus_table[x['Bus ID']]
+        theta = random.uniform(-np.pi, np.pi)
+        A = random.uniform(0,d)
+        dx = A*np.cos(theta)
+        dy = A*np.sin(theta)
 
-gen_collect = geojson.FeatureCollection(features=gen_features)
-gen_conn_collect = geojson.FeatureCollection(features=gen_conn_features)
+        pg = b['lng'] + dx, b['lat'] + dy
+        geom = geojson.Point(pg)
+        f = geojson.Feature(geometry=geom, properties=x)
+        gen_features.append(f)
 
-with open('../../FormattedData/GIS/gen.geojson', 'w') as io:
-    json.dump(gen_collect, io, indent=4)
+        pb = b['lng'], b['lat']
+        xy = pb, pg
+        geom = geojson.LineString(xy)
+        f = geojson.Feature(geometry=geom, properties=x)
+        gen_conn_features.append(f)
 
-with open('../../FormattedData/GIS/gen_conn.geojson', 'w') as io:
-    json.dump(gen_conn_collect, io, indent=4)
+    gen_collect = geojson.FeatureCollection(features=gen_features)
+    gen_conn_collect = geojson.FeatureCollection(features=gen_conn_features)
 
-# import ipdb; ipdb.set_trace()
\ No newline at end of file
+    with open(os.path.join(output, 'gen.geojson'), 'w') as io:
+        json.dump(gen_collect, io, indent=4)
+
+    with open(os.path.join(output, 'gen_conn.geojson'), 'w') as io:
+        json.dump(gen_conn_collect, io, indent=4)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-input_folder', type=str, default=None,
+        help='input folder with RTS-GMLC source data, ../../SourceData/ '
+        'of the cloned repository by default')
+    parser.add_argument('-output', type=str, default='../../FormattedData/GIS',
+        help='output folder of the geojson files')
+    parser.add_argument('-d', type=float, default=0.1,
+        help='largest random offset of the generators from their bus, in '
+        'degrees (0 keeps them at their bus)')
+    args = parser.parse_args()
+
+    create_geojson(args.input_folder, args.output, args.d)
+
+# import ipdb; ipdb.set_trace()
@@ -5,16 +5,19 @@ from script import *
 def create(**kwargs):
 
     folder = kwargs.pop('folder')
-    create_rts_MATPOWER_file(folder)
+    create_rts_MATPOWER_file(folder, **kwargs)
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Create RTS MATPOWER file.')
     parser.add_argument('--folder', dest='folder', default='../../SourceData',
                        help='source data folder path')
+    parser.add_argument('--output', dest='output', default='RTS_GMLC.m',
+                       help='output file path, gzip compressed if it ends with .gz')
+    parser.add_argument('--name', dest='name', default=None,
+                       help='MATLAB function name, the output file name by default')
 
     args = parser.parse_args()
 
     # todo : check if folder exists
-    create(folder = args.folder)
-
+    create(folder = args.folder, output = args.output, name = args.name)
@@ -1,278 +1,152 @@
 # coding: utf-8
 
+import gzip
 import os
-import pandas as pd
+import re
+import sys
 import numpy as np
 
 curr_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(curr_dir, '..'))
 
-DIGITS = 5
+from rts_gmlc.ppc import DIGITS, create_ppc
 
 
-def create_rts_MATPOWER_file(folder):
+def _lines(row, columns):
+    """
+    Format a whole matrix at once: `row` is the %-format of one line and
+    `columns` the values of each field, as numpy arrays or Series.
+    """
+    return list(map(row.__mod__, zip(*[c.tolist() for c in columns])))
 
-    _generators = pd.read_csv(os.path.join(folder, 'gen.csv'))
-    buses = pd.read_csv(os.path.join(folder, 'bus.csv'))
-    branchdata = pd.read_csv(os.path.join(folder, 'branch.csv'))
 
-    pivot_heat_rate = pd.DataFrame(
-        _generators[[
-            'Output_pct_0', 'Output_pct_1', 'Output_pct_2', 'Output_pct_3', 'HR_incr_1', 'HR_incr_2', 'HR_incr_3',
-            'HR_avg_0'
-        ]]
-    )
+def _block(row, columns):
+    return ''.join(_lines(row, columns))
 
-    def io(r):
-        segments = 1
-        x1 = np.linspace(r['Output_pct_0'], r['Output_pct_1'], segments + 1)
-        x2 = np.linspace(r['Output_pct_1'], r['Output_pct_2'], segments + 1)
-        x3 = np.linspace(r['Output_pct_2'], r['Output_pct_3'], segments + 1)
 
-        if r['HR_avg_0'] <= 3412:
-            r['HR_avg_0'] = 3412
+def create_rts_MATPOWER_file(folder, output='RTS_GMLC.m', name=None):
+    """
+    Write the MATPOWER case of the SourceData in `folder` to `output`, a path
+    (gzip compressed when it ends with '.gz') or an open text file. `name` is
+    the MATLAB function name, by default the file name without extension.
+    The numbers are those of the PyPower case of `rts_gmlc.ppc.create_ppc`.
+    """
 
-        y1 = (x1 - x1.min()) * r['HR_incr_1'] + r['HR_avg_0'] * x1.min()
-        y2 = (x2 - x2.min()) * r['HR_incr_2'] + y1.max()
-        y3 = (x3 - x3.min()) * r['HR_incr_3'] + y2.max()
+    ppc = create_ppc(folder)
 
-        return list(
-            zip(
-                list(np.concatenate([x1[:1], x1[-1:], x2[-1:], x3[-1:]])),
-                list(np.concatenate([y1[:1], y1[-1:], y2[-1:], y3[-1:]]))
-            )
-        )
+    if name is None:
+        name = 'RTS_GMLC'
+        if isinstance(output, str):
+            name = re.sub(r'\W', '_', os.path.basename(output).split('.')[0]) or name
 
-    pivot_heat_rate['io_cost'] = pivot_heat_rate.apply(io, axis=1)
-    _generators = pd.concat([_generators, pivot_heat_rate['io_cost']], axis=1)
-    #_generators.to_csv('_generators.csv')
+    if not isinstance(output, str):
+        _write_case(output, name, ppc)
+    elif output.endswith('.gz'):
+        with gzip.open(output, 'wt') as f:
+            _write_case(f, name, ppc)
+    else:
+        with open(output, 'w') as f:
+            _write_case(f, name, ppc)
 
-    NaN = pd.np.NaN
 
-    def s(string, padding=' '):
-        return '{:%^80}'.format(padding + string + padding)
-
-    def l(string, string_list):
-        string_list.append(string)
+def _write_case(f, name, ppc):
 
-    string_list = []
+    def s(string, padding=' '):
+        return '{:%^80}'.format(padding + string + padding) + '\n'
 
-    from functools import partial
-    l = partial(l, string_list=string_list)
+    f.write('function mpc = {}\n\n'.format(name))
 
-    l('function mpc = {}'.format('RTS_GMLC'))
-    l('')
+    f.write(s('RTS-GMLC Test Case'))
+    f.write(s('By: Clayton Barrows, Ali Ehlen, Matt O Connell,'))
+    f.write(s('Dheepak Krishnamurthy, Brendan McBennett, and Aaron Bloom'))
+    f.write(s('National Renewable Energy Lab, Golden CO'))
+    f.write(s('%', padding=''))
 
-    l(s('RTS-GMLC Test Case'))
-    l(s('By: Clayton Barrows, Ali Ehlen, Matt O Connell,'))
-    l(s('Dheepak Krishnamurthy, Brendan McBennett, and Aaron Bloom'))
-    l(s('National Renewable Energy Lab, Golden CO'))
-    l(s('%', padding=''))
+    f.write('''
+%% MATPOWER Case Format : Version 2
+mpc.version = '2';
 
-    l('')
-    l('%% MATPOWER Case Format : Version 2')
-    l("mpc.version = '2';")
-    l('')
-    l("%%-----  Power Flow Data  -----%%")
-    l("%% system MVA base")
-    l("mpc.baseMVA = 100.0;")
+%%-----  Power Flow Data  -----%%
+%% system MVA base
+mpc.baseMVA = {};
+'''.format(ppc['baseMVA']))
 
-    l(
-        '''
+    f.write('''
 %% area data
 % area refbus
 mpc.areas = [
-        1    101;
-        2    201;
-        3    301;
-            ];'''
-    )
+''')
+    f.write(_block('        %d    %d;\n', ppc['areas'].T))
+    f.write('            ];\n')
 
-    l('''
+    # %s prints floats as str(), e.g. 108.0, and %.5f the values that
+    # create_ppc rounds to five decimals
+    f.write('''
 %% bus data
 %	bus_i	type	Pd	Qd	Gs	Bs	area	Vm	Va	baseKV	zone	Vmax	Vmin
-mpc.bus = [''')
-
-    bus = dict()
-    for i, b in buses.iterrows():
-        bus['bus_i'] = b['Bus ID']
-        if b['Bus Type'] == 'PQ':
-            bus['type'] = 1
-        elif b['Bus Type'] == 'PV':
-            bus['type'] = 2
-        elif b['Bus Type'] == 'Ref':
-            bus['type'] = 3
-        else:
-            bus['type'] = 4
-        bus['Pd'] = b['MW Load']
-        bus['Qd'] = b['MVAR Load']
-        bus['Gs'] = b['MW Shunt G']
-        bus['Bs'] = b['MVAR Shunt B']
-        bus['area'] = b['Area']
-        bus['Vm'] = b['V Mag']
-        bus['Va'] = b['V Angle']
-        bus['baseKV'] = b['BaseKV']
-        bus['zone'] = int(b['Zone'])
-        bus['Vmax'] = 1.05  #default
-        bus['Vmin'] = 0.95  #default
-        bus["PRECISION"] = DIGITS
-        l(
-            '\t{bus_i}\t{type}\t{Pd}\t{Qd}\t{Gs}\t{Bs}\t{area}\t{Vm:.{PRECISION}f}\t{Va:.{PRECISION}f}\t{baseKV}\t{zone}\t{Vmax}\t{Vmin}'.
-            format(**bus)
-        )
-
-    l('];')
+mpc.bus = [
+''')
+    f.write(_block('\t%d\t%d\t%s\t%s\t%s\t%s\t%d\t%.{0}f\t%.{0}f\t%s\t%d\t%s\t%s\n'.format(DIGITS),
+        ppc['bus'].T))
+    f.write('];\n')
 
-    l(
-        '''
+    f.write('''
 %% generator data
 %	bus	Pg	Qg	Qmax	Qmin	Vg	mBase	status	Pmax	Pmin	Pc1	Pc2	Qc1min	Qc1max	Qc2min	Qc2max	ramp_agc	ramp_10	ramp_30	ramp_q	apf
-mpc.gen = ['''
-    )
-
-    gen = dict()
-
-    for i, g in _generators.iterrows():
-        gen['bus'] = g['Bus ID']
-        gen['Pg'] = g['MW Inj']
-        gen['Qg'] = g['MVAR Inj']
-        gen['Qmax'] = g['QMax MVAR']
-        gen['Qmin'] = g['QMin MVAR']
-        gen['Vg'] = g['V Setpoint p.u.']
-        gen['mBase'] = 100.0  #default
-        if g['Fuel'] in ['Wind', 'Solar', 'Storage']:
-            gen['status'] = 0
-        else:
-            gen['status'] = 1  #default
-        gen['Pmax'] = g['PMax MW']
-        gen['Pmin'] = g['PMin MW'] if not np.isnan(g['PMin MW']) else 0  #g['Output_pct_0'] * g['Unit Size']
-        gen['Pc1'] = 0.0  #default
-        gen['Pc2'] = 0.0  #default
-        gen['Qc1min'] = 0.0  #default
-        gen['Qc1max'] = 0.0  #default
-        gen['Qc2min'] = 0.0  #default
-        gen['Qc2max'] = 0.0  #default
-        gen['ramp_agc'] = g['Ramp Rate MW/Min']
-        gen['ramp_10'] = g['Ramp Rate MW/Min']
-        gen['ramp_30'] = g['Ramp Rate MW/Min']
-        gen['ramp_q'] = g['Ramp Rate MW/Min']
-        gen['apf'] = 0.0  #default
-        gen["PRECISION"] = DIGITS
-
-        l(
-            '	{bus}	{Pg}	{Qg}	{Qmax}	{Qmin}	{Vg:.{PRECISION}f}	{mBase}	{status}	{Pmax}	{Pmin}	{Pc1}	{Pc2}	{Qc1min}	{Qc1max}	{Qc2min}	{Qc2max}	{ramp_agc}	{ramp_10}	{ramp_30}	{ramp_q}	{apf}'.
-            format(**gen)
-        )
-
-    l('];')
+mpc.gen = [
+''')
+    f.write(_block('\t%d\t%s\t%s\t%s\t%s\t%.{0}f\t%s\t%d'.format(DIGITS) + '\t%s' * 13 + '\n',
+        ppc['gen'].T))
+    f.write('];\n')
 
-    l('''
+    f.write('''
 %% branch data
 %	fbus	tbus	r	x	b	rateA	rateB	rateC	ratio	angle	status	angmin	angmax
-mpc.branch = [''')
+mpc.branch = [
+''')
+    f.write(_block('\t%d\t%d\t%.{0}f\t%.{0}f\t%.{0}f\t%s\t%s\t%s\t%s\t%s\t%d\t%d\t%d\n'.format(DIGITS),
+        ppc['branch'].T))
+    f.write('];\n')
 
-    branch = dict()
-
-    for i, b in branchdata.iterrows():
-        branch['fbus'] = int(b['From Bus'])
-        branch['tbus'] = int(b['To Bus'])
-        branch['r'] = b['R']
-        branch['x'] = b['X']
-        branch['b'] = b['B']
-        branch['rateA'] = b['Cont Rating']
-        branch['rateB'] = b['Cont Rating']
-        branch['rateC'] = b['Cont Rating']
-        branch['ratio'] = b['Tr Ratio']
-        branch['angle'] = 0.0  #default
-        branch['status'] = 1  #default
-        branch['angmin'] = -180  #default
-        branch['angmax'] = 180  #default
-        branch['PRECISION'] = DIGITS
-
-        l(
-            '	{fbus}	{tbus}	{r:.{PRECISION}f}	{x:.{PRECISION}f}	{b:.{PRECISION}f}	{rateA}	{rateB}	{rateC}	{ratio}	{angle}	{status}	{angmin}	{angmax}'.
-            format(**branch)
-        )
-
-    l('];')
-
-    l(
-        '''
+    f.write('''
 %%-----  OPF Data  -----%%
 %% generator cost data
 %   1   startup shutdown    n   x1  y1  ... xn  yn
 %   2   startup shutdown    n   c(n-1)  ... c0
-mpc.gencost = ['''
-    )
-
-    gen = dict()
+mpc.gencost = [
+''')
+    gencost = ppc['gencost']
+    fuel = np.array([row[2] for row in ppc['gen_name']], dtype=object)
+    sync_cond = (fuel == 'Sync_Cond') & (gencost[:, 5::2] == 0).all(axis=1)
+    for _ in range(sync_cond.sum()):
+        print('Synchronous condensor!')
+    f.write(_block('\t%d\t%.{0}f\t%.{0}f\t%d\t'.format(DIGITS) +
+        '\t'.join(['%.{0}f'.format(DIGITS)] * (gencost.shape[1] - 4)) + '\n', gencost.T))
+    f.write('];\n')
+
+    f.write('''
 
-    for i, g in _generators.iterrows():
-        gen['model'] = 1
-        gen['startup'] = (
-            (g['Start Heat Cold MMBTU'] * g['Fuel Price $/MMBTU']) + g['Non Fuel Start Cost $']
-            if not np.isnan((g['Start Heat Cold MMBTU'] * g['Fuel Price $/MMBTU']) + g['Non Fuel Start Cost $']) else 0.0
-        )
-        gen['shutdown'] = (
-            g['Start Heat Cold MMBTU'] * g['Fuel Price $/MMBTU']
-            if not np.isnan(g['Start Heat Cold MMBTU'] * g['Fuel Price $/MMBTU']) else 0.0
-        )
-        gen['cost'] = list()
-        gen['cost'] = g['io_cost']
-        if all(v[1] == 0.0 for v in g['io_cost']):  #np.isnan(g['io_cost']).any():
-            if g['Fuel'] == 'Sync_Cond':
-                print('Synchronous condensor!')
-                g['PMax MW'] = 1
-            gen['ncost'] = 4
-            gen['cost'] = '{:.05f}\t\t0\t\t{:.05f}\t\t0\t\t{:.05f}\t\t0\t\t{:.05f}\t\t0'.format(
-                *(pd.np.linspace(0, g['PMax MW'], 4))
-            )
-        else:
-            gen['cost'] = '\t'.join(
-                [
-                    '{:.05f}\t{:.05f}'.format(x * g['PMax MW'], y * g['PMax MW'] * g['Fuel Price $/MMBTU'] / 1000)
-                    for x, y in gen['cost']
-                ]
-            )  # BTU/kWh * (1000kWH/MWh) * MWh * $/MMBTU  * (1MMBTU/100000BTU) = 1/1000
-            gen['ncost'] = len(g['io_cost'])
-        l('	{model}	{startup:.5f}	{shutdown:.5f}	{ncost}	{cost}'.format(**gen))
-
-    l('];')
-
-    l('')
-    l('''
 % bus names
 %column_names%	name
-mpc.bus_name = {''')
-    bn = dict()
-    for i, b in buses.iterrows():
-        bn['bn'] = "\t'{:}'".format(b['Bus Name']).upper()
-        l('''{bn};'''.format(**bn))
+mpc.bus_name = {
+''')
+    f.write(''.join("\t'%s';\n" % tuple(row) for row in ppc['bus_name']))
+    f.write('};\n')
 
-    l('};')
+    f.write('''
 
-    l('')
-    l('''
 % generator names types and fuels
 %column_names%	name    type    fuel
-mpc.gen_name = {''')
-    gn = dict()
-    for i, g in _generators.iterrows():
-        gn['gn'] = "\t'{:}'".format(g['GEN UID']).upper()
-        gn['type'] = "'{:}'".format(g['Unit Type'])
-        gn['fuel'] = "'{:}'".format(g['Fuel'])
-        l('{gn}\t{type}\t{fuel};'.format(**gn))
+mpc.gen_name = {
+''')
+    f.write(''.join("\t'%s'\t'%s'\t'%s';\n" % tuple(row) for row in ppc['gen_name']))
+    f.write('};\n')
 
-    l('};')
-
-    l(
-        '''
+    f.write('''
 %%-----  DC Line Data  -----%%
 % F_BUS T_BUS BR_STATUS PF PT QF QT VF VT PMIN PMAX QMINF QMAXF QMINT QMAXT LOSS0 LOSS1 MU_PMIN MU_PMAX MU_QMINF MU_QMAXF MU_QMINT MU_QMAXT
 mpc.dcline = [
-	113 316 1 0 0 0 0 1 1 -100 100 -9999 9999 -9999 9999 0 0 0 0 0 0 0 0
-];
-'''
-    )
-
-    with open('./RTS_GMLC.m', 'w') as f:
-        f.write('\n'.join(string_list))
+''')
+    f.write(_block('\t%d %d %d %d %d %d %d %d %d %s %s' + ' %d' * 12 + '\n',
+        ppc['dcline'].T))
+    f.write('];\n')
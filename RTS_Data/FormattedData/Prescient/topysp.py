@@ -6,6 +6,11 @@ import math
 
 from collections import namedtuple
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+from rts_gmlc.costs import cost_curves
+from rts_gmlc.source_data import read_table
+from rts_gmlc.timeseries import read_pointers
+
 copper_sheet = True
 
 if len(sys.argv) > 1:
@@ -90,10 +95,15 @@ bus_dict = {} # keys are ID
 branch_dict = {} # keys are ID
 timeseries_pointer_dict = {} # keys are (ID, simulation-type) pairs
 
-generator_df = pd.read_table("gen.csv", header=0, sep=',')
-bus_df = pd.read_table("bus.csv", header=0, sep=',')
-branch_df = pd.read_table("branch.csv", header=0, sep=',')
-timeseries_pointer_df = pd.read_table("timeseries_pointers.csv", header=0, sep=',')
+# the script is executed from the SourceData directory
+generator_df = read_table("gen", os.getcwd())
+bus_df = read_table("bus", os.getcwd())
+branch_df = read_table("branch", os.getcwd())
+timeseries_pointer_df = read_table("timeseries_pointers", os.getcwd())
+
+# the piecewise cost curves of all the generators, on points rounded to 0.1 MW
+generator_costs = cost_curves(generator_df, decimals=1)
+generator_position = dict(zip(generator_df["GEN UID"], range(len(generator_df))))
 
 for generator_index in generator_df.index.tolist():
     this_generator_dict = generator_df.loc[generator_index].to_dict()
@@ -187,48 +197,40 @@ target_plus_one_datetime = target_datetime + timedelta(days=2)
 
 filtered_timeseries = {} # maps renewables generator ID to list of DateTimeValue tuples
 
+# the time series of all generators and areas are read grouped by data file,
+# hence each file is opened once rather than once per generator
+renewables_timeseries_df = read_pointers("DAY_AHEAD",
+                                         category="Generator",
+                                         start=target_datetime,
+                                         end=target_plus_one_datetime,
+                                         normalize=False,
+                                         folder=os.getcwd())
+load_timeseries_df = read_pointers("DAY_AHEAD",
+                                   category="Area",
+                                   start=target_datetime,
+                                   end=target_plus_one_datetime,
+                                   normalize=False,
+                                   folder=os.getcwd())
+
 for gen_name, gen_spec in generator_dict.items():
     if gen_spec.Fuel == "Solar" or gen_spec.Fuel == "Wind" or gen_spec.Fuel == "Hydro":
         if (gen_spec.ID, "DAY_AHEAD") not in timeseries_pointer_dict:
             print("***WARNING - No timeseries pointer entry found for generator=%s" % gen_spec.ID)
         else:
             print("Time series for generator=%s will be loaded from file=%s" % (gen_spec.ID, timeseries_pointer_dict[(gen_spec.ID,"DAY_AHEAD")].DataFile))
-            renewables_timeseries_df = pd.read_table(timeseries_pointer_dict[(gen_spec.ID,"DAY_AHEAD")].DataFile,
-                                                     header=0,
-                                                     sep=',',
-                                                     parse_dates=[[0, 1, 2, 3]],
-                                                     date_parser=lambda *columns: datetime(*map(int,columns[0:3]), int(columns[3])-1))
-            this_source_timeseries_df = renewables_timeseries_df.loc[:,["Year_Month_Day_Period", gen_spec.ID]]
-            this_source_timeseries_df = this_source_timeseries_df.rename(columns = {"Year_Month_Day_Period" : "DateTime"})
-
-            start_mask = this_source_timeseries_df["DateTime"] >= target_datetime
-            end_mask = this_source_timeseries_df["DateTime"] < target_plus_one_datetime
-            this_source_masked_timeseries_df = this_source_timeseries_df[start_mask & end_mask]
-
-            renewables_timeseries_dict = this_source_masked_timeseries_df.to_dict(orient='split')
             renewables_timeseries = []
-            for this_row in renewables_timeseries_dict["data"]:
-                renewables_timeseries.append(DateTimeValue(this_row[0],
-                                                           float(this_row[1])))
+            for this_datetime, this_value in renewables_timeseries_df[gen_spec.ID].items():
+                renewables_timeseries.append(DateTimeValue(this_datetime.to_pydatetime(),
+                                                           float(this_value)))
             filtered_timeseries[gen_spec.ID] = renewables_timeseries
 
-load_timeseries_spec = timeseries_pointer_dict[("Load","DAY_AHEAD")]
-load_timeseries_df = pd.read_table(load_timeseries_spec.DataFile,
-                                   header=0,
-                                   sep=',',
-                                   parse_dates=[[0, 1, 2, 3]],
-                                   date_parser=lambda *columns: datetime(*map(int,columns[0:3]), int(columns[3])-1))
-load_timeseries_df = load_timeseries_df.rename(columns = {"Year_Month_Day_Period" : "DateTime"})
-start_mask = load_timeseries_df["DateTime"] >= target_datetime
-end_mask = load_timeseries_df["DateTime"] < target_plus_one_datetime
-masked_load_timeseries_df = load_timeseries_df[start_mask & end_mask]
-load_dict = masked_load_timeseries_df.to_dict(orient='split')
+# the regional loads are pointed to by area
 load_timeseries = []
-for load_row in load_dict["data"]:
-    load_timeseries.append(Load(load_row[0],
-                                float(load_row[1]),
-                                float(load_row[2]),
-                                float(load_row[3])))
+for this_datetime, load_row in load_timeseries_df.iterrows():
+    load_timeseries.append(Load(this_datetime.to_pydatetime(),
+                                float(load_row["1"]),
+                                float(load_row["2"]),
+                                float(load_row["3"])))
 
 unit_on_time_df = pd.read_table("../FormattedData/PLEXOS/PLEXOS_Solution/DAY_AHEAD Solution Files/noTX/on_time_7.12.csv",
                                 header=0,
@@ -416,20 +418,11 @@ for gen_id, gen_spec in generator_dict.items():
     if gen_spec.Fuel == "Oil" or gen_spec.Fuel == "Coal" or gen_spec.Fuel == "NG" or gen_spec.Fuel == "Nuclear":
         # Per Brendan, round the power points to the nearest 100kW
         # IMPT: These quantities are MW
-        x0 = round(gen_spec.OutputPct0 * gen_spec.MaxPower,1)
-        x1 = round(gen_spec.OutputPct1 * gen_spec.MaxPower,1)
-        x2 = round(gen_spec.OutputPct2 * gen_spec.MaxPower,1)
-        x3 = round(gen_spec.OutputPct3 * gen_spec.MaxPower,1)
+        x0, x1, x2, x3 = generator_costs.mw[generator_position[gen_id]]
         print("set CostPiecewisePoints[%s] := %12.1f %12.1f %12.1f %12.1f ;" % (gen_id, x0, x1, x2, x3),
               file=dat_file)
-        # NOTES:
-        # 1) Fuel price is in $/MMBTU
-        # 2) Heat Rate quantities are in BTU/KWH
-        # 3) 1+2 => need to convert both from BTU->MMBTU and from KWH->MWH
-        y0 = gen_spec.FuelPrice * ((gen_spec.HeatRateAvg0 * 1000.0 / 1000000.0) * x0)
-        y1 = gen_spec.FuelPrice * (((x1-x0) * (gen_spec.HeatRateIncr1 * 1000.0 / 1000000.0))) + y0
-        y2 = gen_spec.FuelPrice * (((x2-x1) * (gen_spec.HeatRateIncr2 * 1000.0 / 1000000.0))) + y1
-        y3 = gen_spec.FuelPrice * (((x3-x2) * (gen_spec.HeatRateIncr3 * 1000.0 / 1000000.0))) + y2
+        # fuel cost in $/h at these points, see rts_gmlc/costs.py
+        y0, y1, y2, y3 = generator_costs.cost[generator_position[gen_id]]
         print("set CostPiecewiseValues[%s] := %12.2f %12.2f %12.2f %12.2f ;" % (gen_id, y0, y1, y2, y3),
               file=dat_file)
 
@@ -1,4 +1,6 @@
 import os
+import sys
+import json
 import argparse
 
 import numpy as np
@@ -6,74 +8,95 @@ import pandas as pd
 
 import pypsa
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+from rts_gmlc.costs import cost_curves
+from rts_gmlc.powerflow import bus_loads
+from rts_gmlc.source_data import compact_attributes, read_table
+from rts_gmlc.timeseries import period_resolution, read_pointers
+
 baseMVA = 100.
 
-def _read_csv(input_folder, table):
-    return pd.read_csv(os.path.join(input_folder, table + ".csv"))
+# the time series written per window by export_windows
+WINDOW_PANELS = [("loads_t", "p_set"), ("loads_t", "q_set"),
+    ("generators_t", "p_max_pu"), ("generators_t", "p_min_pu"),
+    ("storage_units_t", "inflow")]
+
+# file (or folder) name of the shared static network of the windows
+NETWORK_NAMES = {"netcdf": "network.nc", "hdf5": "network.h5",
+    "csv": "network"}
+
+def add_components(n, class_name, names, **attrs):
+    # add all the components of a type in one call, the attributes given as
+    # arrays or Series aligned with `names` (n.madd in PyPSA < 0.33)
+    add = getattr(n, "madd", n.add)
+    attrs = {k: v.to_numpy() if isinstance(v, pd.Series) else v
+        for k, v in attrs.items()}
+    add(class_name, pd.Index(names, dtype=str), **attrs)
+
+def attach_columns(static, data, columns):
+    # the data not part of the PyPSA format, as one frame joined on the
+    # component names
+    #/ are not allowed as column names in netcdf and hcdf5
+    extra = compact_attributes(data[columns]).rename(
+        columns=lambda c: c.replace("/", " per "))
+    extra.index = static.index
+    static[list(extra.columns)] = extra
 
 def create_buses(n, input_folder):
-    busdata = _read_csv(input_folder, "bus")
+    busdata = read_table("bus", input_folder)
 
     #dictionary for bus type
     buscontrol_dic = {"PV": "PV", "PQ": "PQ", "Ref": "Slack"}
 
-    for i in busdata.index:
-        # Add each bus with the corresponding attributes
-        # the non-assined attributes get the default value
-        n.add("Bus", str(busdata.loc[i, "Bus ID"]),
-            v_nom = busdata.loc[i, "BaseKV"],
-            x = busdata.loc[i, "lng"],
-            y = busdata.loc[i, "lat"],
-            carrier = "AC" ,
-            v_mag_pu_set = busdata.loc[i, "V Mag"] ,
-            #v_mag_pu_min = , # NOTE: oder simulators use 0.95 as default
-            #v_mag_pu_max = , # NOTE: oder simulators use 1.05 as default
-            control = buscontrol_dic[busdata.loc[i, "Bus Type"]])
-        
-        # Additional data not part of the PyPSA format
-        busadditional = ["Bus Name", "Area", "Sub Area", "Zone", "V Angle", 
-            "MW Shunt G", "MVAR Shunt B"]
-        for col in busadditional: 
-            n.buses.loc[str(busdata.loc[i, "Bus ID"]), col] = \
-                busdata.loc[i, col]
-    
-    # Convert the index values into strings
-    n.buses.index = n.buses.index.astype(str)
+    # Add the buses with the corresponding attributes
+    # the non-assined attributes get the default value
+    add_components(n, "Bus", busdata["Bus ID"].astype(str),
+        v_nom = busdata["BaseKV"],
+        x = busdata["lng"],
+        y = busdata["lat"],
+        carrier = "AC" ,
+        v_mag_pu_set = busdata["V Mag"] ,
+        #v_mag_pu_min = , # NOTE: oder simulators use 0.95 as default
+        #v_mag_pu_max = , # NOTE: oder simulators use 1.05 as default
+        control = busdata["Bus Type"].map(buscontrol_dic))
+
+    # Additional data not part of the PyPSA format
+    busadditional = ["Bus Name", "Area", "Sub Area", "Zone", "V Angle",
+        "MW Shunt G", "MVAR Shunt B"]
+    attach_columns(n.buses, busdata, busadditional)
 
 def create_loads(n, input_folder):
-    busdata = _read_csv(input_folder, "bus")
-
-    for i in busdata.index:
-        n.add("Load", str(busdata.loc[i, "Bus ID"]),
-            bus = str(busdata.loc[i, "Bus ID"]),
-            carrier = "AC",
-            p_set = busdata.loc[i, "MW Load"],
-            q_set = busdata.loc[i, "MVAR Load"])
-    
-    n.loads.index = n.loads.index.astype(str)
+    busdata = read_table("bus", input_folder)
+
+    add_components(n, "Load", busdata["Bus ID"].astype(str),
+        bus = busdata["Bus ID"].astype(str),
+        carrier = "AC",
+        p_set = busdata["MW Load"],
+        q_set = busdata["MVAR Load"])
 
 def create_shunt_impedances(n, input_folder):
-    busdata = _read_csv(input_folder, "bus")
+    busdata = read_table("bus", input_folder)
     shuntdata = busdata[busdata[["MW Shunt G", "MVAR Shunt B"]].any(axis=1)]
 
-    for i in shuntdata.index:
-        n.add("ShuntImpedance", str(busdata.loc[i, "Bus ID"]),
-            bus = str(busdata.loc[i, "Bus ID"]),
-            g = - busdata.loc[i, "MW Shunt G"] /\
-                busdata.loc[i, "BaseKV"]**2, # no need to rebase
-            b = - busdata.loc[i, "MVAR Shunt B"]  /\
-                busdata.loc[i, "BaseKV"]**2, # no need to rebase
-            )
-    n.shunt_impedances.index = n.shunt_impedances.index.astype(str)
+    add_components(n, "ShuntImpedance", shuntdata["Bus ID"].astype(str),
+        bus = shuntdata["Bus ID"].astype(str),
+        g = - shuntdata["MW Shunt G"] /\
+            shuntdata["BaseKV"]**2, # no need to rebase
+        b = - shuntdata["MVAR Shunt B"]  /\
+            shuntdata["BaseKV"]**2, # no need to rebase
+        )
 
 def create_generators(n, input_folder):
-    gendata = _read_csv(input_folder, "gen")
+    gendata = read_table("gen", input_folder)
+    # fuel cost per MWh at the minimum output, HR_avg_0 times the fuel price
+    marginal_cost = pd.Series(cost_curves(gendata).average_cost,
+        index=gendata.index)
 
     #storage is stored in a separate table
-    gendata.drop(gendata[gendata["Fuel"] == "Storage"].index, inplace = True)
+    gendata = gendata.drop(gendata[gendata["Fuel"] == "Storage"].index)
 
     #we do not model synchronous condensors
-    gendata.drop(gendata[gendata["Fuel"] == "Sync_Cond"].index, inplace = True)
+    gendata = gendata.drop(gendata[gendata["Fuel"] == "Sync_Cond"].index)
 
     # dictionary for generator type
     gencontrol_dic = {}
@@ -90,286 +113,375 @@ def create_generators(n, input_folder):
         else:
             gencommitable_dic[c] = True
     
-    for i in gendata.index:
-        n.add("Generator", str(gendata.loc[i, "GEN UID"]),
-            bus = str(gendata.loc[i, "Bus ID"]),
-            control = gencontrol_dic[gendata.loc[i, "Fuel"]],
-            p_nom = gendata.loc[i, "PMax MW"],
-                # NOTE: p_min_pu and p_max_pu need to be set accordingly
-            #p_nom_extendable = , # NOTE: Not extendable by default
-            #p_nom_min = ,
-            #p_nom_max = ,
-            p_min_pu = gendata.loc[i, "PMin MW"]/gendata.loc[i, "PMax MW"],
-            p_max_pu = 1,
-            p_set = gendata.loc[i, "MW Inj"],
-            q_set = gendata.loc[i, "MVAR Inj"],
-            carrier = gendata.loc[i, "Fuel"],
-            marginal_cost = gendata.loc[i, "Fuel Price $/MMBTU"] *\
-                gendata.loc[i, "HR_avg_0"] / 1000,
-            #marginal_cost_quadratic = ,
-            #build_year = ,
-            #lifetime = ,
-            #capital_cost = ,
-            #efficiency = ,
-            committable = gencommitable_dic[gendata.loc[i, "Fuel"]],
-            start_up_cost = gendata.loc[i, "Non Fuel Start Cost $"],
-            shut_down_cost = gendata.loc[i, "Non Fuel Shutdown Cost $"],
-            #stand_by_cost = ,
-            min_up_time = gendata.loc[i, "Min Up Time Hr"],
-            min_down_time = gendata.loc[i, "Min Down Time Hr"],
-            #up_time_before = ,
-            #down_time_before = ,
-            ramp_limit_up = gendata.loc[i, "Ramp Rate MW/Min"]*60,
-            ramp_limit_down = gendata.loc[i, "Ramp Rate MW/Min"]*60,
-            ramp_limit_start_up = gendata.loc[i, "Ramp Rate MW/Min"]*60,
-            ramp_limit_shut_down = gendata.loc[i, "Ramp Rate MW/Min"]*60)
-        
-        genadditional = ["Gen ID", "Unit Group", "Unit Type", "Category", 
-            "V Setpoint p.u.", "QMax MVAR", "QMin MVAR", "Start Time Cold Hr",
-            "Start Time Warm Hr", "Start Time Hot Hr", "Start Heat Cold MBTU",
-            "Start Heat Warm MBTU", "Start Heat Hot MBTU", "FOR", "MTTF Hr",
-            "MTTR Hr", "Scheduled Maint Weeks", "Output_pct_0", "Output_pct_1",
-            "Output_pct_2", "Output_pct_3", "Output_pct_4", "HR_avg_0", 
-            "HR_incr_1", "HR_incr_2", "HR_incr_3", "HR_incr_4", "VOM",
-            "Fuel Sulfur Content %", "Emissions SO2 Lbs/MMBTU", 
-            "Emissions NOX Lbs/MMBTU", "Emissions Part Lbs/MMBTU", 
-            "Emissions CO2 Lbs/MMBTU", "Emissions CH4 Lbs/MMBTU",
-            "Emissions N2O Lbs/MMBTU", "Emissions CO Lbs/MMBTU",
-            "Emissions VOCs Lbs/MMBTU", "Damping Ratio", "Inertia MJ/MW",
-            "Base MVA", "Transformer X p.u.", "Unit X p.u.", "Pump Load MW",
-            "Storage Roundtrip Efficiency"]
-        for col in genadditional:
-            #/ are not allowed as column names in netcdf and hcdf5
-            if "/" in col:
-                col2 = col.replace("/", " per ")
-            else:
-                col2 = col
-
-            n.generators.loc[str(gendata.loc[i, "GEN UID"]), col2] = \
-                gendata.loc[i, col]
-
-    n.generators.index = n.generators.index.astype(str)
+    ramp = gendata["Ramp Rate MW/Min"]*60
+    add_components(n, "Generator", gendata["GEN UID"].astype(str),
+        bus = gendata["Bus ID"].astype(str),
+        control = gendata["Fuel"].map(gencontrol_dic),
+        p_nom = gendata["PMax MW"],
+            # NOTE: p_min_pu and p_max_pu need to be set accordingly
+        #p_nom_extendable = , # NOTE: Not extendable by default
+        #p_nom_min = ,
+        #p_nom_max = ,
+        p_min_pu = gendata["PMin MW"]/gendata["PMax MW"],
+        p_max_pu = 1,
+        p_set = gendata["MW Inj"],
+        q_set = gendata["MVAR Inj"],
+        carrier = gendata["Fuel"],
+        marginal_cost = marginal_cost[gendata.index],
+        #marginal_cost_quadratic = ,
+        #build_year = ,
+        #lifetime = ,
+        #capital_cost = ,
+        #efficiency = ,
+        committable = gendata["Fuel"].map(gencommitable_dic),
+        start_up_cost = gendata["Non Fuel Start Cost $"],
+        shut_down_cost = gendata["Non Fuel Shutdown Cost $"],
+        #stand_by_cost = ,
+        min_up_time = gendata["Min Up Time Hr"],
+        min_down_time = gendata["Min Down Time Hr"],
+        #up_time_before = ,
+        #down_time_before = ,
+        ramp_limit_up = ramp,
+        ramp_limit_down = ramp,
+        ramp_limit_start_up = ramp,
+        ramp_limit_shut_down = ramp)
+
+    genadditional = ["Gen ID", "Unit Group", "Unit Type", "Category",
+        "V Setpoint p.u.", "QMax MVAR", "QMin MVAR", "Start Time Cold Hr",
+        "Start Time Warm Hr", "Start Time Hot Hr", "Start Heat Cold MBTU",
+        "Start Heat Warm MBTU", "Start Heat Hot MBTU", "FOR", "MTTF Hr",
+        "MTTR Hr", "Scheduled Maint Weeks", "Output_pct_0", "Output_pct_1",
+        "Output_pct_2", "Output_pct_3", "Output_pct_4", "HR_avg_0",
+        "HR_incr_1", "HR_incr_2", "HR_incr_3", "HR_incr_4", "VOM",
+        "Fuel Sulfur Content %", "Emissions SO2 Lbs/MMBTU",
+        "Emissions NOX Lbs/MMBTU", "Emissions Part Lbs/MMBTU",
+        "Emissions CO2 Lbs/MMBTU", "Emissions CH4 Lbs/MMBTU",
+        "Emissions N2O Lbs/MMBTU", "Emissions CO Lbs/MMBTU",
+        "Emissions VOCs Lbs/MMBTU", "Damping Ratio", "Inertia MJ/MW",
+        "Base MVA", "Transformer X p.u.", "Unit X p.u.", "Pump Load MW",
+        "Storage Roundtrip Efficiency"]
+    attach_columns(n.generators, gendata, genadditional)
 
 def create_storage_units(n, input_folder):
-    gendata = _read_csv(input_folder, "gen")
-    storagedata = _read_csv(input_folder, "storage")
-
-    for i in storagedata.index:
-        igen =  gendata[gendata["GEN UID"] == storagedata.loc[i, "GEN UID"]].\
-            index[0]
-
-        n.add("StorageUnit", str(storagedata.loc[i, "Storage"]),
-            bus = str(gendata.loc[igen, "Bus ID"]),
-            control = "PQ",
-            p_nom = gendata.loc[igen, "PMax MW"], # actually same as Rating MVA
-                # NOTE: p_min_pu and p_max_pu need to be set accordingly
-            #p_nom_extendable = , # NOTE: Not extendable by default
-            #p_nom_min = ,
-            #p_nom_max = ,
-            p_min_pu = gendata.loc[igen,
-                "PMin MW"]/gendata.loc[igen, "PMax MW"],
-            p_max_pu = 1,
-            carrier = gendata.loc[igen, "Fuel"],
-            marginal_cost = 0, # set storage costs to zero
-            #marginal_cost_quadratic = ,
-            #capital_cost = ,
-            #build_year = ,
-            #lifetime = ,
-            state_of_charge_initial = storagedata.loc[i,
-                "Initial Volume GWh"]/1000,
-            #state_of_charge_initial_per_period = ,
-            #state_of_charge_set = ,
-            cyclic_state_of_charge = False,
-            #cyclic_state_of_charge_per_period = ,
-            max_hours = storagedata.loc[i, "Max Volume GWh"] /\
-                (1000 * gendata.loc[igen, "PMax MW"]),
-            #efficiency_store = ,
-            #efficiency_dispatch = ,
-            #standing_loss = ,
-            inflow = storagedata.loc[i, "Inflow Limit GWh"]/1000)
-        
-        storageadditional = ["GEN UID", "Start Energy", "position"]
-        for col in storageadditional:
-            #/ are not allowed as column names in netcdf and hcdf5
-            if "/" in col:
-                col2 = col.replace("/", " per ")
-            else:
-                col2 = col
-
-            n.storage_units.loc[str(storagedata.loc[i, "Storage"]), col2] = \
-                storagedata.loc[i, col]
-
-    n.storage_units.index = n.storage_units.index.astype(str)
+    gendata = read_table("gen", input_folder)
+    storagedata = read_table("storage", input_folder)
+
+    # the generator of every storage unit, by GEN UID
+    storagegen = gendata.set_index("GEN UID").loc[storagedata["GEN UID"]]
+
+    add_components(n, "StorageUnit", storagedata["Storage"].astype(str),
+        bus = storagegen["Bus ID"].astype(str),
+        control = "PQ",
+        p_nom = storagegen["PMax MW"], # actually same as Rating MVA
+            # NOTE: p_min_pu and p_max_pu need to be set accordingly
+        #p_nom_extendable = , # NOTE: Not extendable by default
+        #p_nom_min = ,
+        #p_nom_max = ,
+        p_min_pu = storagegen["PMin MW"]/storagegen["PMax MW"],
+        p_max_pu = 1,
+        carrier = storagegen["Fuel"],
+        marginal_cost = 0, # set storage costs to zero
+        #marginal_cost_quadratic = ,
+        #capital_cost = ,
+        #build_year = ,
+        #lifetime = ,
+        state_of_charge_initial = storagedata["Initial Volume GWh"]/1000,
+        #state_of_charge_initial_per_period = ,
+        #state_of_charge_set = ,
+        cyclic_state_of_charge = False,
+        #cyclic_state_of_charge_per_period = ,
+        max_hours = storagedata["Max Volume GWh"].to_numpy() /\
+            (1000 * storagegen["PMax MW"].to_numpy()),
+        #efficiency_store = ,
+        #efficiency_dispatch = ,
+        #standing_loss = ,
+        inflow = storagedata["Inflow Limit GWh"]/1000)
+
+    storageadditional = ["GEN UID", "Start Energy", "position"]
+    attach_columns(n.storage_units, storagedata, storageadditional)
 
 def create_lines(n, input_folder):
-    branchdata = _read_csv(input_folder, "branch")
+    branchdata = read_table("branch", input_folder)
     # drop the transformers
-    branchdata.drop(branchdata[branchdata["Tr Ratio"] != 0].index,
-        inplace= True)
-    busdata = _read_csv(input_folder, "bus")
-    
-    for i in branchdata.index:
-        ibus0 = busdata[busdata["Bus ID"] == branchdata.loc[i, "From Bus"]].\
-            index[0]
-        n.add("Line", str(branchdata.loc[i, "UID"]),
-            bus0 = str(branchdata.loc[i, "From Bus"]),
-            bus1 = str(branchdata.loc[i, "To Bus"]),
-            x = branchdata.loc[i, "X"] *\
-                ((busdata.loc[ibus0, "BaseKV"]**2)/ baseMVA),
-            r = branchdata.loc[i, "R"] *\
-                ((busdata.loc[ibus0, "BaseKV"]**2)/ baseMVA),
-            #g = ,
-            b = branchdata.loc[i, "B"] *
-                (baseMVA/(busdata.loc[ibus0, "BaseKV"]**2)),
-            s_nom = branchdata.loc[i, "Cont Rating"],
-            #s_nom_extendable = , # NOTE: Not extendable by default
-            #s_nom_min = ,
-            #s_nom_max = ,
-            #s_max_pu = ,
-            #capital_cost = ,
-            #build_year = ,
-            #lifetime = ,
-            length = branchdata.loc[i, "Length"],
-            carrier = "AC",
-            #terrain_factor = ,
-            #num_parallel = ,
-            #v_ang_min = ,
-            #v_ang_max = ,
-            )
-
-        branchadditional = ["LTE Rating", "STE Rating", "Perm OutRate", 
-            "Duration", "Tr Ratio", "Tran OutRate"]
-        for col in branchadditional:
-            #/ are not allowed as column names in netcdf and hcdf5
-            if "/" in col:
-                col2 = col.replace("/", " per ")
-            else:
-                col2 = col
-
-            n.lines.loc[str(branchdata.loc[i, "UID"]), col2] = \
-                branchdata.loc[i, col]
-
-    n.lines.index = n.lines.index.astype(str)
+    branchdata = branchdata.drop(branchdata[branchdata["Tr Ratio"] != 0].index)
+    busdata = read_table("bus", input_folder)
+    # the base voltage of the from bus of every line
+    basekv = branchdata["From Bus"].map(busdata.set_index("Bus ID")["BaseKV"])
+
+    add_components(n, "Line", branchdata["UID"].astype(str),
+        bus0 = branchdata["From Bus"].astype(str),
+        bus1 = branchdata["To Bus"].astype(str),
+        x = branchdata["X"] *\
+            ((basekv**2)/ baseMVA),
+        r = branchdata["R"] *\
+            ((basekv**2)/ baseMVA),
+        #g = ,
+        b = branchdata["B"] *
+            (baseMVA/(basekv**2)),
+        s_nom = branchdata["Cont Rating"],
+        #s_nom_extendable = , # NOTE: Not extendable by default
+        #s_nom_min = ,
+        #s_nom_max = ,
+        #s_max_pu = ,
+        #capital_cost = ,
+        #build_year = ,
+        #lifetime = ,
+        length = branchdata["Length"],
+        carrier = "AC",
+        #terrain_factor = ,
+        #num_parallel = ,
+        #v_ang_min = ,
+        #v_ang_max = ,
+        )
+
+    branchadditional = ["LTE Rating", "STE Rating", "Perm OutRate",
+        "Duration", "Tr Ratio", "Tran OutRate"]
+    attach_columns(n.lines, branchdata, branchadditional)
 
 
 def create_transformers(n, input_folder):
-    branchdata = _read_csv(input_folder, "branch")
+    branchdata = read_table("branch", input_folder)
     trafodata = branchdata.drop(branchdata[branchdata["Tr Ratio"] == 0].index)
 
-    for i in trafodata.index:
-        n.add("Transformer", str(trafodata.loc[i, "UID"]),
-            bus0 = str(trafodata.loc[i, "From Bus"]),
-            bus1 = str(trafodata.loc[i, "To Bus"]),
-            model = "pi", #since we follow MATPOWER rather than PowerFactory
-            x = trafodata.loc[i, "X"] *\
-                (trafodata.loc[i, "Cont Rating"]/ baseMVA),
-            r = trafodata.loc[i, "R"] *\
-                (trafodata.loc[i, "Cont Rating"]/ baseMVA),
-            #g = ,
-            b = trafodata.loc[i, "B"] *
-                (baseMVA/trafodata.loc[i, "Cont Rating"]),
-            s_nom = trafodata.loc[i, "Cont Rating"],
-            #s_nom_extendable = ,
-            #s_nom_min = ,
-            #s_nom_max = ,
-            #s_max_pu = ,
-            #capital_cost = ,
-            #num_parallel = ,
-            tap_ratio = trafodata.loc[i, "Tr Ratio"],
-            #tap_side = ,
-            #tap_position = ,
-            #phase_shift = , 
-            #build_year = .
-            #lifetime = ,
-            #v_ang_min = ,
-            #v_ang_max = ,
-            )
-
-        trafoadditional = ["LTE Rating", "STE Rating", "Perm OutRate", 
-            "Duration", "Tran OutRate", "Length"]
-        for col in trafoadditional:
-            #/ are not allowed as column names in netcdf and hcdf5
-            if "/" in col:
-                col2 = col.replace("/", " per ")
-            else:
-                col2 = col
-
-            n.transformers.loc[str(trafodata.loc[i, "UID"]), col2] = \
-                trafodata.loc[i, col]
-
-    n.transformers.index = n.transformers.index.astype(str)
+    add_components(n, "Transformer", trafodata["UID"].astype(str),
+        bus0 = trafodata["From Bus"].astype(str),
+        bus1 = trafodata["To Bus"].astype(str),
+        model = "pi", #since we follow MATPOWER rather than PowerFactory
+        x = trafodata["X"] *\
+            (trafodata["Cont Rating"]/ baseMVA),
+        r = trafodata["R"] *\
+            (trafodata["Cont Rating"]/ baseMVA),
+        #g = ,
+        b = trafodata["B"] *
+            (baseMVA/trafodata["Cont Rating"]),
+        s_nom = trafodata["Cont Rating"],
+        #s_nom_extendable = ,
+        #s_nom_min = ,
+        #s_nom_max = ,
+        #s_max_pu = ,
+        #capital_cost = ,
+        #num_parallel = ,
+        tap_ratio = trafodata["Tr Ratio"],
+        #tap_side = ,
+        #tap_position = ,
+        #phase_shift = ,
+        #build_year = .
+        #lifetime = ,
+        #v_ang_min = ,
+        #v_ang_max = ,
+        )
+
+    trafoadditional = ["LTE Rating", "STE Rating", "Perm OutRate",
+        "Duration", "Tran OutRate", "Length"]
+    attach_columns(n.transformers, trafodata, trafoadditional)
 
 def create_links(n, input_folder):
-    dc_branchdata = _read_csv(input_folder, "dc_branch")
-
-    for i in dc_branchdata.index:
-        n.add("Link", str(dc_branchdata.loc[i, "UID"]),
-            bus0 = str(dc_branchdata.loc[i, "From Bus"]),
-            bus1 = str(dc_branchdata.loc[i, "To Bus"]),
-            carrier = "DC",
-            #efficiency = ,
-            #build_year = ,
-            #lifetime = ,
-            p_nom = dc_branchdata.loc[i, "MW Load"],
-            #p_nom_extendable = ,
-            #p_nom_min = ,
-            #p_nom_max = ,
-            #p_set = ,
-            p_min_pu = -1,
-            p_max_pu = 1,
-            #capital_cost = ,
-            #marginal_cost = ,
-            #marginal_cost_quadratic = ,
-            #stand_by_cost = ,
-            #length = ,
-            #terrain_factor = ,
-            #committable = ,
-            #start_up_cost = ,
-            #shut_down_cost = ,
-            #min_up_time = ,
-            #min_down_time = ,
-            #up_time_before = ,
-            #down_time_before = ,
-            #ramp_limit_up = ,
-            #ramp_limit_down = ,
-            #ramp_limit_start_up = ,
-            #ramp_limit_shut_down = ,
-            )
-    
-        dc_branchadditional = ['Control Mode', 'R Line', 'MW Load', 'V Mag kV',
-            'R Compound', 'Margin', 'Metered end', 'Line FOR Perm',
-            'Line FOR Trans', 'MTTR Line Hours', 'From Station FOR Active',
-            'From Station FOR Passive', 'From Station Scheduled Maint Rate',
-            'From Station Scheduled Maint Hours', 'From Switching Time Hours',
-            'To Station FOR Active', 'To Station FOR Passive',
-            'To Station Scheduled Maint Rate',
-            'To Station Scheduled Maint Dur Hours', 'To Switching Time Hours',
-            'Line Outage Prob 0', 'Line Outage Prob 1', 'Line Outage Prob 2',
-            'Line Outage Prob 3', 'Line Outage Rate 0', 'Line Outage Rate 1',
-            'Line Outage Rate 2', 'Line Outage Rate 3', 'Line Outage Dur 0',
-            'Line Outage Dur 1', 'Line Outage Dur 2', 'Line Outage Dur 3',
-            'Line Outage Loading 1', 'Line Outage Loading 2',
-            'Line Outage Loading 3', 'From Series Bridges',
-            'From Max Firing Angle', 'From Min Firing Angle',
-            'From R Commutating', 'From X Commutating', 'From baseKV',
-            'From Tr Ratio', 'From Tap Setpoint', 'From Tap Max',
-            'From Tap Min', 'From Tap Step', 'To Series Bridges',
-            'To Max Firing Angle', 'To Min Firing Angle', 'To R Commutating',
-            'To X Commutating', 'To baseKV', 'To Tr Ratio', 'To Tap Setpoint',
-            'To Tap Max', 'To Tap Min', 'To Tap Step']
-        for col in dc_branchadditional:
-            #/ are not allowed as column names in netcdf and hcdf5
-            if "/" in col:
-                col2 = col.replace("/", " per ")
-            else:
-                col2 = col
-            
-            n.links.loc[str(dc_branchdata.loc[i, "UID"]), col2] = \
-                dc_branchdata.loc[i, col]
-
-    n.links.index = n.links.index.astype(str)
-
-def create_pypsa_network(input_folder, output_format, output):
+    dc_branchdata = read_table("dc_branch", input_folder)
+
+    add_components(n, "Link", dc_branchdata["UID"].astype(str),
+        bus0 = dc_branchdata["From Bus"].astype(str),
+        bus1 = dc_branchdata["To Bus"].astype(str),
+        carrier = "DC",
+        #efficiency = ,
+        #build_year = ,
+        #lifetime = ,
+        p_nom = dc_branchdata["MW Load"],
+        #p_nom_extendable = ,
+        #p_nom_min = ,
+        #p_nom_max = ,
+        #p_set = ,
+        p_min_pu = -1,
+        p_max_pu = 1,
+        #capital_cost = ,
+        #marginal_cost = ,
+        #marginal_cost_quadratic = ,
+        #stand_by_cost = ,
+        #length = ,
+        #terrain_factor = ,
+        #committable = ,
+        #start_up_cost = ,
+        #shut_down_cost = ,
+        #min_up_time = ,
+        #min_down_time = ,
+        #up_time_before = ,
+        #down_time_before = ,
+        #ramp_limit_up = ,
+        #ramp_limit_down = ,
+        #ramp_limit_start_up = ,
+        #ramp_limit_shut_down = ,
+        )
+
+    dc_branchadditional = ['Control Mode', 'R Line', 'MW Load', 'V Mag kV',
+        'R Compound', 'Margin', 'Metered end', 'Line FOR Perm',
+        'Line FOR Trans', 'MTTR Line Hours', 'From Station FOR Active',
+        'From Station FOR Passive', 'From Station Scheduled Maint Rate',
+        'From Station Scheduled Maint Hours', 'From Switching Time Hours',
+        'To Station FOR Active', 'To Station FOR Passive',
+        'To Station Scheduled Maint Rate',
+        'To Station Scheduled Maint Dur Hours', 'To Switching Time Hours',
+        'Line Outage Prob 0', 'Line Outage Prob 1', 'Line Outage Prob 2',
+        'Line Outage Prob 3', 'Line Outage Rate 0', 'Line Outage Rate 1',
+        'Line Outage Rate 2', 'Line Outage Rate 3', 'Line Outage Dur 0',
+        'Line Outage Dur 1', 'Line Outage Dur 2', 'Line Outage Dur 3',
+        'Line Outage Loading 1', 'Line Outage Loading 2',
+        'Line Outage Loading 3', 'From Series Bridges',
+        'From Max Firing Angle', 'From Min Firing Angle',
+        'From R Commutating', 'From X Commutating', 'From baseKV',
+        'From Tr Ratio', 'From Tap Setpoint', 'From Tap Max',
+        'From Tap Min', 'From Tap Step', 'To Series Bridges',
+        'To Max Firing Angle', 'To Min Firing Angle', 'To R Commutating',
+        'To X Commutating', 'To baseKV', 'To Tr Ratio', 'To Tap Setpoint',
+        'To Tap Max', 'To Tap Min', 'To Tap Step']
+    attach_columns(n.links, dc_branchdata, dc_branchadditional)
+
+def panel(data, columns, index):
+    # a time series panel of PyPSA, in float32 to halve its size
+    return pd.DataFrame(np.asarray(data, dtype=np.float32), index=index,
+        columns=pd.Index(columns, dtype=str))
+
+def create_snapshots(n, input_folder, simulation, start=None, end=None):
+    # the periods of the simulation (or of start <= t < end) as snapshots,
+    # the time series read with one pass per data file
+    index, pd_, qd = bus_loads(input_folder, simulation, start, end)
+    busdata = read_table("bus", input_folder)
+    n.set_snapshots(index)
+    # the snapshots weigh their duration in hours (1/12 in REAL_TIME)
+    n.snapshot_weightings.loc[:, :] = period_resolution(simulation,
+        input_folder) / 3600.
+
+    # the area loads spread over the buses by their MW Load
+    n.loads_t.p_set = panel(pd_, busdata["Bus ID"], index)
+    n.loads_t.q_set = panel(qd, busdata["Bus ID"], index)
+
+    # hydro, wind and solar: availability (and must-take output) per unit
+    # of PMax MW
+    p_nom = n.generators["p_nom"]
+    for parameter, attr in [("PMax MW", "p_max_pu"), ("PMin MW", "p_min_pu")]:
+        data = read_pointers(simulation, category="Generator",
+            parameter=parameter, start=start, end=end, normalize=False,
+            folder=input_folder)
+        data = data.loc[:, data.columns.isin(n.generators.index)]
+        n.generators_t[attr] = panel(data.to_numpy() /
+            p_nom[data.columns].to_numpy(), data.columns, index)
+
+    # the natural inflow of the storage units in MW
+    inflow = read_pointers(simulation, category="Generator",
+        parameter="Natural_Inflow", start=start, end=end, normalize=False,
+        folder=input_folder)
+    inflow = inflow.loc[:, inflow.columns.isin(n.storage_units.index)]
+    n.storage_units_t.inflow = panel(inflow, inflow.columns, index)
+
+def simulation_steps(input_folder, simulation, start=None, end=None):
+    # the first period of every step of the simulation from Date_From to
+    # Date_To (only those in start <= t < end, if given), the periods per
+    # step and look-ahead periods and the period resolution
+    sim = read_table("simulation_objects", input_folder).set_index(
+        "Simulation_Parameters")[simulation]
+    if sim["Look_Ahead_Resolution"] != sim["Period_Resolution"]:
+        raise ValueError("look-ahead periods at another resolution than the "
+            "periods are not supported")
+    periods = int(sim["Periods_per_Step"])
+    look_ahead = int(sim["Look_Ahead_Periods_per_Step"])
+    resolution = pd.Timedelta(seconds=int(sim["Period_Resolution"]))
+
+    steps = pd.date_range(pd.Timestamp(sim["Date_From"]),
+        pd.Timestamp(sim["Date_To"]), freq=periods * resolution,
+        inclusive="left")
+    if start is not None:
+        steps = steps[steps >= pd.Timestamp(start)]
+    if end is not None:
+        steps = steps[steps < pd.Timestamp(end)]
+    return steps, periods, look_ahead, resolution
+
+def export_network(n, output_format, output):
+    # export the network, the time series compressed
+    if output_format == "netcdf":
+        # netcdf has no categoricals, they are written as text
+        categorical = {}
+        for component in ["buses", "generators", "storage_units", "lines",
+            "transformers", "links"]:
+            static = getattr(n, component)
+            columns = [c for c in static.columns
+                if isinstance(static[c].dtype, pd.CategoricalDtype)]
+            categorical[component] = static[columns]
+            static[columns] = static[columns].astype(object)
+        n.export_to_netcdf(output, compression={"zlib": True, "complevel": 4})
+        for component, columns in categorical.items():
+            getattr(n, component)[list(columns.columns)] = columns
+    if output_format == "hdf5":
+        n.export_to_hdf5(output, complevel=4)
+    if output_format == "csv":
+        n.export_to_csv_folder(output)
+
+def export_windows(n, input_folder, simulation, output_format, output,
+    start=None, end=None):
+    # the rolling horizon of a simulation: the static network once and, per
+    # step, its periods and look-ahead periods as a small .npz file of time
+    # series, all in the folder output (see load_window)
+    steps, periods, look_ahead, resolution = simulation_steps(input_folder,
+        simulation, start, end)
+    if len(steps) == 0:
+        raise ValueError("no {} step starts in the given range".format(
+            simulation))
+    length = periods + look_ahead
+
+    # the time series of all the windows, read once
+    series = n.copy()
+    create_snapshots(series, input_folder, simulation, steps[0],
+        steps[-1] + length * resolution)
+    first = series.snapshots.get_indexer(steps)
+    if (first < 0).any() or first[-1] + length > len(series.snapshots):
+        raise ValueError("the {} time series do not cover the look-ahead "
+            "of the last step".format(simulation))
+
+    if not os.path.isdir(output):
+        os.makedirs(output)
+    export_network(n, output_format, os.path.join(output,
+        NETWORK_NAMES[output_format]))
+
+    panels = {}
+    columns = {}
+    for component, attr in WINDOW_PANELS:
+        frame = getattr(series, component)[attr]
+        key = component + "-" + attr
+        panels[key] = frame.to_numpy(dtype=np.float32)
+        columns[key] = list(frame.columns)
+    for k, i in enumerate(first):
+        np.savez(os.path.join(output, "window_{:06d}.npz".format(k)),
+            **{key: panel[i:i + length] for key, panel in panels.items()})
+
+    # written last: a folder with windows.json is complete
+    meta = {"network": NETWORK_NAMES[output_format], "simulation": simulation,
+        "resolution": int(resolution.total_seconds()), "periods": periods,
+        "look_ahead": look_ahead, "steps": [str(t) for t in steps],
+        "columns": columns}
+    with open(os.path.join(output, "windows.json"), "w") as f:
+        json.dump(meta, f)
+
+def load_window(output, k, network=None):
+    # the network of the step k of a folder written by export_windows, with
+    # the periods of the step and its look-ahead as snapshots. network is the
+    # static network when already loaded (e.g. by a worker solving several
+    # windows), it is copied and not modified
+    with open(os.path.join(output, "windows.json")) as f:
+        meta = json.load(f)
+    if network is None:
+        n = pypsa.Network(os.path.join(output, meta["network"]))
+    else:
+        n = network.copy()
+
+    n.set_snapshots(pd.date_range(meta["steps"][k], periods=meta["periods"] +
+        meta["look_ahead"], freq=pd.Timedelta(seconds=meta["resolution"])))
+    n.snapshot_weightings.loc[:, :] = meta["resolution"] / 3600.
+    with np.load(os.path.join(output, "window_{:06d}.npz".format(k))) as data:
+        for key, columns in meta["columns"].items():
+            component, attr = key.split("-")
+            getattr(n, component)[attr] = pd.DataFrame(data[key],
+                index=n.snapshots, columns=pd.Index(columns, dtype=str))
+    return n
+
+def create_pypsa_network(input_folder, output_format, output,
+    simulation=None, start=None, end=None, windows=False):
     
     # create an empty pypsa network
     n = pypsa.Network()
@@ -398,13 +510,17 @@ def create_pypsa_network(input_folder, output_format, output):
     # add links (DC-lines)
     create_links(n, input_folder)
 
-    # export the network
-    if output_format == "netcdf":
-        n.export_to_netcdf(output)
-    if output_format == "hdf5":
-        n.export_to_hdf5(output)
-    if output_format == "csv":
-        n.export_to_csv_folder(output)
+    # one network per step of a simulation, sharing the static data
+    if windows:
+        export_windows(n, input_folder, simulation, output_format, output,
+            start, end)
+        return
+
+    # add the time series of a simulation
+    if simulation is not None:
+        create_snapshots(n, input_folder, simulation, start, end)
+
+    export_network(n, output_format, output)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -420,7 +536,24 @@ if __name__ == "__main__":
         default='PyPSA_RTS-GMLC.h5',
         help='output file name in case of netcdf format or folder name for '\
         'csv format. The default is /PyPSA_RTS-GML.h5')
+    parser.add_argument('-simulation', type=str, default=None,
+        choices = ['DAY_AHEAD', 'REAL_TIME'],
+        help='add the time series of this simulation as snapshots. By '\
+        'default the network is static (peak load)')
+    parser.add_argument('-start', type=str, default=None,
+        help='first snapshot, e.g. 2020-07-01')
+    parser.add_argument('-end', type=str, default=None,
+        help='end of the snapshots (not included), e.g. 2020-07-08')
+    parser.add_argument('-windows', action='store_true',
+        help='write the rolling horizon of the simulation to the folder '\
+        'output instead: the static network and, per step of '\
+        'simulation_objects.csv, its periods and look-ahead periods as a '\
+        'small file of time series (steps starting from start to end)')
     args = parser.parse_args()
+    if args.windows and args.simulation is None:
+        parser.error('-windows requires -simulation')
 
     create_pypsa_network(input_folder=args.input_folder, 
-        output_format = args.output_format, output = args.output)
\ No newline at end of file
+        output_format = args.output_format, output = args.output,
+        simulation = args.simulation, start = args.start, end = args.end,
+        windows = args.windows)
\ No newline at end of file
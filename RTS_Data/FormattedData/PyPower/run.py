@@ -1,7 +1,35 @@
+import argparse
+
 from pypower.api import ppoption, runpf, printpf, savecase
-from script import caseRTSGMLC
+from script import caseRTSGMLC, caseRTSGMLC_from_source
+from rts_gmlc.powerflow import run_timeseries
+from rts_gmlc.results import from_pypower, save_solution
+
+parser = argparse.ArgumentParser(description='Run the RTS-GMLC power flow in PyPower.')
+parser.add_argument('--folder', dest='folder', default=None,
+                    help='source data folder path')
+parser.add_argument('--case', dest='case', default=None,
+                    help='read this MATPOWER case file instead of the source data')
+parser.add_argument('--results', dest='results', default=None,
+                    help='also store the result tables in this .npz file')
+parser.add_argument('--timeseries', dest='timeseries', default=None,
+                    help='solve every hour of the source data and write the results to this folder')
+parser.add_argument('--simulation', dest='simulation', default='DAY_AHEAD',
+                    help='simulation whose loads are used with --timeseries')
+parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=None,
+                    help='number of processes used with --timeseries')
+args = parser.parse_args()
 
-ppc = caseRTSGMLC()
+if args.timeseries is not None:
+    converged, hours = run_timeseries(args.timeseries, args.folder,
+                                      args.simulation, jobs=args.jobs)
+    print('{} of {} hours converged'.format(converged, hours))
+    raise SystemExit
+
+if args.case is None:
+    ppc = caseRTSGMLC_from_source(args.folder)
+else:
+    ppc = caseRTSGMLC(args.case)
 
 ppopt = ppoption(PF_ALG=2)
 
@@ -10,6 +38,9 @@ r = runpf(ppc, ppopt)
 #https://github.com/rwl/PYPOWER/issues/49
 printpf(r[0])
 
+if args.results is not None:
+    save_solution(from_pypower(r[0], 'AC Power Flow (Newton)'), args.results)
+
 savecase("caseRTSGMLC_ppc", ppc)
 
 #need to add a line in the file to be able to directly load it later
@@ -18,4 +49,4 @@ with open("caseRTSGMLC_ppc.py", 'r+') as f:
     content = f.read()
     f.seek(0, 0)
     f.write('from numpy import array' + '\n\n' + content)
-    f.truncate()
\ No newline at end of file
+    f.truncate()
@@ -1,45 +1,20 @@
-import numpy as np
 import os
-import io
-import re
+import sys
 
-def caseRTSGMLC():
-    # Read the m file from the MATPOWER repository
-    path = os.path.join("..", "MATPOWER")
-    with open(os.path.join(path, "RTS_GMLC.m"), 'r') as file:
-        m = file.read()
-    
-    # inicialize a dictionary
-    ppc = {}
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(curr_dir, ".."))
+from rts_gmlc.matpower import load_case
+from rts_gmlc.ppc import create_ppc
 
-    # get the single entries
-    ppc['version'] = re.search("mpc\.version *= *'(.*?)'\;", m)[1]
-    ppc['baseMVA'] = float(re.search("mpc\.baseMVA *= *(.*?)\;", m)[1])
+# the m file of the MATPOWER folder of this repository
+MATPOWER_CASE = os.path.join(curr_dir, "..", "MATPOWER", "RTS_GMLC.m")
 
-    # get all numeric array entries
-    d = dict(re.findall("mpc\.(\w+) *= *\[(.*?)\]", m, re.DOTALL))
+def caseRTSGMLC(path=MATPOWER_CASE, cache=True):
+    # the parsed case is cached next to the m file, keyed by its hash, and
+    # the string entries (bus_name, gen_name) are not used by PyPower
+    return load_case(path, cache=cache)
 
-    for k in ['bus', 'gen', 'branch', 'gencost']:
-        aux = np.genfromtxt(io.StringIO(d[k].replace('\t\t','\t')), missing_values="nan",
-            delimiter="\t")
-        ppc[k] = aux[:,~np.isnan(aux).any(axis=0)]
-
-    aux = np.genfromtxt(io.StringIO(d['areas'].replace(";", " ")),
-        missing_values="nan", dtype = "int")
-    ppc['areas'] = aux[:,~np.isnan(aux).any(axis=0)]
-
-    aux = np.genfromtxt(io.StringIO(d['dcline']), missing_values="nan",
-        delimiter=" ")
-    ppc['dcline'] = aux[:,~np.isnan(aux).any(axis=0)]
-
-    
-    # get all string array entries (although not really used in PyPower)
-    e = dict(re.findall("mpc\.(\w+) *= *\{(.*?)\}", m, re.DOTALL))
-
-    for k in e.keys():
-        aux = e[k].split('\n')[1:-1]
-        aux2 = [x.split('\t') for x in aux]
-        aux3 = [x[1:] for x in aux2]
-        ppc[k] = [[x[i][1:-2] for i in range(0,len(x))] for x in aux3]
-    
-    return ppc
\ No newline at end of file
+def caseRTSGMLC_from_source(folder=None):
+    # the same case built directly from the SourceData tables, without
+    # writing and parsing the m file
+    return create_ppc(folder)
@@ -0,0 +1,258 @@
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+formatted_data = os.path.realpath(os.path.join(curr_dir, ".."))
+sys.path.append(formatted_data)
+from rts_gmlc.tile import tile_source_data
+
+# the stock system, with SourceData and timeseries_data_files
+RTS_DATA_FOLDER = os.path.realpath(os.path.join(formatted_data, ".."))
+DATA_FOLDER = os.path.join(curr_dir, "data")
+RESULTS_FILE = os.path.join(curr_dir, "results", "results.jsonl")
+
+SCALES = [1, 10, 100]
+
+
+def _load(relpath):
+    # import a converter script by path, its folder first on sys.path
+    path = os.path.join(formatted_data, relpath)
+    sys.path.insert(0, os.path.dirname(path))
+    name = os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# Each benchmark prepares a converter for the data in `data` (a folder laid
+# out like RTS_Data) writing into `work`, and returns the call to time.
+
+def bench_matpower(data, work):
+    script = _load(os.path.join("MATPOWER", "script.py"))
+    os.chdir(work)
+    folder = os.path.join(data, "SourceData")
+    return lambda: script.create_rts_MATPOWER_file(folder)
+
+
+def bench_pypsa(data, work):
+    script = _load(os.path.join("PyPSA", "script.py"))
+    folder = os.path.join(data, "SourceData")
+    output = os.path.join(work, "PyPSA_RTS-GMLC")
+    return lambda: script.create_pypsa_network(input_folder=folder,
+        output_format="csv", output=output)
+
+
+def bench_pandapower(data, work):
+    script = _load(os.path.join("pandapower", "source_data_to_pp.py"))
+    folder = os.path.join(data, "SourceData")
+    output = os.path.join(work, "pandapower_net.json")
+    return lambda: script.create_pp_from_ppc(folder, output, plot=False)
+
+
+def bench_opentepes(data, work):
+    sys.path.insert(0, os.path.join(formatted_data, "openTEPES"))
+    import Create_openTEPES_InputData as ID
+    os.makedirs(os.path.join(work, "RTS-GMLC"))
+    # the data files are built on the dictionaries
+    ID.GettingDataTo_oTDict(data, work, "RTS-GMLC")
+    return lambda: ID.GettingDataTo_oTData(data, work, "RTS-GMLC")
+
+
+def bench_prescient(data, work):
+    # topysp.py reads and writes in the SourceData directory it runs from
+    shutil.copytree(os.path.join(data, "SourceData"),
+        os.path.join(work, "SourceData"))
+    os.symlink(os.path.join(data, "timeseries_data_files"),
+        os.path.join(work, "timeseries_data_files"))
+    os.chdir(os.path.join(work, "SourceData"))
+    path = os.path.join(formatted_data, "Prescient", "topysp.py")
+    sys.argv = [path, "output-network"]
+    return lambda: runpy.run_path(path, run_name="__main__")
+
+
+def bench_gis(data, work):
+    script = _load(os.path.join("GIS", "csv2geojson.py"))
+    folder = os.path.join(data, "SourceData")
+    return lambda: script.create_geojson(folder, work)
+
+
+BENCHMARKS = {
+    "matpower": bench_matpower,
+    "pypsa": bench_pypsa,
+    "pandapower": bench_pandapower,
+    "opentepes": bench_opentepes,
+    "prescient": bench_prescient,
+    "gis": bench_gis,
+}
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024. ** 2 if sys.platform == "darwin" else 1024.)
+
+
+def run_child(name, data, work):
+    """Time one benchmark in this process and print the result as json."""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    result = {"status": "ok"}
+    try:
+        call = BENCHMARKS[name](data, work)
+        base = _max_rss_mb()
+        start = time.perf_counter()
+        call()
+        result["seconds"] = time.perf_counter() - start
+        result["peak_rss_mb"] = _max_rss_mb()
+        result["delta_rss_mb"] = result["peak_rss_mb"] - base
+    except BaseException as e:
+        result = {"status": "failed", "error": "{}: {}".format(
+            type(e).__name__, e)}
+    # the converters print to stdout, the result is the last line
+    print("\n" + json.dumps(result))
+
+
+def scaled_data(scale):
+    """Return the folder of the system tiled `scale` times, creating it."""
+    if scale == 1:
+        return RTS_DATA_FOLDER
+    folder = os.path.join(DATA_FOLDER, "x{}".format(scale))
+    if not os.path.exists(os.path.join(folder, "SourceData")):
+        print("tiling the RTS-GMLC {} times into {}".format(scale, folder))
+        # the converters only read the DAY_AHEAD time series
+        tile_source_data(scale, folder, simulations=["DAY_AHEAD"])
+    return folder
+
+
+def _commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"],
+            cwd=curr_dir, universal_newlines=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"],
+            cwd=curr_dir) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run(names, scales, repeat=1, timeout=None):
+    """
+    Run every benchmark on every scale, each repetition in a fresh process,
+    and append the best time of each to the results file.
+    """
+    commit, dirty = _commit()
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+
+    for scale in scales:
+        data = scaled_data(scale)
+        for name in names:
+            results = []
+            for _ in range(repeat):
+                work = tempfile.mkdtemp(prefix="rts_bench_")
+                try:
+                    proc = subprocess.run([sys.executable, __file__,
+                        "--child", name, data, work], stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL, universal_newlines=True,
+                        timeout=timeout)
+                    lines = proc.stdout.strip().splitlines()
+                    results.append(json.loads(lines[-1]) if lines else
+                        {"status": "failed", "error": "no result"})
+                except subprocess.TimeoutExpired:
+                    results.append({"status": "timeout"})
+                finally:
+                    shutil.rmtree(work, ignore_errors=True)
+                if results[-1]["status"] != "ok":
+                    break
+
+            ok = [r for r in results if r["status"] == "ok"]
+            best = min(ok, key=lambda r: r["seconds"]) if ok else results[-1]
+            record = {
+                "commit": commit, "dirty": dirty,
+                "date": datetime.datetime.now().isoformat(timespec="seconds"),
+                "machine": platform.node(), "python": platform.python_version(),
+                "benchmark": name, "scale": scale, "repeat": len(results)}
+            record.update(best)
+            with open(RESULTS_FILE, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+            print("{:<12} x{:<6} {:<12} {}".format(name, scale,
+                record["status"], "{:10.2f} s {:10.1f} MB".format(
+                record["seconds"], record["peak_rss_mb"]) if ok else
+                record.get("error", "")))
+
+
+def compare(base=None, head=None):
+    """
+    Print the time and memory ratios between the results of two commits (by
+    default the last two commits in the results file).
+    """
+    with open(RESULTS_FILE) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    commits = []
+    for r in records:
+        if r["commit"] in commits:
+            commits.remove(r["commit"])
+        commits.append(r["commit"])
+    if head is None:
+        head = commits[-1]
+    if base is None:
+        base = commits[-2] if len(commits) > 1 else head
+
+    def latest(commit):
+        out = {}
+        for r in records:
+            if (r["commit"] or "").startswith(commit or "") and \
+                    r["status"] == "ok":
+                out[(r["benchmark"], r["scale"])] = r
+        return out
+
+    old, new = latest(base), latest(head)
+    print("{:<12} {:>6} {:>10} {:>10} {:>7} {:>7}".format("benchmark",
+        "scale", "base s", "head s", "time", "memory"))
+    for key in sorted(set(old) & set(new)):
+        a, b = old[key], new[key]
+        print("{:<12} {:>6} {:10.2f} {:10.2f} {:7.2f} {:7.2f}".format(key[0],
+            key[1], a["seconds"], b["seconds"], b["seconds"] / a["seconds"],
+            b["peak_rss_mb"] / a["peak_rss_mb"]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time and memory profile '
+        'the converters on the stock and on tiled RTS-GMLC systems.')
+    parser.add_argument('benchmarks', nargs='*',
+                        help='benchmarks to run, all by default: ' +
+                        ', '.join(BENCHMARKS))
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES,
+                        help='number of tiles of the systems, e.g. 1 10 100 '
+                        '1000')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='repetitions of each benchmark, the best is kept')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds after which a benchmark is stopped')
+    parser.add_argument('--compare', nargs='*', metavar='COMMIT',
+                        help='compare the results of two commits instead')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(*args.child)
+    elif args.compare is not None:
+        compare(*args.compare[:2])
+    else:
+        unknown = [b for b in args.benchmarks if b not in BENCHMARKS]
+        if unknown:
+            parser.error("unknown benchmarks: " + ", ".join(unknown))
+        run(args.benchmarks or list(BENCHMARKS), args.scales, args.repeat,
+            args.timeout)
@@ -1,8 +1,14 @@
 # Libraries
+import os
+import sys
 import itertools
 import time
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+from rts_gmlc.source_data import read_table
+from rts_gmlc.timeseries  import read_timeseries, load_levels
+
 
 def GettingDataTo_oTData(_path_data, _path_file, CaseName):
     print('Transforming data to get the oT_Data files ****')
@@ -11,18 +17,18 @@ def GettingDataTo_oTData(_path_data, _path_file, CaseName):
     StartTime         = time.time()
 
     # reading data from the folder SourceData
-    df_branch        = pd.read_csv(_path_data + '/SourceData/branch.csv' )
-    df_bus           = pd.read_csv(_path_data + '/SourceData/bus.csv'    )
-    df_gen           = pd.read_csv(_path_data + '/SourceData/gen.csv'    )
-    df_storage       = pd.read_csv(_path_data + '/SourceData/storage.csv')
+    df_branch        = read_table('branch' , _path_data+'/SourceData')
+    df_bus           = read_table('bus'    , _path_data+'/SourceData')
+    df_gen           = read_table('gen'    , _path_data+'/SourceData')
+    df_storage       = read_table('storage', _path_data+'/SourceData')
 
     # reading data from the folder timeseries_data_file
-    df_load          = pd.read_csv(_path_data + '/timeseries_data_files/Load/DAY_AHEAD_regional_Load.csv')
-    df_hydro         = pd.read_csv(_path_data + '/timeseries_data_files/Hydro/DAY_AHEAD_hydro.csv'       )
-    df_csp           = pd.read_csv(_path_data + '/timeseries_data_files/CSP/DAY_AHEAD_Natural_Inflow.csv')
-    df_pv            = pd.read_csv(_path_data + '/timeseries_data_files/PV/DAY_AHEAD_pv.csv'             )
-    df_rtpv          = pd.read_csv(_path_data + '/timeseries_data_files/RTPV/DAY_AHEAD_rtpv.csv'         )
-    df_wind          = pd.read_csv(_path_data + '/timeseries_data_files/WIND/DAY_AHEAD_wind.csv'         )
+    df_load          = read_timeseries(_path_data + '/timeseries_data_files/Load/DAY_AHEAD_regional_Load.csv')
+    df_hydro         = read_timeseries(_path_data + '/timeseries_data_files/Hydro/DAY_AHEAD_hydro.csv'       )
+    df_csp           = read_timeseries(_path_data + '/timeseries_data_files/CSP/DAY_AHEAD_Natural_Inflow.csv')
+    df_pv            = read_timeseries(_path_data + '/timeseries_data_files/PV/DAY_AHEAD_pv.csv'             )
+    df_rtpv          = read_timeseries(_path_data + '/timeseries_data_files/RTPV/DAY_AHEAD_rtpv.csv'         )
+    df_wind          = read_timeseries(_path_data + '/timeseries_data_files/WIND/DAY_AHEAD_wind.csv'         )
 
     # reading data from the dictionaries
     df_Area          = pd.read_csv(_path_file+'/RTS-GMLC/oT_Dict_Area_'      +CaseName+'.csv')
@@ -79,10 +85,7 @@ def GettingDataTo_oTData(_path_data, _path_file, CaseName):
     pNomDemand_org = pNomDemand_org.set_index(['Bus ID'])
 
     # Defining load levels
-    df_load['Month'    ] = df_load.Month.map("{:02}".format)
-    df_load['Day'      ] = df_load.Day.map("{:02}".format)
-    df_load['Period'   ] = df_load.Period.map("{:02}".format)
-    LoadLevels           = [str(df_load['Month'][i])+str(df_load['Day'][i])+str(df_load['Period'][i]) for i in df_load.index]
+    LoadLevels           = load_levels(df_load['Month'], df_load['Day'], df_load['Period']).tolist()
     df_load['LoadLevel'] = pd.DataFrame({'LoadLevel': LoadLevels})
 
     # Getting load factors per area
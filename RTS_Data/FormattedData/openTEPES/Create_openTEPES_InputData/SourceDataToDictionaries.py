@@ -1,7 +1,13 @@
 # Libraries
+import os
+import sys
 import time
 import pandas as pd
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..'))
+from rts_gmlc.source_data import read_table
+from rts_gmlc.timeseries  import read_timeseries, load_levels
+
 
 def GettingDataTo_oTDict(_path_data, _path_file, CaseName):
     print('Transforming data to get the oT_Dict files ****')
@@ -9,12 +15,12 @@ def GettingDataTo_oTDict(_path_data, _path_file, CaseName):
     StartTime = time.time()
 
     # reading data from the folder SourceData
-    df_bus    = pd.read_csv(_path_data+'/SourceData/bus.csv'   )
-    df_branch = pd.read_csv(_path_data+'/SourceData/branch.csv')
-    df_gen    = pd.read_csv(_path_data+'/SourceData/gen.csv'   )
+    df_bus    = read_table('bus'   , _path_data+'/SourceData')
+    df_branch = read_table('branch', _path_data+'/SourceData')
+    df_gen    = read_table('gen'   , _path_data+'/SourceData')
 
     # reading data from the folder timeseries_data_file
-    df_TS_CSP = pd.read_csv(_path_data + '/timeseries_data_files/CSP/DAY_AHEAD_Natural_Inflow.csv')
+    df_TS_CSP = read_timeseries(_path_data + '/timeseries_data_files/CSP/DAY_AHEAD_Natural_Inflow.csv')
 
 
     # Extracting regions
@@ -67,10 +73,7 @@ def GettingDataTo_oTDict(_path_data, _path_file, CaseName):
     pLineType.to_frame(name='LineType').to_csv(_path_file + '/RTS-GMLC/oT_Dict_Line_' + CaseName + '.csv', sep=',', index=False)
 
     # Defining load levels
-    df_TS_CSP['Month' ] = df_TS_CSP.Month.map("{:02}".format)
-    df_TS_CSP['Day'   ] = df_TS_CSP.Day.map("{:02}".format)
-    df_TS_CSP['Period'] = df_TS_CSP.Period.map("{:02}".format)
-    LoadLevels   = [str(df_TS_CSP['Month'][i])+str(df_TS_CSP['Day'][i])+str(df_TS_CSP['Period'][i]) for i in df_TS_CSP.index]
+    LoadLevels   = load_levels(df_TS_CSP['Month'], df_TS_CSP['Day'], df_TS_CSP['Period']).tolist()
     pLoadLevels  = pd.DataFrame({'LoadLevel': LoadLevels})
     pLoadLevels.to_csv(_path_file + '/RTS-GMLC/oT_Dict_LoadLevel_' + CaseName + '.csv', sep=',', index=False)
 
@@ -1,23 +1,23 @@
 import os
+import sys
 
 import matplotlib.pyplot as mpl
 import numpy as np
 import pandas as pd
 
 import pandapower as pp
-import pandapower.converter as cv
 import pandapower.plotting as plt
+from pandapower.converter.pypower import from_ppc
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+from rts_gmlc.ppc import create_branch, create_bus, create_gen
+from rts_gmlc.source_data import read_table
 
 DIGITS = 5
 miles_to_km = 1.60934
 baseMVA = 100.
 
 
-def _read_csv(table):
-    start_path = os.path.join("..", "..", "SourceData")
-    return pd.read_csv(os.path.join(start_path, table + ".csv"))
-
-
 def plot_net(net, ax=None):
     if ax is None:
         fig, ax = mpl.subplots(1, 1, figsize=(10, 7))
@@ -53,155 +53,112 @@ def plot_net(net, ax=None):
     mpl.close()
 
 
-def create_buses():
-    busdata = _read_csv("bus")
-    buses = np.zeros((len(busdata), 15), dtype=float)
-    for ind, (i, b) in enumerate(busdata.iterrows()):
-        buses[ind, 0] = b['Bus ID']
-        if b['Bus Type'] == 'PQ':
-            buses[ind, 1] = 1
-        elif b['Bus Type'] == 'PV':
-            buses[ind, 1] = 2
-        elif b['Bus Type'] == 'Ref':
-            buses[ind, 1] = 3
-        else:
-            buses[ind, 1] = 4
-        buses[ind, 2] = b['MW Load']
-        buses[ind, 3] = b['MVAR Load']
-        buses[ind, 4] = b['MW Shunt G']
-        buses[ind, 5] = b['MVAR Shunt B']
-        buses[ind, 6] = b['Area']
-        buses[ind, 7] = b['V Mag']
-        buses[ind, 8] = b['V Angle']
-        buses[ind, 9] = b['BaseKV']
-        buses[ind, 10] = int(b['Zone'])
-        buses[ind, 11] = 1.05  # default
-        buses[ind, 12] = 0.95  # default
-        buses[ind, 13] = DIGITS
-    return buses
-
-
-def create_branches():
-    branchdata = _read_csv("branch")
-    branches = np.zeros((len(branchdata), 14), dtype=float)
-    for ind, (i, b) in enumerate(branchdata.iterrows()):
-        branches[ind, 0] = int(b['From Bus'])
-        branches[ind, 1] = int(b['To Bus'])
-        branches[ind, 2] = b['R']
-        branches[ind, 3] = b['X']
-        branches[ind, 4] = b['B']
-        branches[ind, 5] = b['Cont Rating']
-        branches[ind, 6] = b['Cont Rating']
-        branches[ind, 7] = b['Cont Rating']
-        branches[ind, 8] = b['Tr Ratio']
-        branches[ind, 9] = 0.0  # default
-        branches[ind, 10] = 1  # default
-        branches[ind, 11] = -180  # default
-        branches[ind, 12] = 180  # default
-        branches[ind, 13] = DIGITS
-    return branches
-
-
-def create_gens():
-    gendata = _read_csv("gen")
-    gens = np.zeros((len(gendata), 21), dtype=float)
-    for ind, (i, g) in enumerate(gendata.iterrows()):
-        gens[ind, 0] = g['Bus ID']
-        gens[ind, 1] = g['MW Inj']
-        gens[ind, 2] = g['MVAR Inj']
-        gens[ind, 3] = g['QMax MVAR']
-        gens[ind, 4] = g['QMin MVAR']
-        gens[ind, 5] = g['V Setpoint p.u.']
-        gens[ind, 6] = 100.0  # default
-        if g['Fuel'] in ['Wind', 'Solar', 'Storage']:
-            gens[ind, 7] = 0
-        else:
-            gens[ind, 7] = 1  # default
-        gens[ind, 8] = g['PMax MW']
-        gens[ind, 9] = g['PMin MW'] if not np.isnan(g['PMin MW']) else 0  # g['Output_pct_0'] * g['Unit Size']
-        gens[ind, 10] = 0.0  # default
-        gens[ind, 11] = 0.0  # default
-        gens[ind, 12] = 0.0  # default
-        gens[ind, 12] = 0.0  # default
-        gens[ind, 13] = 0.0  # default
-        gens[ind, 14] = 0.0  # default
-        gens[ind, 15] = g['Ramp Rate MW/Min']
-        gens[ind, 16] = g['Ramp Rate MW/Min']
-        gens[ind, 17] = g['Ramp Rate MW/Min']
-        gens[ind, 18] = g['Ramp Rate MW/Min']
-        gens[ind, 19] = 0.0  # default
-        gens[ind, 20] = DIGITS
-
-    return gens
-
-
-def create_ppc():
+def create_buses(folder=None):
+    # the buses of rts_gmlc.ppc with the number of digits and a zero column
+    buses = create_bus(read_table("bus", folder))
+    n = len(buses)
+    return np.column_stack([buses, np.full(n, DIGITS), np.zeros(n)])
+
+
+def create_branches(folder=None):
+    # the branches of rts_gmlc.ppc with the number of digits
+    branches = create_branch(read_table("branch", folder))
+    return np.column_stack([branches, np.full(len(branches), DIGITS)])
+
+
+def create_gens(folder=None):
+    return create_gen(read_table("gen", folder))
+
+
+def create_ppc(folder=None):
     ppc = dict()
     ppc["baseMVA"] = baseMVA
     # ppc["areas"] =
-    ppc["bus"] = create_buses()
-    ppc["branch"] = create_branches()
-    ppc["gen"] = create_gens()
+    ppc["bus"] = create_buses(folder)
+    ppc["branch"] = create_branches(folder)
+    ppc["gen"] = create_gens(folder)
 
     return ppc
 
 
-def _update_line_data(net, branch_data, element="line"):
-    b = net["bus"].loc[:, "id"].values.astype(int)
-    from_var = "from_bus"
-    to_var = "to_bus"
-
-    for i in branch_data.index:
-        a = branch_data.loc[i, ["From Bus", "To Bus"]].values.astype(int)
-        bus_ind = np.where(np.in1d(b, a))[0]
-        element_rows = (net[element].loc[:, [from_var, to_var]] == bus_ind).values
-        element_index = element_rows[:, 0] & element_rows[:, 1]
-        net[element].loc[element_index, "name"] = branch_data.at[i, "UID"]
-        net[element].loc[element_index, "length_km"] = branch_data.at[i, "Length"] * miles_to_km
-
-
-def create_trafo_c35(net, branch_data):
-    rk = branch_data.loc[119, 'R']
-    xk = branch_data.loc[119, 'X']
+def _circuits(from_bus, to_bus):
+    # the unordered bus pair of every branch and its circuit number among the
+    # branches between the same pair, in their order
+    keys = pd.DataFrame({"lo": np.minimum(from_bus, to_bus),
+                         "hi": np.maximum(from_bus, to_bus)})
+    keys["circuit"] = keys.groupby(["lo", "hi"]).cumcount()
+    return keys
+
+
+def _match_branches(net, branch_data, element, from_var, to_var):
+    # the row of branch_data of every row of net[element], by a hash join on
+    # the bus pair and circuit number (from_ppc keeps the order of the
+    # branches, parallel circuits are matched in that order)
+    bus_index = pd.Series(net["bus"].index, index=net["bus"]["id"].values)
+    branches = _circuits(bus_index.loc[branch_data["From Bus"]].values,
+                         bus_index.loc[branch_data["To Bus"]].values)
+    branches["row"] = branch_data.index
+    elements = _circuits(net[element][from_var].values, net[element][to_var].values)
+    matched = elements.merge(branches, how="left", on=["lo", "hi", "circuit"])
+    if matched["row"].isna().any():
+        raise ValueError("{} {} rows do not match any branch".format(
+            matched["row"].isna().sum(), element))
+    return pd.Series(matched["row"].values.astype(int), index=net[element].index)
+
+
+def create_trafo_from_branch(net, branch, hv_bus, lv_bus):
+    rk = branch['R']
+    xk = branch['X']
     zk = (rk ** 2 + xk ** 2) ** 0.5
-    sn = branch_data.loc[119, 'Cont Rating']
-    i0_percent = -branch_data.loc[119, 'B'] * 100 * baseMVA / sn
+    sn = branch['Cont Rating']
+    i0_percent = -branch['B'] * 100 * baseMVA / sn
 
-    pp.create_transformer_from_parameters(net, hv_bus=70, lv_bus=72, sn_mva=sn,
-                                          vn_hv_kv=net.bus.loc[70, "vn_kv"], vn_lv_kv=net.bus.loc[72, "vn_kv"],
+    pp.create_transformer_from_parameters(net, hv_bus=hv_bus, lv_bus=lv_bus, sn_mva=sn,
+                                          vn_hv_kv=net.bus.loc[hv_bus, "vn_kv"], vn_lv_kv=net.bus.loc[lv_bus, "vn_kv"],
                                           vk_percent=np.sign(xk) * zk * sn * 100 / baseMVA,
                                           vkr_percent=rk * sn * 100 / baseMVA, max_loading_percent=100,
                                           i0_percent=i0_percent, pfe_kw=0.,
-                                          tap_side="lv", tap_neutral=0, name=branch_data.loc[119, "UID"],
+                                          tap_side="lv", tap_neutral=0, name=branch["UID"],
                                           shift_degree=0., tap_step_percent=1.5, tap_pos=0, tap_phase_shifter=False)
 
 
-def add_additional_information(net):
-    bus_data = _read_csv("bus")
-    # store bus id
-    net["bus"].loc[:, "id"] = net["bus"].loc[:, "name"].values
+def add_additional_information(net, ppc, folder=None):
+    bus_data = read_table("bus", folder)
+    # store bus id, as int32 (and the bus type and zone as categoricals) like
+    # the extra attributes of the other converters
+    net["bus"]["id"] = ppc["bus"][:, 0].astype(np.int32)
+    net["bus"]["type"] = net["bus"]["type"].astype("category")
+    net["bus"]["zone"] = net["bus"]["zone"].astype("category")
     # check if indices are identical
     assert np.allclose(bus_data["Bus ID"].values.astype(int), net["bus"].loc[:, "id"].values.astype(int))
     # bus names
-    net["bus"].loc[:, "name"] = bus_data.loc[:, "Bus Name"]
+    net["bus"].loc[:, "name"] = bus_data.loc[:, "Bus Name"].values
 
     # bus geodata
-    net["bus_geodata"] = pd.DataFrame(index=np.arange(len(bus_data)), columns=["x", "y", "coords"])
+    net["bus_geodata"] = pd.DataFrame(index=net["bus"].index, columns=["x", "y", "coords"])
     net["bus_geodata"].loc[:, ["x", "y"]] = bus_data.loc[:, ["lat", "lng"]].values
-
-    # correct line names and lengths
-    branch_data = _read_csv("branch")
-    _update_line_data(net, branch_data, element="line")
-
-    # 104 is a transformer, not a line
-    net["line"].drop(104, inplace=True)
-    create_trafo_c35(net, branch_data)
-    # set trafo names
-    net.trafo.loc[:, "name"] = branch_data.loc[branch_data.loc[:, "Length"] == 0.0, "UID"]
-
-    # manual corrections
-    net["line"].loc[102:103, "name"] = branch_data.loc[117:118, "UID"].values
-    net["line"].loc[102:103, "length_km"] = branch_data.loc[117:118, "Length"].values * miles_to_km
+    if "geo" in net["bus"]:
+        # pandapower >= 3.0 keeps the coordinates as GeoJSON in net.bus.geo
+        net["bus"]["geo"] = ['{"type": "Point", "coordinates": [%r, %r]}' % (x, y) for x, y in
+                             bus_data.loc[:, ["lat", "lng"]].values]
+
+    # line names and lengths
+    branch_data = read_table("branch", folder)
+    line_branch = _match_branches(net, branch_data, "line", "from_bus", "to_bus")
+    net["line"].loc[:, "name"] = branch_data.loc[line_branch, "UID"].values
+    net["line"].loc[:, "length_km"] = branch_data.loc[line_branch, "Length"].values * miles_to_km
+
+    # the transformers between buses of the same voltage (C35) are
+    # converted to lines
+    tap = branch_data.loc[line_branch, "Tr Ratio"].values != 0
+    for i in net["line"].index[tap]:
+        create_trafo_from_branch(net, branch_data.loc[line_branch[i]], net["line"].at[i, "from_bus"],
+                                 net["line"].at[i, "to_bus"])
+    net["line"].drop(net["line"].index[tap], inplace=True)
+
+    # trafo names
+    trafo_branch = _match_branches(net, branch_data, "trafo", "hv_bus", "lv_bus")
+    net["trafo"].loc[:, "name"] = branch_data.loc[trafo_branch, "UID"].values
 
     # correct R, X, and C (since they are in per_km)
     net["line"].loc[:, "r_ohm_per_km"] /= net["line"].loc[:, "length_km"].values
@@ -212,26 +169,39 @@ def add_additional_information(net):
     return net
 
 
-def create_pp_from_ppc():
+def create_pp_from_ppc(folder=None, output="pandapower_net.json", plot=True):
     # create ppc
-    ppc = create_ppc()
+    ppc = create_ppc(folder)
     # convert it to a pandapower net
-    net = cv.from_ppc(ppc, validate_conversion=False)
+    net = from_ppc(ppc, validate_conversion=False)
     # run a power flow
     pp.runpp(net)
     vm_pu_before = net.res_bus.vm_pu.values
     # manual corrections and additional information such as line length in km and names
-    net = add_additional_information(net)
+    net = add_additional_information(net, ppc, folder)
     # run power flow again and validate results
     pp.runpp(net)
     vm_pu_after = net.res_bus.vm_pu.values
     # power flow results should not change
     assert np.allclose(vm_pu_after, vm_pu_before)
     # save it
-    pp.to_json(net, "pandapower_net.json")
+    pp.to_json(net, output)
     # plot it :)
-    plot_net(net)
+    if plot:
+        plot_net(net)
 
 
 if __name__ == "__main__":
-    create_pp_from_ppc()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-input_folder', type=str, default=None,
+        help='input folder with RTS-GMLC source data, ../../SourceData/ '
+        'of the cloned repository by default')
+    parser.add_argument('-output', type=str, default='pandapower_net.json',
+        help='output json file')
+    parser.add_argument('-no_plot', action='store_true',
+        help='do not plot the network')
+    args = parser.parse_args()
+
+    create_pp_from_ppc(args.input_folder, args.output, not args.no_plot)
@@ -0,0 +1,10 @@
+"""
+Shared helpers for the RTS-GMLC format converters.
+
+The scripts in the sibling folders (MATPOWER, PyPSA, pandapower, Prescient,
+openTEPES, GIS) add the FormattedData folder to ``sys.path`` and import the
+SourceData tables through this package, so that every table is parsed only
+once per process.
+"""
+
+from .source_data import TABLES, SOURCE_DATA_FOLDER, read_table, clear_cache
@@ -0,0 +1,235 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .manifest import Manifest, code_files, input_hashes, path_hash
+
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+FORMATTED_DATA_FOLDER = os.path.realpath(os.path.join(curr_dir, ".."))
+
+MANIFEST_FILE = "build_manifest.json"
+
+# `cwd` is relative to FormattedData, `outputs` are moved from `cwd` into
+# `folder` when they are different. `inputs` lists the SourceData tables the
+# converter reads, which are hashed whole (a column it starts reading can not
+# be missed), "timeseries" the simulations whose data files it reads and
+# "files" other files it reads, relative to FormattedData.
+Target = namedtuple("Target", ["folder", "cwd", "script", "args", "outputs",
+    "depends", "inputs"])
+
+
+def tables(*names, **inputs):
+    # the inputs of a target: every column of the tables `names`
+    inputs.update(dict.fromkeys(names))
+    return inputs
+
+
+TARGETS = {
+    "matpower": Target("MATPOWER", "MATPOWER", "cli.py", [],
+        ["RTS_GMLC.m"], [], tables("bus", "branch", "gen", "dc_branch")),
+    "pypower": Target("PyPower", "PyPower", "run.py", [],
+        ["caseRTSGMLC_ppc.py"], [], tables("bus", "branch", "gen",
+        "dc_branch")),
+    "pypsa": Target("PyPSA", "PyPSA", "script.py", [],
+        ["PyPSA_RTS-GMLC.h5"], [], tables("bus", "branch", "gen",
+        "dc_branch", "storage")),
+    "pandapower": Target("pandapower", "pandapower", "source_data_to_pp.py",
+        [], ["pandapower_net.json"], [], tables("bus", "branch", "gen")),
+    # topysp.py is executed from the SourceData directory
+    "prescient": Target("Prescient", os.path.join("..", "SourceData"),
+        "topysp.py", [], ["rts_gmlc.dat", "sources.txt"], [], tables("bus",
+        "branch", "gen", "timeseries_pointers", "simulation_objects",
+        timeseries=["DAY_AHEAD"], files=[os.path.join("PLEXOS",
+        "PLEXOS_Solution", "DAY_AHEAD Solution Files", "noTX",
+        "on_time_7.12.csv")])),
+    "opentepes": Target("openTEPES", "openTEPES",
+        "Create_openTEPES_RTS-GMLC.py", [], ["RTS-GMLC"], [], tables("bus",
+        "branch", "gen", "storage", timeseries=["DAY_AHEAD"])),
+    "gis": Target("GIS", "GIS", "csv2geojson.py", [],
+        ["bus.geojson", "branch.geojson", "gen.geojson", "gen_conn.geojson"],
+        [], tables("bus", "branch", "gen")),
+}
+
+Result = namedtuple("Result", ["name", "status", "seconds", "log",
+    "reason"])
+
+# statuses of a target that its dependents can use
+BUILT = ("ok", "current")
+
+
+def resolve(names=None, targets=TARGETS):
+    """
+    Return the requested targets and everything they depend on, in an order
+    where every target comes after its dependencies.
+    """
+    if names is None:
+        names = list(targets)
+    order = []
+
+    def visit(name, path):
+        if name not in targets:
+            raise KeyError("unknown target '{}'".format(name))
+        if name in path:
+            raise ValueError("circular dependency: {}".format(
+                " -> ".join(path + [name])))
+        if name in order:
+            return
+        for dep in targets[name].depends:
+            visit(dep, path + [name])
+        order.append(name)
+
+    for name in names:
+        visit(name, [])
+
+    return order
+
+
+def run_target(name, target, root=FORMATTED_DATA_FOLDER):
+    """Run the script of a target in its working directory."""
+    cwd = os.path.realpath(os.path.join(root, target.cwd))
+    folder = os.path.join(root, target.folder)
+    env = dict(os.environ, MPLBACKEND="Agg")
+
+    start = time.time()
+    proc = subprocess.run([sys.executable, os.path.join(folder,
+        target.script)] + list(target.args), cwd=cwd, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        universal_newlines=True)
+    if proc.returncode == 0 and cwd != os.path.realpath(folder):
+        for output in target.outputs:
+            dest = os.path.join(folder, output)
+            if os.path.isdir(dest):
+                shutil.rmtree(dest)
+            shutil.move(os.path.join(cwd, output), dest)
+
+    status = "ok" if proc.returncode == 0 else "failed"
+    return Result(name, status, time.time() - start, proc.stdout, None)
+
+
+def target_hashes(name, targets=TARGETS, root=FORMATTED_DATA_FOLDER):
+    """
+    Return the hashes of the inputs (SourceData columns, time series files,
+    converter code and outputs of its dependencies) and of the current
+    outputs of a target.
+    """
+    target = targets[name]
+    folder = os.path.join(root, target.folder)
+    code = code_files(folder, exclude=target.outputs) + \
+        code_files(curr_dir, exclude=["build.py", "manifest.py"])
+    source_data = os.path.join(root, "..", "SourceData")
+
+    inputs = input_hashes(target.inputs, code, source_data, root)
+    for dep in target.depends:
+        for output in targets[dep].outputs:
+            inputs["output:{}/{}".format(dep, output)] = path_hash(
+                os.path.join(root, targets[dep].folder, output))
+    outputs = {output: path_hash(os.path.join(folder, output))
+        for output in target.outputs}
+
+    return inputs, outputs
+
+
+def build(names=None, jobs=None, force=False, targets=TARGETS,
+        root=FORMATTED_DATA_FOLDER, report=print):
+    """
+    Build the requested targets (all by default) and their dependencies.
+
+    A target starts as soon as all its dependencies are built, with at most
+    `jobs` converters running at the same time (one per CPU by default), so
+    a full rebuild takes about as long as the slowest chain of converters.
+    Targets whose dependencies failed are skipped.
+
+    The hashes of the inputs and outputs of every built target are stored in
+    the build manifest. A target whose inputs and outputs match the manifest
+    is not run again, unless it is one of the requested `names` and `force`
+    is set; otherwise the reason is reported with its wall time. The results
+    are returned in build order.
+    """
+    order = resolve(names, targets)
+    jobs = jobs or os.cpu_count() or 1
+    manifest = Manifest(os.path.join(root, MANIFEST_FILE))
+
+    results = {}
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(results) < len(order):
+            for name in order:
+                if name in results or name in [r[0] for r in
+                        running.values()]:
+                    continue
+                deps = [results.get(d) for d in targets[name].depends]
+                if any(r is not None and r.status not in BUILT for r in deps):
+                    results[name] = Result(name, "skipped", 0.0, None,
+                        "a dependency was not built")
+                elif all(r is not None for r in deps):
+                    inputs, outputs = target_hashes(name, targets, root)
+                    forced = force and (names is None or name in names)
+                    reason = "forced" if forced else \
+                        manifest.stale(name, inputs, outputs)
+                    if reason is None:
+                        results[name] = Result(name, "current", 0.0, None,
+                            "inputs and outputs unchanged")
+                    else:
+                        future = pool.submit(run_target, name, targets[name],
+                            root)
+                        running[future] = (name, inputs, reason)
+                else:
+                    continue
+                if name in results:
+                    report("{:<12} {:<8} {:>10}   {}".format(name,
+                        results[name].status, "", results[name].reason))
+            if not running:
+                continue
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name, inputs, reason = running.pop(future)
+                result = future.result()._replace(reason=reason)
+                results[name] = result
+                if result.status == "ok":
+                    manifest.record(name, inputs,
+                        target_hashes(name, targets, root)[1])
+                else:
+                    manifest.forget(name)
+                report("{:<12} {:<8} {:8.1f} s   {}".format(name,
+                    result.status, result.seconds, reason))
+
+    return sorted(results.values(), key=lambda r: order.index(r.name))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the FormattedData '
+        'outputs from SourceData.')
+    parser.add_argument('targets', nargs='*',
+                        help='targets to build, all by default: ' +
+                        ', '.join(TARGETS))
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of converters run at the same time')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='rebuild the targets that are up to date')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='print the output of every converter')
+
+    args = parser.parse_args()
+
+    try:
+        resolve(args.targets or None)
+    except KeyError as e:
+        parser.error(e.args[0])
+
+    start = time.time()
+    results = build(args.targets or None, jobs=args.jobs,
+        force=args.force)
+    print("{:<12} {:<8} {:8.1f} s".format("total", "", time.time() - start))
+
+    for result in results:
+        if result.log and (args.verbose or result.status != "ok"):
+            print("\n--- {} ({})\n{}".format(result.name, result.status,
+                result.log.rstrip()))
+
+    sys.exit(any(r.status not in BUILT for r in results))
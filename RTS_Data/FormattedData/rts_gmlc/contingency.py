@@ -0,0 +1,413 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+from .dcpf import dc_flows, ptdf, reference_buses, topology
+from .powerflow import _Network, hourly_injections
+from .ppc import create_ppc
+from .source_data import read_table
+
+# bytes of the post-contingency flows (8 per branch, outage and hour, and 1
+# for their overload flag) computed at once by `screen`
+SCREEN_MEMORY = 2 ** 28
+
+# outages whose PTDF from one end to the other is this close to 1 split
+# the network
+ISLANDING_TOLERANCE = 1e-8
+
+# p.u. beyond Vmin and Vmax before a voltage counts as a violation, as the
+# generator buses sit at their set points (some at Vmax) up to round-off
+VOLTAGE_TOLERANCE = 1e-6
+
+AC_COLUMNS = ["Contingency", "Islanded Buses", "Converged", "Iterations",
+    "Overloads", "Worst Branch", "Max Loading", "Low Voltages",
+    "High Voltages", "Min Vm", "Max Vm"]
+
+VIOLATION_COLUMNS = ["DateTime", "Outage", "Branch", "Flow MW", "LTE Rating",
+    "STE Rating", "Loading", "Limit", "Islanding", "Perm OutRate",
+    "Tran OutRate"]
+
+
+def without(topo, k):
+    """Return the `Topology` without the AC branch at position `k`, with a
+    reference bus in each island it leaves."""
+    keep = np.arange(len(topo.f)) != k
+    f, t = topo.f[keep], topo.t[keep]
+    return topo._replace(branch=topo.branch[keep], f=f, t=t, x=topo.x[keep],
+        ref=reference_buses(len(topo.bus), f, t, topo.ref))
+
+
+def lodf(topo):
+    """
+    Return the line outage distribution factors of a `Topology`: the change
+    of the flow of every branch (rows) per MW flowing on the branch that is
+    out (columns) before the outage, -1 on the diagonal, derived from the
+    cached PTDF. The second array flags the outages that split the network,
+    whose columns are NaN (see `islanding_flows`).
+    """
+    P = ptdf(topo)
+    H = P[:, topo.f] - P[:, topo.t]
+    d = 1.0 - np.diag(H)
+    islanding = d < ISLANDING_TOLERANCE
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factors = H / np.where(islanding, np.nan, d)[None, :]
+    np.fill_diagonal(factors, -1.0)
+    factors[:, islanding] = np.nan
+    return factors, islanding
+
+
+def islanding_flows(topo, k, p, dc_flow=None):
+    """
+    Return the DC power flow (branches x hours) after the outage of the
+    branch at position `k` that splits the network, solved on the topology
+    without it: every island is balanced by its own reference bus, so the
+    injections left outside the island of the Ref bus are not served
+    through it. The flow of the branch that is out is 0.
+    """
+    flows = dc_flows(without(topo, k), p, dc_flow)
+    return np.insert(flows, k, 0.0, axis=0)
+
+
+def screen(topo, p, ratings, dc_flow=None, outages=None,
+        memory=SCREEN_MEMORY):
+    """
+    Screen the N-1 outages of a `Topology` over every hour of the
+    injections `p` (buses x hours, MW) and return the overloads as an array
+    of (monitored branch, outage, hour) positions with their
+    post-contingency flows, and the flags of the islanding outages.
+
+    `ratings` is the emergency limit of every branch, `outages` the
+    positions of the AC branches to take out (all by default) and
+    `dc_flow` the transfers of the HVDC links, which are taken out too. The
+    post-contingency flows of all the outages and hours of a chunk are
+    computed in one array operation from the pre-contingency flows and the
+    LODFs (for the links, the PTDF between their ends); the islanding
+    outages are solved on their own topology. The chunks take as many hours,
+    then outages, as fit in `memory` bytes.
+    """
+    hours = p.shape[1]
+    if outages is None:
+        outages = np.arange(len(topo.f))
+    outages = np.asarray(outages, dtype=np.int64)
+    base = dc_flows(topo, p, dc_flow)
+
+    factors, islanding = lodf(topo)
+    sensitivity = factors[:, outages]
+    flow_out = base[outages]
+    if dc_flow is not None and len(topo.dc_f):
+        # losing a link undoes its transfer
+        P = ptdf(topo)
+        sensitivity = np.hstack([sensitivity, P[:, topo.dc_f] -
+            P[:, topo.dc_t]])
+        dc = np.broadcast_to(np.asarray(dc_flow, dtype=np.float64).reshape(
+            len(topo.dc_f), -1), (len(topo.dc_f), hours))
+        flow_out = np.vstack([flow_out, dc])
+    islands = dict((i, islanding_flows(topo, k, p, dc_flow)) for i, k in
+        enumerate(outages) if islanding[k])
+    sensitivity = np.where(np.isnan(sensitivity), 0.0, sensitivity)
+
+    cells = max(1, memory // (9 * len(topo.f)))
+    chunk_hours = min(hours, cells)
+    chunk_outages = max(1, cells // chunk_hours)
+
+    found = []
+    limit = np.asarray(ratings, dtype=np.float64)[:, None, None]
+    for o0 in range(0, len(flow_out), chunk_outages):
+        o1 = min(o0 + chunk_outages, len(flow_out))
+        # the AC branches of the chunk, which carry nothing once out
+        ac = np.arange(o0, min(o1, len(outages)))
+        for h0 in range(0, hours, chunk_hours):
+            h1 = min(h0 + chunk_hours, hours)
+            post = base[:, None, h0:h1] + sensitivity[:, o0:o1, None] * \
+                flow_out[None, o0:o1, h0:h1]
+            for i in ac[np.isin(ac, list(islands))]:
+                post[:, i - o0] = islands[i][:, h0:h1]
+            post[outages[ac], ac - o0] = 0.0
+            branch, outage, hour = np.nonzero(np.abs(post) > limit)
+            found.append((branch, outage + o0, hour + h0,
+                post[branch, outage, hour]))
+
+    branch, outage, hour, flow = [np.concatenate(c) for c in zip(*found)]
+    return (branch, outage, hour, flow), islanding[outages]
+
+
+def screen_n1(folder=None, simulation="DAY_AHEAD", start=None, end=None,
+        dc_flow=None, memory=SCREEN_MEMORY):
+    """
+    Return the N-1 overloads of every hour of a `simulation` of the
+    SourceData in `folder` as a DataFrame with one row per monitored
+    branch, outage and hour whose post-contingency DC flow exceeds the LTE
+    Rating (Limit "LTE") or also the STE Rating ("STE"). Every AC branch and
+    HVDC link is taken out in turn; the injections are those of
+    `powerflow.hourly_injections` and the links carry `dc_flow`, by default
+    their MW Load. The outage rates of branch.csv (0 for the links) come
+    along to weigh the violations.
+    """
+    topo = topology(folder)
+    branch = read_table("branch", folder)
+    dc_branch = read_table("dc_branch", folder)
+    injections = hourly_injections(folder, simulation, start, end)
+    gen_bus = pd.Index(topo.bus).get_indexer(read_table("gen",
+        folder)["Bus ID"])
+    p = -injections.pd.T
+    np.add.at(p, gen_bus, injections.pg.T)
+    if dc_flow is None:
+        dc_flow = dc_branch["MW Load"].to_numpy(dtype=np.float64)
+
+    lte = branch["LTE Rating"].to_numpy(dtype=np.float64)
+    ste = branch["STE Rating"].to_numpy(dtype=np.float64)
+    (b, o, h, flow), islanding = screen(topo, p, lte, dc_flow,
+        memory=memory)
+
+    names = np.r_[topo.branch, topo.dc_branch]
+    zeros = np.zeros(len(topo.dc_branch))
+    perm = np.r_[branch["Perm OutRate"].to_numpy(dtype=np.float64), zeros]
+    tran = np.r_[branch["Tran OutRate"].to_numpy(dtype=np.float64), zeros]
+    islanding = np.r_[islanding, zeros.astype(bool)]
+
+    loading = np.abs(flow) / lte[b]
+    violations = pd.DataFrame({
+        "DateTime": injections.index[h],
+        "Outage": names[o],
+        "Branch": topo.branch[b],
+        "Flow MW": flow,
+        "LTE Rating": lte[b],
+        "STE Rating": ste[b],
+        "Loading": loading,
+        "Limit": np.where(np.abs(flow) > ste[b], "STE", "LTE"),
+        "Islanding": islanding[o],
+        "Perm OutRate": perm[o],
+        "Tran OutRate": tran[o],
+    }, columns=VIOLATION_COLUMNS)
+    return violations.sort_values(["DateTime", "Outage", "Branch"],
+        ignore_index=True)
+
+
+def outage_sets(n, order=1):
+    """Return every combination of `order` of `n` branches, as tuples of
+    positions (all the N-1 or N-2 contingencies)."""
+    return list(itertools.combinations(range(n), order))
+
+
+def _share(arrays):
+    # copy the arrays into one shared memory block, to be attached by the
+    # workers without pickling them, each aligned on 16 bytes
+    offsets, size = [], 0
+    for a in arrays.values():
+        offsets.append(size)
+        size += -(-a.nbytes // 16) * 16
+    shm = SharedMemory(create=True, size=max(size, 1))
+    layout = []
+    for (name, a), offset in zip(arrays.items(), offsets):
+        np.ndarray(a.shape, a.dtype, buffer=shm.buf, offset=offset)[...] = a
+        layout.append((name, a.shape, a.dtype.str, offset))
+    return shm, layout
+
+
+def _attach(name, layout):
+    shm = SharedMemory(name=name)
+    return shm, dict((key, np.ndarray(shape, dtype, buffer=shm.buf,
+        offset=offset)) for key, shape, dtype, offset in layout)
+
+
+class _ACCases(object):
+    # the base case of the AC contingency runs, built once per process
+
+    def __init__(self, arrays, names, ppopt):
+        self.arrays = arrays
+        ppc = {"baseMVA": float(arrays["base_mva"][0]), "bus": arrays["bus"],
+            "gen": arrays["gen"], "branch": arrays["branch"]}
+        self.network = _Network(ppc)
+        self.sbus = self.network.sbus(ppc["bus"][None, :, 2],
+            ppc["bus"][None, :, 3], ppc["gen"][None, :, 1],
+            ppc["baseMVA"])[0]
+        if "column_order" in arrays:
+            # the Jacobian layout of the base case, ordered in the parent
+            self.network.set_layout(arrays)
+        self.names = names
+        self.tol, self.max_it = ppopt["PF_TOL"], ppopt["PF_MAX_IT"]
+
+    def base(self):
+        # the voltages of the base case and the layout of its Jacobian in
+        # the column order of its factorization
+        V, converged = self.network.newton(self.sbus, self.network.V0,
+            self.tol, self.max_it)[:2]
+        if not converged:
+            raise ValueError("the base case does not converge")
+        return V, self.network.order_columns(V)
+
+    def islanded(self, outages):
+        # buses left without a path to the reference bus
+        net = self.network
+        keep = np.ones(len(net.f), dtype=bool)
+        keep[list(outages)] = False
+        n = net.nbus
+        graph = csr_matrix((np.ones(keep.sum()), (net.f[keep], net.t[keep])),
+            shape=(n, n))
+        islands = connected_components(graph, directed=False)[1]
+        return int((~np.isin(islands, islands[net.ref])).sum())
+
+    def run(self, outages):
+        name = "+".join(self.names[k] for k in outages)
+        lost = self.islanded(outages)
+        if lost:
+            return [name, lost, False, 0, 0, None] + [np.nan] * 5
+
+        network = self.network.without(outages)
+        V, converged, iterations = network.newton(self.sbus,
+            self.arrays["V"].copy(), self.tol, self.max_it)[:3]
+        if not converged:
+            return [name, 0, False, iterations, 0, None] + [np.nan] * 5
+
+        sf, st = network.branch_flows(V)
+        loading = np.maximum(np.abs(sf), np.abs(st)) * \
+            self.arrays["base_mva"][0] / self.arrays["ratings"]
+        vm = np.abs(V)
+        vmin, vmax = self.arrays["bus"][:, 12], self.arrays["bus"][:, 11]
+        worst = int(np.argmax(loading))
+        return [name, 0, True, iterations, int((loading > 1).sum()),
+            self.names[worst], loading[worst],
+            int((vm < vmin - VOLTAGE_TOLERANCE).sum()),
+            int((vm > vmax + VOLTAGE_TOLERANCE).sum()), vm.min(), vm.max()]
+
+
+_CASES = {}
+
+
+def _init_ac_worker(shm_name, layout, names, ppopt):
+    shm, arrays = _attach(shm_name, layout)
+    _CASES["shm"] = shm
+    _CASES["cases"] = _ACCases(arrays, names, ppopt)
+
+
+def _run_ac_chunk(chunk):
+    cases = _CASES["cases"]
+    return [cases.run(outages) for outages in chunk]
+
+
+def screen_ac(ppc, outages=None, ratings=None, names=None, jobs=None,
+        ppopt=None):
+    """
+    Run the AC power flow of the contingencies `outages` (tuples of branch
+    positions, all the N-1 by default, see `outage_sets`) of the PyPower
+    case `ppc` and return one row per contingency (see `AC_COLUMNS`): the
+    buses it islands (such cases are not solved), the convergence, the
+    branches loaded above `ratings` (MVA at either end, RATE_C of the case
+    by default) with the worst one, and the buses outside [Vmin, Vmax].
+    `names` label the branches, by default with their position.
+
+    The base case is solved once and every contingency starts from its
+    voltages. An outage only subtracts the branch admittances from Ybus,
+    so every case reuses the Jacobian layout and the column order of the
+    LU factorization of the base case. The contingencies are split among
+    `jobs` processes (all the CPUs by default, in this process with 1),
+    which attach to the base case arrays, its voltages and that layout in
+    shared memory.
+    """
+    from pypower.ppoption import ppoption
+
+    if ppopt is None:
+        ppopt = ppoption()
+    branch = np.asarray(ppc["branch"], dtype=np.float64)
+    if outages is None:
+        outages = outage_sets(len(branch))
+    outages = [tuple(int(k) for k in o) for o in outages]
+    if ratings is None:
+        ratings = branch[:, 7]
+    if names is None:
+        names = [str(k) for k in range(len(branch))]
+    names = list(names)
+
+    arrays = {
+        "base_mva": np.array([ppc["baseMVA"]], dtype=np.float64),
+        "bus": np.asarray(ppc["bus"], dtype=np.float64),
+        "gen": np.asarray(ppc["gen"], dtype=np.float64),
+        "branch": branch,
+        "ratings": np.asarray(ratings, dtype=np.float64),
+    }
+    cases = _ACCases(arrays, names, ppopt)
+    arrays["V"], layout = cases.base()
+    arrays.update(layout)
+
+    if jobs == 1:
+        rows = [cases.run(o) for o in outages]
+    else:
+        shm, layout = _share(arrays)
+        try:
+            with ProcessPoolExecutor(jobs, initializer=_init_ac_worker,
+                    initargs=(shm.name, layout, names, ppopt)) as pool:
+                # a few chunks per process, so that they finish together
+                n = 4 * (jobs or os.cpu_count() or 1)
+                chunks = [outages[i::n] for i in range(n)]
+                rows = [None] * len(outages)
+                for i, result in enumerate(pool.map(_run_ac_chunk, chunks)):
+                    rows[i::n] = result
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(rows, columns=AC_COLUMNS)
+
+
+def screen_ac_n1(folder=None, order=1, outages=None, jobs=None):
+    """
+    Run `screen_ac` on the case of the SourceData in `folder` built by
+    `rts_gmlc.ppc.create_ppc`, against the LTE Rating of branch.csv, for all
+    the contingencies of `order` branches or for `outages`, tuples of branch
+    UIDs (e.g. the outages flagged by `screen_n1`).
+    """
+    branch = read_table("branch", folder)
+    uid = pd.Index(branch["UID"])
+    if outages is None:
+        outages = outage_sets(len(uid), order)
+    else:
+        outages = [uid.get_indexer([o] if isinstance(o, str) else o) for o
+            in outages]
+        if any((o < 0).any() for o in outages):
+            raise KeyError("unknown branch in the outages")
+    return screen_ac(create_ppc(folder, names=False), outages,
+        branch["LTE Rating"].to_numpy(dtype=np.float64), list(uid), jobs)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Screen the outages of "
+        "the RTS-GMLC: N-1 with DC power flows over every hour, or N-1 and "
+        "N-2 with AC power flows on the peak case.")
+    parser.add_argument("output", help="csv file of the results")
+    parser.add_argument("--folder", default=None,
+                        help="source data folder path")
+    parser.add_argument("--simulation", default="DAY_AHEAD",
+                        help="simulation whose area loads are used")
+    parser.add_argument("--start", default=None, help="first time stamp")
+    parser.add_argument("--end", default=None, help="end time stamp")
+    parser.add_argument("--ac", action="store_true",
+                        help="run the AC contingencies of the peak case")
+    parser.add_argument("--order", type=int, default=1,
+                        help="branches out in each AC contingency")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes of the AC runs")
+
+    args = parser.parse_args()
+
+    if args.ac:
+        results = screen_ac_n1(args.folder, args.order, jobs=args.jobs)
+        results.to_csv(args.output, index=False)
+        print("{} of {} contingencies with overloads, {} not converged, {} "
+            "islanding".format((results["Overloads"] > 0).sum(),
+            len(results), (~results["Converged"] &
+            (results["Islanded Buses"] == 0)).sum(),
+            (results["Islanded Buses"] > 0).sum()))
+    else:
+        violations = screen_n1(args.folder, args.simulation, args.start,
+            args.end)
+        violations.to_csv(args.output, index=False)
+        print("{} overloads in {} outages".format(len(violations),
+            violations["Outage"].nunique()))
@@ -0,0 +1,119 @@
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+
+OUTPUT_COLUMNS = ["Output_pct_0", "Output_pct_1", "Output_pct_2",
+    "Output_pct_3"]
+INCR_COLUMNS = ["HR_incr_1", "HR_incr_2", "HR_incr_3"]
+HEAT_RATE_COLUMNS = ["PMax MW"] + OUTPUT_COLUMNS + ["HR_avg_0"] + \
+    INCR_COLUMNS
+FUEL_PRICE_COLUMN = "Fuel Price $/MMBTU"
+
+# a unit can not convert more than 3412 BTU of fuel into one kWh
+MIN_HEAT_RATE = 3412.0
+
+# `mw` are the output breakpoints of every unit (units x 4) and `heat` the
+# fuel input at each breakpoint in MMBTU/h
+HeatRateCurves = namedtuple("HeatRateCurves", ["mw", "heat"])
+
+# `cost` is the fuel cost at the breakpoints in $/h, `marginal_cost` the
+# slope of each of the three segments in $/MWh, `no_load_cost` the cost of
+# the first segment extended down to 0 MW in $/h and `average_cost` the cost
+# per MWh at the first breakpoint, i.e. HR_avg_0 times the fuel price
+CostCurves = namedtuple("CostCurves", ["mw", "cost", "marginal_cost",
+    "no_load_cost", "average_cost"])
+
+
+def _readonly(*arrays):
+    for a in arrays:
+        a.setflags(write=False)
+    return arrays
+
+
+@lru_cache(maxsize=8)
+def _heat_rate_curves(data, n, decimals):
+    # `data` holds the HEAT_RATE_COLUMNS, as bytes so that it can be a key
+    pmax, pct, hr_avg_0, incr = np.split(np.frombuffer(data).reshape(n, -1),
+        [1, 5, 6], axis=1)
+    hr_avg_0 = np.maximum(hr_avg_0[:, 0], MIN_HEAT_RATE)
+
+    mw = pct * pmax
+    if decimals is not None:
+        mw = np.round(mw, decimals)
+
+    # Every segment starts at the highest fuel input of the previous one, in
+    # BTU/kWh times MW. The lower end of a segment is the lower of its two
+    # breakpoints, as the curves of a few units are not increasing.
+    heat = np.empty_like(mw)
+    top = None
+    for i in range(3):
+        low = np.minimum(mw[:, i], mw[:, i + 1])
+        base = hr_avg_0 * low if i == 0 else top
+        start = (mw[:, i] - low) * incr[:, i] + base
+        heat[:, i + 1] = (mw[:, i + 1] - low) * incr[:, i] + base
+        if i == 0:
+            heat[:, 0] = start
+        top = np.maximum(start, heat[:, i + 1])
+
+    return _readonly(mw, heat / 1000, incr, hr_avg_0)
+
+
+@lru_cache(maxsize=32)
+def _cost_curves(data, n, decimals, price):
+    mw, heat, incr, hr_avg_0 = _heat_rate_curves(data, n, decimals)
+    price = np.frombuffer(price)
+
+    cost = heat * price[:, None]
+    # BTU/kWh * $/MMBTU = $/MWh / 1000
+    marginal_cost = price[:, None] * incr / 1000
+    no_load_cost = cost[:, 0] - marginal_cost[:, 0] * mw[:, 0]
+    average_cost = price * hr_avg_0 / 1000
+
+    return CostCurves(mw, *_readonly(cost, marginal_cost, no_load_cost,
+        average_cost))
+
+
+def _key(gen, decimals):
+    data = gen[HEAT_RATE_COLUMNS].to_numpy(dtype=np.float64)
+    return np.ascontiguousarray(data).tobytes(), len(gen), decimals
+
+
+def heat_rate_curves(gen, decimals=None):
+    """
+    Return the input-output curves of the units of a gen table as arrays of
+    four breakpoints per unit (see `HeatRateCurves`). The breakpoints are
+    ``Output_pct_* * PMax MW``, rounded to `decimals` when given, and the
+    fuel input rises from ``HR_avg_0 * MW`` at the first breakpoint with the
+    slopes ``HR_incr_*``; HR_avg_0 is at least `MIN_HEAT_RATE`.
+    """
+    mw, heat = _heat_rate_curves(*_key(gen, decimals))[:2]
+    return HeatRateCurves(mw, heat)
+
+
+def cost_curves(gen, fuel_price=None, decimals=None):
+    """
+    Return the fuel cost curves of the units of a gen table (see
+    `CostCurves`), with the fuel prices of the table or with `fuel_price`,
+    one value per unit.
+
+    All the units are computed in one array operation. The heat rate curves
+    are cached by the values of the heat rate columns and the costs by the
+    fuel price vector, so a sweep over fuel prices only multiplies the
+    cached curves, and a converter asking again for the same prices gets
+    the same arrays. The arrays are read-only.
+    """
+    if fuel_price is None:
+        fuel_price = gen[FUEL_PRICE_COLUMN]
+    price = np.ascontiguousarray(fuel_price, dtype=np.float64)
+    if price.shape != (len(gen),):
+        raise ValueError("expected {} fuel prices, got {}".format(len(gen),
+            price.shape))
+
+    return _cost_curves(*_key(gen, decimals), price.tobytes())
+
+
+def clear_cache():
+    """Forget all the cached curves."""
+    _heat_rate_curves.cache_clear()
+    _cost_curves.cache_clear()
@@ -0,0 +1,213 @@
+import hashlib
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csc_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.sparse.linalg import splu
+
+from .powerflow import hourly_injections
+from .source_data import read_table
+
+# factorizations kept in memory, by topology hash
+CACHE_SIZE = 8
+
+# above this many branches x buses the flows are solved with the sparse
+# factorization instead of the dense PTDF
+PTDF_MAX_ENTRIES = 2 * 10 ** 7
+
+# `bus` are the bus IDs, `f` and `t` the positions of the ends of every AC
+# branch in `bus`, `x` their reactances (times the tap ratio) in p.u., `ref`
+# the positions of the reference buses and `dc_f`, `dc_t` the ends of the
+# HVDC links. `branch` and `dc_branch` are the UIDs.
+Topology = namedtuple("Topology", ["bus", "branch", "f", "t", "x", "ref",
+    "dc_branch", "dc_f", "dc_t"])
+
+_FACTORS = OrderedDict()
+
+
+def topology(folder=None):
+    """
+    Return the `Topology` of the SourceData in `folder`, from the X and Tr
+    Ratio of branch.csv and the ends of the links of dc_branch.csv. The
+    reference buses are the Ref bus of bus.csv and, in the islands that do
+    not have one, their first bus.
+    """
+    bus = read_table("bus", folder)
+    branch = read_table("branch", folder)
+    dc_branch = read_table("dc_branch", folder)
+
+    ids = pd.Index(bus["Bus ID"])
+    f = ids.get_indexer(branch["From Bus"])
+    t = ids.get_indexer(branch["To Bus"])
+    ratio = branch["Tr Ratio"].to_numpy(dtype=np.float64)
+    x = branch["X"].to_numpy(dtype=np.float64) * np.where(ratio == 0, 1.0,
+        ratio)
+
+    ref = reference_buses(len(bus), f, t,
+        np.flatnonzero((bus["Bus Type"] == "Ref").to_numpy()))
+
+    return Topology(ids.to_numpy(), branch["UID"].to_numpy(), f, t, x, ref,
+        dc_branch["UID"].to_numpy(), ids.get_indexer(dc_branch["From Bus"]),
+        ids.get_indexer(dc_branch["To Bus"]))
+
+
+def reference_buses(n, f, t, ref):
+    """
+    Return the reference buses of a network of `n` buses and branches from
+    `f` to `t`: the first of the buses `ref` in every island, and the first
+    bus of the islands without one.
+    """
+    graph = csr_matrix((np.ones(len(f)), (f, t)), shape=(n, n))
+    islands = connected_components(graph, directed=False)[1]
+    ref = np.asarray(ref, dtype=np.int64)
+    ref = ref[np.unique(islands[ref], return_index=True)[1]]
+    first = np.unique(islands, return_index=True)[1]
+    return np.sort(np.r_[ref, first[~np.isin(islands[first], islands[ref])]])
+
+
+def topology_hash(topo):
+    """The SHA-1 of what the PTDF depends on: the ends and reactances of the
+    branches and the reference buses."""
+    sha = hashlib.sha1()
+    sha.update(np.int64(len(topo.bus)).tobytes())
+    for values in (topo.f, topo.t, topo.ref):
+        sha.update(np.ascontiguousarray(values, dtype=np.int64).tobytes())
+    sha.update(np.ascontiguousarray(topo.x, dtype=np.float64).tobytes())
+    return sha.hexdigest()
+
+
+class _Factor(object):
+    # the factorized susceptance matrix without the reference buses, and the
+    # matrix of the branch flows as a function of the bus angles
+
+    def __init__(self, topo):
+        n, m = len(topo.bus), len(topo.f)
+        b = 1.0 / topo.x
+        rows = np.r_[np.arange(m), np.arange(m)]
+        A = csr_matrix((np.r_[np.ones(m), -np.ones(m)], (rows, np.r_[topo.f,
+            topo.t])), shape=(m, n))
+        self.Bf = csr_matrix(A.multiply(b[:, None]))
+        B = csc_matrix(A.T @ self.Bf)
+
+        self.keep = np.setdiff1d(np.arange(n), topo.ref)
+        self.lu = splu(csc_matrix(B[self.keep][:, self.keep]))
+        self.Bf_keep = csc_matrix(self.Bf[:, self.keep])
+        self.shape = (m, n)
+        self.ptdf = None
+
+    def angles(self, p):
+        # bus angles (without the reference buses) of injections p (buses x
+        # hours), in radians times the base
+        return self.lu.solve(np.ascontiguousarray(p[self.keep]))
+
+    def get_ptdf(self):
+        if self.ptdf is None:
+            m, n = self.shape
+            ptdf = np.zeros((m, n))
+            inverse = self.lu.solve(np.eye(len(self.keep)))
+            ptdf[:, self.keep] = self.Bf_keep @ inverse
+            ptdf.setflags(write=False)
+            self.ptdf = ptdf
+        return self.ptdf
+
+
+def _factor(topo):
+    key = topology_hash(topo)
+    if key in _FACTORS:
+        _FACTORS.move_to_end(key)
+    else:
+        _FACTORS[key] = _Factor(topo)
+        while len(_FACTORS) > CACHE_SIZE:
+            _FACTORS.popitem(last=False)
+    return _FACTORS[key]
+
+
+def ptdf(topo):
+    """
+    Return the power transfer distribution factors of a `Topology`, the
+    flow of every branch (rows) per MW injected at every bus (columns) and
+    withdrawn at the reference bus of its island, as a read-only array.
+
+    The susceptance matrix is factorized once per topology (cached by
+    `topology_hash`) and the PTDF is computed from it on first use.
+    """
+    return _factor(topo).get_ptdf()
+
+
+def dc_flows(topo, p, dc_flow=None):
+    """
+    Return the DC power flow of the branches (branches x hours) for the net
+    bus injections `p` (buses x hours, or one vector) in MW. `dc_flow` are
+    the transfers of the HVDC links from their From Bus to their To Bus in
+    MW (one per link, or links x hours), added to the injections.
+
+    All the hours are computed at once: as one product with the PTDF, or
+    for the systems where the dense PTDF would be too large with one solve
+    of the cached sparse factorization.
+    """
+    p = np.asarray(p, dtype=np.float64)
+    if dc_flow is not None:
+        dc = np.asarray(dc_flow, dtype=np.float64)
+        if p.ndim > 1 and dc.ndim == 1:
+            dc = dc[:, None]
+        p = p.copy()
+        np.subtract.at(p, topo.dc_f, dc)
+        np.add.at(p, topo.dc_t, dc)
+
+    factor = _factor(topo)
+    if factor.ptdf is not None or factor.shape[0] * factor.shape[1] <= \
+            PTDF_MAX_ENTRIES:
+        return factor.get_ptdf() @ p
+    return factor.Bf_keep @ factor.angles(p)
+
+
+def hourly_dc_flows(folder=None, simulation="DAY_AHEAD", start=None,
+        end=None, dc_flow=None):
+    """
+    Return the DC power flow of every hour of a `simulation` as a DataFrame
+    of MW with the branch UIDs as rows and the hours as columns, the HVDC
+    links last. The injections are those of `powerflow.hourly_injections`
+    and the links carry `dc_flow`, by default their MW Load.
+    """
+    topo = topology(folder)
+    injections = hourly_injections(folder, simulation, start, end)
+    gen_bus = pd.Index(topo.bus).get_indexer(read_table("gen",
+        folder)["Bus ID"])
+
+    p = -injections.pd.T
+    np.add.at(p, gen_bus, injections.pg.T)
+    if dc_flow is None:
+        dc_flow = read_table("dc_branch", folder)["MW Load"].to_numpy(
+            dtype=np.float64)
+    dc = np.broadcast_to(np.asarray(dc_flow, dtype=np.float64).reshape(
+        len(topo.dc_branch), -1), (len(topo.dc_branch), p.shape[1]))
+
+    flows = np.vstack([dc_flows(topo, p, dc), dc])
+    return pd.DataFrame(flows, index=np.r_[topo.branch, topo.dc_branch],
+        columns=injections.index)
+
+
+def clear_cache():
+    """Forget the cached factorizations."""
+    _FACTORS.clear()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write the DC power flow "
+        "of every hour of the RTS-GMLC to a csv file.")
+    parser.add_argument("output", help="csv file, one row per branch")
+    parser.add_argument("--folder", default=None,
+                        help="source data folder path")
+    parser.add_argument("--simulation", default="DAY_AHEAD",
+                        help="simulation whose area loads are used")
+    parser.add_argument("--start", default=None, help="first time stamp")
+    parser.add_argument("--end", default=None, help="end time stamp")
+
+    args = parser.parse_args()
+
+    hourly_dc_flows(args.folder, args.simulation, args.start,
+        args.end).to_csv(args.output, index_label="UID")
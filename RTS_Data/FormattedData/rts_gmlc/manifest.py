@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from .source_data import read_table
+from .timeseries import _atomic_write, _file_hash, resolve_data_file
+
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+FORMATTED_DATA_FOLDER = os.path.realpath(os.path.join(curr_dir, ".."))
+
+MANIFEST_VERSION = 1
+
+
+def column_hash(series):
+    """Return the SHA-1 of the parsed values of a table column."""
+    values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+
+def path_hash(path):
+    """Return the SHA-1 of a file, or of the files in a folder, or None."""
+    if os.path.isfile(path):
+        return _file_hash(path)
+    if not os.path.isdir(path):
+        return None
+
+    sha = hashlib.sha1()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            sha.update(os.path.relpath(full, path).encode())
+            sha.update(_file_hash(full).encode())
+    return sha.hexdigest()
+
+
+def input_hashes(inputs, code=(), folder=None, root=FORMATTED_DATA_FOLDER):
+    """
+    Return a dict with the hash of every input of a converter.
+
+    `inputs` maps a SourceData table to the columns the converter reads (None
+    for all of them); the key "timeseries" lists simulations, whose data files
+    in timeseries_pointers.csv are hashed, and the key "files" other files
+    (relative to `root`). `code` lists the source files of the converter,
+    which are keyed by their path relative to `root`.
+    """
+    hashes = {}
+    for table, columns in sorted(inputs.items()):
+        if table == "files":
+            for path in columns:
+                key = "file:" + path.replace(os.path.sep, "/")
+                hashes[key] = path_hash(os.path.join(root, path))
+            continue
+        if table == "timeseries":
+            pointers = read_table("timeseries_pointers", folder)
+            data_files = pointers.loc[pointers["Simulation"].isin(columns),
+                "Data File"].unique()
+            for data_file in sorted(data_files):
+                try:
+                    path = resolve_data_file(data_file, folder)
+                except FileNotFoundError:
+                    path = None
+                key = "timeseries:" + data_file
+                hashes[key] = path and _file_hash(path)
+            continue
+
+        df = read_table(table, folder)
+        for col in (df.columns if columns is None else columns):
+            key = "{}:{}".format(table, col)
+            hashes[key] = column_hash(df[col]) if col in df.columns else None
+
+    for path in code:
+        key = os.path.relpath(os.path.realpath(path), root)
+        hashes["code:" + key.replace(os.path.sep, "/")] = path_hash(path)
+
+    return hashes
+
+
+def changes(old, new):
+    """Return the sorted keys whose hash differs between two dicts."""
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+class Manifest(object):
+    """
+    Record of the inputs and outputs of every target at its last build,
+    stored as json.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if data.get("version") != MANIFEST_VERSION:
+            data = {"version": MANIFEST_VERSION, "targets": {}}
+        self.targets = data["targets"]
+
+    def stale(self, name, inputs, outputs):
+        """
+        Return why a target must be rebuilt given the hashes of its inputs
+        and of its current outputs, or None when it is up to date.
+        """
+        entry = self.targets.get(name)
+        if entry is None:
+            return "not built yet"
+
+        changed = changes(entry["inputs"], inputs)
+        if changed:
+            more = ", ..." if len(changed) > 3 else ""
+            return "changed " + ", ".join(changed[:3]) + more
+
+        for output, digest in sorted(outputs.items()):
+            if digest is None:
+                return "missing " + output
+            if digest != entry["outputs"].get(output):
+                return "modified " + output
+
+        return None
+
+    def record(self, name, inputs, outputs):
+        self.targets[name] = {"inputs": inputs, "outputs": outputs}
+        self.save()
+
+    def forget(self, name):
+        if self.targets.pop(name, None) is not None:
+            self.save()
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "targets": self.targets}
+        _atomic_write(self.path, lambda f: f.write(json.dumps(data, indent=1,
+            sort_keys=True).encode()))
+
+
+def code_files(folder, exclude=()):
+    """Return the python files under a folder."""
+    paths = []
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        paths.extend(os.path.join(root, name) for name in sorted(files)
+            if name.endswith(".py") and name not in exclude)
+    return paths
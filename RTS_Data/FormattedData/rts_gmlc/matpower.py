@@ -0,0 +1,161 @@
+import hashlib
+import io
+import json
+import os
+import re
+
+import numpy as np
+
+from .timeseries import _atomic_write
+
+CACHE_VERSION = 1
+
+# mpc.<field> = <value>; with the value a number, a string or the opening
+# bracket of a matrix ([) or of a cell array ({)
+_ASSIGNMENT = re.compile(r"^\s*mpc\.(\w+)\s*=\s*(.*?)\s*;?\s*$")
+_STRING = re.compile(r"'((?:[^']|'')*)'")
+
+
+def _strip_comment(line):
+    # a % starts a comment unless it is inside a string
+    if "%" not in line:
+        return line
+    quoted = False
+    for i, c in enumerate(line):
+        if c == "'":
+            quoted = not quoted
+        elif c == "%" and not quoted:
+            return line[:i]
+    return line
+
+
+def _matrix(name, rows):
+    widths = set(len(r) for r in rows)
+    if len(widths) > 1:
+        raise ValueError("rows of mpc.{} have {} columns".format(name,
+            sorted(widths)))
+    ncols = widths.pop() if widths else 0
+    values = np.array([v for r in rows for v in r], dtype=np.float64)
+    return values.reshape(len(rows), ncols)
+
+
+def _scalar(text):
+    match = _STRING.fullmatch(text)
+    if match:
+        return match.group(1).replace("''", "'")
+    return float(text)
+
+
+def parse_case(text):
+    """
+    Return the MATPOWER case in `text` (the content of a case file such as
+    RTS_GMLC.m) as a PyPower case dict: the numeric matrices (bus, gen,
+    branch, gencost, areas, dcline, ...) as float64 arrays, the cell arrays
+    (bus_name, gen_name) as lists of rows of strings and the scalars
+    (version, baseMVA) as str or float.
+
+    The file is read in a single pass, line by line, and the numbers of each
+    matrix are converted by numpy at once.
+    """
+    ppc = {}
+    name, closing, rows = None, None, None
+
+    for line in io.StringIO(text):
+        line = _strip_comment(line)
+        if name is None:
+            match = _ASSIGNMENT.match(line)
+            if match is None:
+                continue
+            field, value = match.groups()
+            if value[:1] in ("[", "{"):
+                name, closing, rows = field, "]" if value[0] == "[" else "}", []
+                line = value[1:]
+            else:
+                ppc[field] = _scalar(value)
+                continue
+
+        end = line.find(closing)
+        body = line if end < 0 else line[:end]
+        # rows end at a ; or at the end of the line
+        for row in body.split(";"):
+            if closing == "]":
+                tokens = row.replace(",", " ").split()
+            else:
+                tokens = [s.replace("''", "'") for s in _STRING.findall(row)]
+            if tokens:
+                rows.append(tokens)
+
+        if end >= 0:
+            ppc[name] = _matrix(name, rows) if closing == "]" else rows
+            name = None
+
+    if name is not None:
+        raise ValueError("mpc.{} is not closed".format(name))
+
+    return ppc
+
+
+def _cache_path(path):
+    return os.path.splitext(path)[0] + ".cache.npz"
+
+
+def _save_cache(path, sha1, ppc):
+    arrays, fields = {}, {}
+    for field, value in ppc.items():
+        if isinstance(value, np.ndarray):
+            fields[field] = "matrix"
+            arrays[field] = value
+        elif isinstance(value, list):
+            fields[field] = "cell"
+            arrays[field] = np.array(value, dtype=str).reshape(len(value), -1)
+        else:
+            fields[field] = "str" if isinstance(value, str) else "float"
+            arrays[field] = np.array(value)
+    meta = {"version": CACHE_VERSION, "sha1": sha1, "fields": fields}
+    arrays["__meta__"] = np.array(json.dumps(meta))
+
+    _atomic_write(_cache_path(path), lambda f: np.savez(f, **arrays))
+
+
+def _load_cache(path, sha1):
+    try:
+        with np.load(_cache_path(path), allow_pickle=False) as data:
+            meta = json.loads(str(data["__meta__"]))
+            if meta.get("version") != CACHE_VERSION or meta["sha1"] != sha1:
+                return None
+            ppc = {}
+            for field, kind in meta["fields"].items():
+                value = data[field]
+                if kind == "matrix":
+                    ppc[field] = value
+                elif kind == "cell":
+                    ppc[field] = value.tolist()
+                else:
+                    ppc[field] = str(value) if kind == "str" else float(value)
+            return ppc
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def load_case(path, cache=True):
+    """
+    Return the MATPOWER case file at `path` as a PyPower case dict (see
+    `parse_case`).
+
+    With `cache` the parsed case is stored next to the file in a
+    ``.cache.npz`` archive keyed by the SHA-1 of the file, and later loads
+    of the same content only hash the file and read the arrays back.
+    """
+    path = os.path.realpath(path)
+    if not cache:
+        with open(path, "r") as f:
+            return parse_case(f.read())
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    sha1 = hashlib.sha1(raw).hexdigest()
+    ppc = _load_cache(path, sha1)
+    if ppc is None:
+        ppc = parse_case(raw.decode())
+        _save_cache(path, sha1, ppc)
+    return ppc
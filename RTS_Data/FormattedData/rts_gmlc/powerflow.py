@@ -0,0 +1,465 @@
+import copy
+import json
+import os
+import shutil
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from .ppc import BASE_MVA, create_ppc
+from .source_data import read_table
+from .timeseries import _atomic_write, read_pointers
+
+# hours solved by one task of the process pool
+CHUNK_HOURS = 168
+
+BUS_FIELDS = ["vm", "va"]
+BRANCH_FIELDS = ["pf", "qf", "pt", "qt"]
+HOUR_FIELDS = ["converged", "iterations", "mismatch"]
+
+# `pd` and `qd` are the bus loads (hours x buses) in MW and MVAr, net of the
+# renewable units that are off in the case, and `pg` the generator
+# dispatch (hours x gens) in MW, 0 for the units that are off
+Injections = namedtuple("Injections", ["index", "pd", "qd", "pg"])
+
+
+def bus_loads(folder=None, simulation="DAY_AHEAD", start=None, end=None):
+    """
+    Return the time stamps of a `simulation` and the MW and MVAr loads of
+    every bus (periods x buses, in the order of bus.csv): the area loads
+    spread over the buses of each area in proportion to their MW Load, the
+    MVAr loads scaled by the same factor.
+    """
+    bus = read_table("bus", folder)
+    areas = read_pointers(simulation, category="Area", start=start, end=end,
+        normalize=False, folder=folder)
+    area_load = areas[bus["Area"].astype(str)].to_numpy()
+
+    mw = bus["MW Load"].to_numpy(dtype=np.float64)
+    share = mw / bus.groupby("Area")["MW Load"].transform("sum").to_numpy()
+    pd_ = area_load * share[None, :]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(mw != 0, bus["MVAR Load"].to_numpy(
+            dtype=np.float64) / mw, 0.0)
+    return areas.index, pd_, pd_ * ratio[None, :]
+
+
+def hourly_injections(folder=None, simulation="DAY_AHEAD", start=None,
+        end=None):
+    """
+    Return the hourly loads and dispatch of the case built by
+    `rts_gmlc.ppc.create_ppc` (see `Injections`).
+
+    The bus loads are those of `bus_loads`. The units with a PMax MW time
+    series (hydro, wind, solar) produce their availability: those that are
+    on in the case as generators, the others (off in the peak case so that
+    the bus types do not change) as negative load. The remaining units on
+    share the net load in proportion to their dispatch in the case, within
+    [0, PMax MW]; the losses and the rounding are left to the slack bus.
+    """
+    bus = read_table("bus", folder)
+    gen = read_table("gen", folder)
+    ppc = create_ppc(folder, names=False)
+
+    index, pd_, qd = bus_loads(folder, simulation, start, end)
+
+    available = read_pointers(simulation, category="Generator",
+        parameter="PMax MW", start=start, end=end, normalize=False,
+        folder=folder)
+    uid = gen["GEN UID"].to_numpy()
+    pmax = ppc["gen"][:, 8]
+    on = ppc["gen"][:, 7] > 0
+    profile = np.isin(uid, available.columns)
+    bus_index = pd.Index(bus["Bus ID"]).get_indexer(gen["Bus ID"])
+
+    pg = np.zeros((len(index), len(gen)))
+    hours = available.reindex(columns=uid[profile]).to_numpy()
+    pg[:, profile] = np.minimum(hours, pmax[profile])
+    # renewable units that are off: negative load at their bus
+    off = profile & ~on
+    np.subtract.at(pd_.T, bus_index[off], pg[:, off].T)
+    pg[:, off] = 0.0
+
+    # the other units on follow the net load
+    dispatch = on & ~profile
+    pg0 = ppc["gen"][dispatch, 1]
+    net = pd_.sum(axis=1) - pg[:, on & profile].sum(axis=1)
+    factor = net / pg0.sum()
+    pg[:, dispatch] = np.clip(factor[:, None] * pg0[None, :], 0.0,
+        pmax[dispatch])
+
+    return Injections(index, pd_, qd, pg)
+
+
+class _Network(object):
+    # the admittance matrices and bus types, built once per process
+
+    def __init__(self, ppc):
+        from pypower.bustypes import bustypes
+        from pypower.makeYbus import makeYbus
+
+        bus = ppc["bus"].copy()
+        gen = ppc["gen"].copy()
+        branch = ppc["branch"].copy()
+        # consecutive bus numbers, as makeYbus expects
+        order = pd.Index(bus[:, 0].copy())
+        bus[:, 0] = np.arange(len(bus))
+        gen[:, 0] = order.get_indexer(gen[:, 0])
+        branch[:, :2] = np.column_stack([order.get_indexer(branch[:, 0]),
+            order.get_indexer(branch[:, 1])])
+
+        self.Ybus, self.Yf, self.Yt = makeYbus(ppc["baseMVA"], bus, branch)
+        self.Ybus.sum_duplicates()
+        self.ref, self.pv, self.pq = bustypes(bus, gen)
+        self.f = branch[:, 0].astype(np.int64)
+        self.t = branch[:, 1].astype(np.int64)
+        self.out = np.zeros(len(branch), dtype=bool)
+
+        on = gen[:, 7] > 0
+        self.gen_bus = gen[on, 0].astype(np.int64)
+        self.on = on
+        # voltage set points of the generator buses, last unit wins as in
+        # pypower.runpf
+        self.V0 = bus[:, 7] * np.exp(1j * np.pi / 180 * bus[:, 8])
+        self.vset = np.abs(self.V0)
+        self.vset[self.gen_bus] = gen[on, 5]
+        self.V0[self.gen_bus] = self.vset[self.gen_bus] * np.exp(
+            1j * np.angle(self.V0[self.gen_bus]))
+        self.fixed = np.zeros(len(bus), dtype=bool)
+        self.fixed[self.gen_bus] = True
+        self.nbus = len(bus)
+        self._jacobian_pattern()
+        self._branch_stamps()
+
+    def _jacobian_pattern(self):
+        # The Jacobian has the sparsity of Ybus (plus the diagonal) in each
+        # of its four blocks, so its layout is worked out once: `_entries`
+        # select the derivatives that land in the Jacobian and `_slot` sums
+        # them into the data of a fixed CSC matrix.
+        Y = self.Ybus.tocoo()
+        n = self.nbus
+        self._y = Y.data
+        self._yi = np.r_[Y.row, np.arange(n)]
+        self._yk = np.r_[Y.col, np.arange(n)]
+
+        self.pvpq = np.r_[self.pv, self.pq]
+        npvpq = len(self.pvpq)
+        p_row = np.full(n, -1)
+        p_row[self.pvpq] = np.arange(npvpq)
+        q_row = np.full(n, -1)
+        q_row[self.pq] = npvpq + np.arange(len(self.pq))
+
+        rows, cols, self._entries = [], [], []
+        # (equation rows, variable columns): P by Va, P by Vm, Q by Va, Q by Vm
+        for eq, var in ((p_row, p_row), (p_row, q_row), (q_row, p_row),
+                (q_row, q_row)):
+            take = np.flatnonzero((eq[self._yi] >= 0) & (var[self._yk] >= 0))
+            rows.append(eq[self._yi[take]])
+            cols.append(var[self._yk[take]])
+            self._entries.append(take)
+
+        self._size = npvpq + len(self.pq)
+        self._rows = np.concatenate(rows)
+        self._cols = np.concatenate(cols)
+        self._column_order = None
+        self._set_slots(self._cols)
+
+    def _set_slots(self, cols):
+        size = self._size
+        slots, self._slot = np.unique(cols * size + self._rows,
+            return_inverse=True)
+        self._indices = slots % size
+        self._indptr = np.searchsorted(slots // size, np.arange(size + 1))
+
+    def _branch_stamps(self):
+        # where the four admittances of every branch are added in Ybus.data
+        n, m = self.nbus, len(self.f)
+        Y = self.Ybus
+        keys = np.repeat(np.arange(n), np.diff(Y.indptr)) * n + Y.indices
+        rows = np.column_stack([self.f, self.f, self.t, self.t])
+        cols = np.column_stack([self.f, self.t, self.f, self.t])
+        self._stamp_slots = np.searchsorted(keys, rows * n + cols)
+        k = np.arange(m)
+        self._stamps = np.column_stack([
+            np.asarray(self.Yf[k, self.f]).ravel(),
+            np.asarray(self.Yf[k, self.t]).ravel(),
+            np.asarray(self.Yt[k, self.f]).ravel(),
+            np.asarray(self.Yt[k, self.t]).ravel(),
+        ])
+
+    def without(self, branches):
+        # the network with `branches` out of service: their admittances are
+        # subtracted from the data of Ybus, whose sparsity pattern (and so
+        # the layout and column order of the Jacobian) does not change
+        from scipy.sparse import csr_matrix
+
+        k = np.asarray(branches, dtype=np.int64)
+        data = self.Ybus.data.copy()
+        np.subtract.at(data, self._stamp_slots[k].ravel(),
+            self._stamps[k].ravel())
+        network = copy.copy(self)
+        network.Ybus = csr_matrix((data, self.Ybus.indices,
+            self.Ybus.indptr), shape=self.Ybus.shape)
+        network._y = data
+        network.out = self.out.copy()
+        network.out[k] = True
+        return network
+
+    def branch_flows(self, V):
+        # complex power at both ends of every branch, 0 for those out
+        sf = V[self.f] * np.conj(self.Yf * V)
+        st = V[self.t] * np.conj(self.Yt * V)
+        sf[self.out] = 0.0
+        st[self.out] = 0.0
+        return sf, st
+
+    def _solve(self, J, F):
+        from scipy.sparse.linalg import splu
+
+        # The fill reducing column order of the first factorization is
+        # kept and folded into the layout, so the later ones only pivot.
+        if self._column_order is None:
+            lu = splu(J)
+            self._column_order = lu.perm_c
+            self._set_slots(self._column_order[self._cols])
+            return lu.solve(F)
+        y = splu(J, permc_spec="NATURAL").solve(F)
+        return y[self._column_order]
+
+    def order_columns(self, V):
+        # the Jacobian layout in the column order of the factorization at
+        # `V` (worked out on the first call), to be given to the copies of
+        # the network in other processes with `set_layout`
+        if self._column_order is None:
+            self._solve(self._jacobian(V), np.zeros(self._size))
+        return {"column_order": self._column_order, "slot": self._slot,
+            "indices": self._indices, "indptr": self._indptr}
+
+    def set_layout(self, layout):
+        self._column_order = layout["column_order"]
+        self._slot = layout["slot"]
+        self._indices = layout["indices"]
+        self._indptr = layout["indptr"]
+
+    def _jacobian(self, V):
+        from scipy.sparse import csc_matrix
+
+        # dS/dVa and dS/dVm as in pypower.dSbus_dV, entry by entry
+        n = self.nbus
+        Vnorm = V / np.abs(V)
+        I = self.Ybus * V
+        yV = self._y * V[self._yk[:-n]]
+        dVa = np.r_[-1j * V[self._yi[:-n]] * np.conj(yV),
+            1j * V * np.conj(I)]
+        dVm = np.r_[V[self._yi[:-n]] * np.conj(self._y * Vnorm[self._yk[:-n]]),
+            np.conj(I) * Vnorm]
+
+        values = np.concatenate([dVa.real[self._entries[0]],
+            dVm.real[self._entries[1]], dVa.imag[self._entries[2]],
+            dVm.imag[self._entries[3]]])
+        data = np.bincount(self._slot, weights=values,
+            minlength=len(self._indices))
+        return csc_matrix((data, self._indices, self._indptr),
+            shape=(self._size, self._size))
+
+    def _mismatch(self, V, sbus):
+        mis = V * np.conj(self.Ybus * V) - sbus
+        F = np.r_[mis[self.pvpq].real, mis[self.pq].imag]
+        return F, np.abs(F).max() if len(F) else 0.0
+
+    def newton(self, sbus, V, tol, max_it):
+        # the full Newton method of pypower.newtonpf
+        npvpq = len(self.pvpq)
+        Va, Vm = np.angle(V), np.abs(V)
+        F, norm = self._mismatch(V, sbus)
+        i = 0
+        while norm >= tol and i < max_it:
+            i += 1
+            dx = -self._solve(self._jacobian(V), F)
+            Va[self.pvpq] += dx[:npvpq]
+            Vm[self.pq] += dx[npvpq:]
+            V = Vm * np.exp(1j * Va)
+            Vm, Va = np.abs(V), np.angle(V)
+            F, norm = self._mismatch(V, sbus)
+        return V, norm < tol, i, norm
+
+    def sbus(self, pd_, qd, pg, base_mva):
+        # complex injections of many hours at once, in p.u.
+        s = np.zeros(pd_.shape, dtype=np.complex128)
+        np.add.at(s.T, self.gen_bus, pg[:, self.on].T)
+        return (s - pd_ - 1j * qd) / base_mva
+
+    def solve(self, sbus, ppopt):
+        hours = len(sbus)
+        nbranch = len(self.f)
+        out = {
+            "vm": np.empty((hours, self.nbus)),
+            "va": np.empty((hours, self.nbus)),
+            "pf": np.empty((hours, nbranch)),
+            "qf": np.empty((hours, nbranch)),
+            "pt": np.empty((hours, nbranch)),
+            "qt": np.empty((hours, nbranch)),
+            "converged": np.empty(hours, dtype=bool),
+            "iterations": np.empty(hours, dtype=np.int32),
+            "mismatch": np.empty(hours),
+        }
+        V = self.V0
+        for h in range(hours):
+            # warm start: the voltages of the previous hour with the
+            # magnitudes of the generator buses at their set points
+            V0 = np.where(self.fixed, self.vset * np.exp(1j * np.angle(V)), V)
+            V, converged, iterations, norm = self.newton(sbus[h], V0,
+                ppopt["PF_TOL"], ppopt["PF_MAX_IT"])
+            sf, st = self.branch_flows(V)
+
+            out["vm"][h] = np.abs(V)
+            out["va"][h] = np.angle(V, deg=True)
+            out["pf"][h], out["qf"][h] = sf.real, sf.imag
+            out["pt"][h], out["qt"][h] = st.real, st.imag
+            out["converged"][h] = converged
+            out["iterations"][h] = iterations
+            out["mismatch"][h] = norm
+            if not converged:
+                # do not start the next hour from a diverged point
+                V = self.V0
+        return out
+
+
+_NETWORK = {}
+
+
+def _init_worker(ppc):
+    _NETWORK["network"] = _Network(ppc)
+
+
+def _solve_chunk(lo, sbus, ppopt):
+    return lo, _NETWORK["network"].solve(sbus, ppopt)
+
+
+def run_timeseries(output, folder=None, simulation="DAY_AHEAD", start=None,
+        end=None, jobs=None, chunk_hours=CHUNK_HOURS, ppopt=None):
+    """
+    Solve the AC power flow of every hour of a `simulation` of the
+    SourceData in `folder` (see `hourly_injections`) and write the results
+    to the folder `output`, one ``.npy`` file per field: the bus voltage
+    magnitudes (vm, p.u.) and angles (va, degrees), the branch flows at both
+    ends (pf, qf, pt, qt in p.u. of the 100 MVA base) and, per hour, whether
+    the Newton solve converged, its iterations and the largest mismatch.
+    Read them back with `load_results`.
+
+    The admittance matrices, the bus types and the sparsity pattern of the
+    Jacobian are built once per process, and every hour starts from the
+    voltages of the previous one. `ppopt` gives the tolerance and the
+    maximum iterations of the Newton solves (PF_TOL, PF_MAX_IT). The hours are
+    split in chunks of `chunk_hours` (a chunk restarts from the case
+    voltages) that are solved by `jobs` processes (all the CPUs by default,
+    in this process with 1) and written to the memory mapped files as they
+    complete, so memory does not grow with the number of hours. Generator
+    reactive limits are not enforced.
+    """
+    from pypower.ppoption import ppoption
+
+    if ppopt is None:
+        ppopt = ppoption()
+    ppc = create_ppc(folder, names=False)
+    injections = hourly_injections(folder, simulation, start, end)
+    network = _Network(ppc)
+    sbus = network.sbus(injections.pd, injections.qd, injections.pg,
+        ppc["baseMVA"])
+    hours = len(sbus)
+
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+    shapes = dict([(f, (hours, network.nbus)) for f in BUS_FIELDS] +
+        [(f, (hours, len(network.f))) for f in BRANCH_FIELDS])
+    dtypes = {"converged": np.bool_, "iterations": np.int32}
+    files = {}
+    for field in BUS_FIELDS + BRANCH_FIELDS + HOUR_FIELDS:
+        files[field] = np.lib.format.open_memmap(os.path.join(output,
+            field + ".npy"), mode="w+", dtype=dtypes.get(field, np.float64),
+            shape=shapes.get(field, (hours,)))
+
+    def store(lo, result):
+        for field, values in result.items():
+            files[field][lo:lo + len(values)] = values
+
+    chunks = range(0, hours, chunk_hours)
+    if jobs == 1:
+        for lo in chunks:
+            store(lo, network.solve(sbus[lo:lo + chunk_hours], ppopt))
+    else:
+        with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                initargs=(ppc,)) as pool:
+            futures = [pool.submit(_solve_chunk, lo,
+                sbus[lo:lo + chunk_hours], ppopt) for lo in chunks]
+            for future in as_completed(futures):
+                store(*future.result())
+    for values in files.values():
+        values.flush()
+    del files
+
+    # the index is written last, so the folder is only valid once complete
+    branch = read_table("branch", folder)
+    meta = {
+        "simulation": simulation,
+        "time": [t.isoformat() for t in injections.index],
+        "bus": ppc["bus"][:, 0].astype(np.int64).tolist(),
+        "branch": branch["UID"].tolist(),
+        "base_mva": BASE_MVA,
+    }
+    _atomic_write(os.path.join(output, "index.json"),
+        lambda f: f.write(json.dumps(meta).encode()))
+
+    converged = np.load(os.path.join(output, "converged.npy"))
+    return int(converged.sum()), hours
+
+
+def load_results(output, mmap_mode="r"):
+    """
+    Return the results written by `run_timeseries` as a dict of DataFrames
+    indexed by time, with the buses or the branch UIDs as columns (a Series
+    for the hourly fields). The arrays are memory mapped by default.
+    """
+    with open(os.path.join(output, "index.json"), "r") as f:
+        meta = json.load(f)
+    index = pd.DatetimeIndex(meta["time"], name="DateTime")
+    columns = dict([(f, meta["bus"]) for f in BUS_FIELDS] +
+        [(f, meta["branch"]) for f in BRANCH_FIELDS])
+
+    results = {}
+    for field in BUS_FIELDS + BRANCH_FIELDS + HOUR_FIELDS:
+        values = np.load(os.path.join(output, field + ".npy"),
+            mmap_mode=mmap_mode)
+        if field in columns:
+            results[field] = pd.DataFrame(values, index=index,
+                columns=columns[field], copy=False)
+        else:
+            results[field] = pd.Series(values, index=index, name=field)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Solve the AC power flow "
+        "of every hour of the RTS-GMLC.")
+    parser.add_argument("output", help="results folder")
+    parser.add_argument("--folder", default=None,
+                        help="source data folder path")
+    parser.add_argument("--simulation", default="DAY_AHEAD",
+                        help="simulation whose area loads are used")
+    parser.add_argument("--start", default=None, help="first time stamp")
+    parser.add_argument("--end", default=None, help="end time stamp")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes")
+    parser.add_argument("--chunk-hours", type=int, default=CHUNK_HOURS,
+                        help="hours solved by one task")
+
+    args = parser.parse_args()
+
+    converged, hours = run_timeseries(args.output, args.folder,
+        args.simulation, args.start, args.end, args.jobs, args.chunk_hours)
+    print("{} of {} hours converged".format(converged, hours))
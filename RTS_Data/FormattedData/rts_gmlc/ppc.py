@@ -0,0 +1,162 @@
+import numpy as np
+
+from .costs import cost_curves, heat_rate_curves
+from .source_data import read_table
+
+BASE_MVA = 100.0
+
+# decimals of the values that MATPOWER/script.py writes with %.5f
+DIGITS = 5
+
+BUS_TYPES = {"PQ": 1, "PV": 2, "Ref": 3}
+
+# generators that are off in the peak load flow case
+OFF_FUELS = ["Wind", "Solar", "Storage"]
+
+
+def _round(values):
+    # as float("%.5f" % value): np.round only differs close to the ties,
+    # which are formatted one by one
+    values = np.asarray(values, dtype=np.float64)
+    out = np.round(values, DIGITS)
+    scaled = np.abs(values) * 10 ** DIGITS
+    tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    out[tie] = [float("%.*f" % (DIGITS, v)) for v in values[tie]]
+    return out
+
+
+def create_bus(bus):
+    n = len(bus)
+    return np.column_stack([
+        bus["Bus ID"],
+        bus["Bus Type"].map(BUS_TYPES).fillna(4),
+        bus["MW Load"],
+        bus["MVAR Load"],
+        bus["MW Shunt G"],
+        bus["MVAR Shunt B"],
+        bus["Area"],
+        _round(bus["V Mag"]),
+        _round(bus["V Angle"]),
+        bus["BaseKV"],
+        bus["Zone"].astype(np.int64),
+        np.full(n, 1.05),  # Vmax
+        np.full(n, 0.95),  # Vmin
+    ]).astype(np.float64)
+
+
+def create_gen(gen):
+    n = len(gen)
+    ramp = gen["Ramp Rate MW/Min"].to_numpy(dtype=np.float64)
+    zero = np.zeros(n)
+    return np.column_stack([
+        gen["Bus ID"],
+        gen["MW Inj"],
+        gen["MVAR Inj"],
+        gen["QMax MVAR"],
+        gen["QMin MVAR"],
+        _round(gen["V Setpoint p.u."]),
+        np.full(n, BASE_MVA),  # mBase
+        ~gen["Fuel"].isin(OFF_FUELS),
+        gen["PMax MW"],
+        gen["PMin MW"].fillna(0),
+        zero, zero, zero, zero, zero, zero,  # Pc1 ... Qc2max
+        ramp, ramp, ramp, ramp,  # ramp_agc, ramp_10, ramp_30, ramp_q
+        zero,  # apf
+    ]).astype(np.float64)
+
+
+def create_branch(branch):
+    n = len(branch)
+    rate = branch["Cont Rating"].to_numpy(dtype=np.float64)
+    return np.column_stack([
+        branch["From Bus"],
+        branch["To Bus"],
+        _round(branch["R"]),
+        _round(branch["X"]),
+        _round(branch["B"]),
+        rate, rate, rate,
+        branch["Tr Ratio"],
+        np.zeros(n),  # angle
+        np.ones(n),  # status
+        np.full(n, -180.0),  # angmin
+        np.full(n, 180.0),  # angmax
+    ]).astype(np.float64)
+
+
+def create_gencost(gen):
+    # piecewise linear costs with four points, see rts_gmlc/costs.py
+    price = gen["Fuel Price $/MMBTU"].to_numpy(dtype=np.float64)
+    start_fuel = gen["Start Heat Cold MBTU"].to_numpy(dtype=np.float64) * \
+        price
+    startup = start_fuel + gen["Non Fuel Start Cost $"].to_numpy(
+        dtype=np.float64)
+
+    curves = cost_curves(gen)
+    points = np.empty((len(gen), 8))
+    points[:, 0::2] = curves.mw
+    points[:, 1::2] = curves.cost
+
+    # units without fuel cost get a flat curve up to their capacity (1 MW
+    # for the synchronous condensers)
+    free = (heat_rate_curves(gen).heat == 0.0).all(axis=1)
+    pmax = np.where(free & (gen["Fuel"] == "Sync_Cond").to_numpy(), 1.0,
+        gen["PMax MW"].to_numpy(dtype=np.float64))
+    points[free, 0::2] = np.linspace(0, pmax[free], 4, axis=1)
+    points[free, 1::2] = 0.0
+
+    return np.column_stack([
+        np.ones(len(gen)),  # piecewise linear model
+        _round(np.where(np.isnan(startup), 0.0, startup)),
+        _round(np.where(np.isnan(start_fuel), 0.0, start_fuel)),
+        np.full(len(gen), 4.0),
+        _round(points),
+    ])
+
+
+def create_dcline(dc_branch):
+    n = len(dc_branch)
+    limit = dc_branch["MW Load"].to_numpy(dtype=np.float64)
+    dcline = np.zeros((n, 23))
+    dcline[:, 0] = dc_branch["From Bus"]
+    dcline[:, 1] = dc_branch["To Bus"]
+    dcline[:, 2] = 1  # status
+    dcline[:, 7:9] = 1  # VF, VT
+    dcline[:, 9] = -limit  # PMIN
+    dcline[:, 10] = limit  # PMAX
+    dcline[:, 11:15] = [-9999, 9999, -9999, 9999]  # QMINF ... QMAXT
+    return dcline
+
+
+def create_ppc(folder=None, names=True):
+    """
+    Return the PyPower case of the SourceData in `folder` built directly from
+    the tables. MATPOWER/script.py writes these arrays, and the values it
+    writes with five decimals are rounded to them already, so the case read
+    back by `rts_gmlc.matpower.load_case` has the same numbers. With `names`
+    the bus_name and gen_name lists are included as well.
+    """
+    bus = read_table("bus", folder)
+    gen = read_table("gen", folder)
+    branch = read_table("branch", folder)
+    dc_branch = read_table("dc_branch", folder)
+
+    # the first bus of every area
+    refbus = bus.groupby("Area", sort=True)["Bus ID"].first()
+
+    ppc = {
+        "version": "2",
+        "baseMVA": BASE_MVA,
+        "areas": np.column_stack([refbus.index, refbus.values]).astype(
+            np.float64),
+        "bus": create_bus(bus),
+        "gen": create_gen(gen),
+        "branch": create_branch(branch),
+        "gencost": create_gencost(gen),
+        "dcline": create_dcline(dc_branch),
+    }
+    if names:
+        ppc["bus_name"] = [[name.upper()] for name in bus["Bus Name"]]
+        ppc["gen_name"] = [[uid.upper(), unit_type, fuel] for uid, unit_type,
+            fuel in zip(gen["GEN UID"], gen["Unit Type"], gen["Fuel"])]
+
+    return ppc
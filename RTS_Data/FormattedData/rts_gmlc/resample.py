@@ -0,0 +1,269 @@
+import hashlib
+import io
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from .source_data import read_table
+from .timeseries import (DATE_COLUMNS, _cache_paths, _value_columns,
+    _write_meta, load_array, period_resolution, resolve_data_file)
+
+# number of days processed at a time, i.e. 31 * 288 rows of a 5-minute file
+CHUNK_DAYS = 31
+
+AGGREGATIONS = {
+    "mean": lambda x: x.mean(axis=2),
+    "max": lambda x: x.max(axis=2),
+    "first": lambda x: x[:, :, 0],
+}
+
+# values are written with the precision of the source files
+VALUE_FORMAT = "%.10g"
+
+
+def _layout(path, columns, values):
+    # Return the number of days, periods per day and value columns of a file,
+    # which is either one row per period (Year, Month, Day, Period, ...) or one
+    # row per day with one column per period (Year, Month, Day, 1, 2, ...).
+    if "Period" in columns:
+        periods = int(values[:, columns.index("Period")].max())
+        if values.shape[0] % periods or int(values[0, 3]) != 1:
+            raise ValueError("'{}' does not hold whole days".format(path))
+        return values.shape[0] // periods, periods, _value_columns(columns)
+
+    return values.shape[0], len(_value_columns(columns)), None
+
+
+def _days(path, columns, values, periods, value_cols, d0, d1):
+    # Return the dates (days x 3) and values (days x periods x columns) of
+    # days [d0, d1), reading only those rows of the memory map.
+    if value_cols is None:
+        dates = np.asarray(values[d0:d1, :3])
+        data = np.asarray(values[d0:d1, 3:])[:, :, None]
+        return dates, data
+
+    block = np.asarray(values[d0 * periods:d1 * periods])
+    block = block.reshape(d1 - d0, periods, block.shape[1])
+    if not (block[:, :, 3] == np.arange(1, periods + 1)).all():
+        raise ValueError("'{}' is not a regular time series".format(path))
+    cols = [columns.index(c) for c in value_cols]
+
+    return block[:, 0, :3], block[:, :, cols]
+
+
+def _downsample(data, factor, how):
+    days, periods, ncols = data.shape
+    return AGGREGATIONS[how](data.reshape(days, periods // factor, factor,
+        ncols))
+
+
+def _upsample(data, after, factor, method, profile):
+    # `after` is the first period following the chunk (the last period of
+    # the file is held), so linear interpolation does not break between chunks
+    days, periods, ncols = data.shape
+    x = data.reshape(days * periods, ncols)
+
+    if method == "linear":
+        x = np.concatenate([x, after[None, :]])
+        step = (np.arange(factor) / factor)[None, :, None]
+        out = x[:-1, None, :] + (x[1:] - x[:-1])[:, None, :] * step
+    else:
+        # the profile is scaled to a mean of one, so each hour keeps its mean
+        weights = profile / profile.mean(axis=0)
+        out = x[:, None, :] * weights[None, :, :]
+
+    return out.reshape(days, periods * factor, ncols)
+
+
+def _format(dates, data, value_cols):
+    # Return the csv rows of a chunk in the layout of the source file.
+    days, periods, ncols = data.shape
+    if value_cols is None:
+        table = np.hstack([dates, data[:, :, 0]])
+    else:
+        table = np.hstack([
+            np.repeat(dates, periods, axis=0),
+            np.tile(np.arange(1, periods + 1), days)[:, None],
+            data.reshape(days * periods, ncols)])
+    ndates = 3 if value_cols is None else 4
+    fmt = ["%d"] * ndates + [VALUE_FORMAT] * (table.shape[1] - ndates)
+
+    buf = io.StringIO()
+    np.savetxt(buf, table, fmt=fmt, delimiter=",")
+    return buf.getvalue()
+
+
+def resample_file(source, target, factor, how="mean", method="linear",
+        profile=None, chunk_days=CHUNK_DAYS):
+    """
+    Write the time series file `source` at another resolution into `target`,
+    together with its binary cache.
+
+    A `factor` above one upsamples, i.e. every period is split into `factor`
+    periods (12 for DAY_AHEAD hourly to REAL_TIME 5-minute), either by linear
+    interpolation between the period values (`method="linear"`) or by
+    multiplying each period by `profile`, an array of `factor` weights (or
+    `factor` x columns) scaled to a mean of one (`method="profile"`). A
+    `factor` below one downsamples, i.e. every ``1 / factor`` periods are
+    aggregated with `how` ("mean", "max" or "first").
+
+    The file is processed `chunk_days` days at a time: the source is read
+    from its memory map and the csv and the cache are written chunk by chunk,
+    so memory does not grow with the length of the series.
+    """
+    columns, values = load_array(source)
+    ndays, periods, value_cols = _layout(source, columns, values)
+
+    if factor >= 1:
+        up, factor = True, int(round(factor))
+        if method == "profile":
+            if profile is None:
+                raise ValueError("method 'profile' needs a profile")
+            profile = np.asarray(profile, dtype=np.float64).reshape(factor,
+                -1)
+        elif method != "linear":
+            raise ValueError("unknown method '{}'".format(method))
+        out_periods = periods * factor
+    else:
+        up, factor = False, int(round(1 / factor))
+        if how not in AGGREGATIONS:
+            raise ValueError("unknown aggregation '{}'".format(how))
+        if periods % factor:
+            raise ValueError("{} periods per day can not be aggregated by "
+                "{}".format(periods, factor))
+        out_periods = periods // factor
+
+    if value_cols is None:
+        out_columns = DATE_COLUMNS[:3] + [str(p) for p in
+            range(1, out_periods + 1)]
+        shape = (ndays, len(out_columns))
+    else:
+        out_columns = DATE_COLUMNS + value_cols
+        shape = (ndays * out_periods, len(out_columns))
+
+    target = os.path.realpath(target)
+    npy_path = _cache_paths(target)[0]
+    folder = os.path.dirname(target)
+    fd, tmp_csv = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    os.close(fd)
+    fd, tmp_npy = tempfile.mkstemp(dir=folder, suffix=".tmp")
+    os.close(fd)
+    try:
+        cache = np.lib.format.open_memmap(tmp_npy, mode="w+",
+            dtype=np.float64, shape=shape, fortran_order=True)
+        sha = hashlib.sha1()
+        row = 0
+        with open(tmp_csv, "w", newline="") as f:
+            header = ",".join(out_columns) + "\n"
+            f.write(header)
+            sha.update(header.encode())
+            for d0 in range(0, ndays, chunk_days):
+                d1 = min(d0 + chunk_days, ndays)
+                dates, data = _days(source, columns, values, periods,
+                    value_cols, d0, d1)
+                if up:
+                    after = data[-1, -1] if d1 == ndays else _days(source,
+                        columns, values, periods, value_cols, d1,
+                        d1 + 1)[1][0, 0]
+                    data = _upsample(data, after, factor, method, profile)
+                else:
+                    data = _downsample(data, factor, how)
+
+                text = _format(dates, data, value_cols)
+                f.write(text)
+                sha.update(text.encode())
+                # store what the csv parses to, as build_cache would
+                chunk = pd.read_csv(io.StringIO(text), header=None)
+                cache[row:row + len(chunk)] = chunk.to_numpy(dtype=np.float64)
+                row += len(chunk)
+        cache.flush()
+        del cache
+
+        os.replace(tmp_csv, target)
+        os.replace(tmp_npy, npy_path)
+    finally:
+        for tmp in (tmp_csv, tmp_npy):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    return _write_meta(target, out_columns, shape, sha.hexdigest())
+
+
+def _target_path(data_file, folder):
+    # the folder of a missing file may differ in case (HYDRO vs Hydro)
+    directory, name = os.path.split(data_file)
+    try:
+        directory = resolve_data_file(directory, folder)
+    except FileNotFoundError:
+        raise FileNotFoundError("time series folder '{}' not found".format(
+            directory))
+    return os.path.join(directory, name)
+
+
+def fill_missing(simulation="REAL_TIME", how="mean", method="linear",
+        profile=None, overwrite=False, chunk_days=CHUNK_DAYS, folder=None):
+    """
+    Create the data files of a simulation listed in timeseries_pointers.csv
+    that do not exist, by resampling the file the other simulation points
+    to for the same objects (e.g. REAL_TIME_pv.csv from DAY_AHEAD_pv.csv).
+    With `overwrite` the existing files that have a counterpart are
+    regenerated as well. Returns the paths of the written files.
+    """
+    pointers = read_table("timeseries_pointers", folder)
+    resolutions = {s: period_resolution(s, folder)
+        for s in pointers["Simulation"].unique()}
+
+    written = []
+    wanted = pointers[pointers["Simulation"] == simulation]
+    for data_file, group in wanted.groupby("Data File", sort=False):
+        try:
+            resolve_data_file(data_file, folder)
+            exists = True
+        except FileNotFoundError:
+            exists = False
+        if exists and not overwrite:
+            continue
+
+        others = pointers[(pointers["Simulation"] != simulation) &
+            pointers["Object"].isin(group["Object"]) &
+            pointers["Parameter"].isin(group["Parameter"])]
+        sources = others.drop_duplicates(subset=["Simulation", "Data File"])
+        if sources.empty:
+            if exists:
+                # e.g. the Flex reserves only have DAY_AHEAD data
+                continue
+            raise KeyError("no other simulation points to the objects of "
+                "'{}'".format(data_file))
+        source = sources.iloc[0]
+
+        factor = resolutions[source["Simulation"]] / resolutions[simulation]
+        target = _target_path(data_file, folder)
+        resample_file(resolve_data_file(source["Data File"], folder), target,
+            factor, how=how, method=method, profile=profile,
+            chunk_days=chunk_days)
+        written.append(target)
+
+    return written
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Create the missing time '
+        'series files of a simulation by resampling the other simulation.')
+    parser.add_argument('--simulation', default='REAL_TIME',
+                        help='simulation whose data files are created')
+    parser.add_argument('--how', default='mean', choices=sorted(AGGREGATIONS),
+                        help='aggregation when downsampling')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='regenerate the files that already exist')
+    parser.add_argument('--folder', default=None,
+                        help='source data folder path')
+
+    args = parser.parse_args()
+
+    for path in fill_missing(args.simulation, how=args.how,
+            overwrite=args.overwrite, folder=args.folder):
+        print(path)
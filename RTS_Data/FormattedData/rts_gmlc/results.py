@@ -0,0 +1,254 @@
+import gzip
+import io
+import json
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# One power flow or OPF run: `title` as printed by MATPOWER ("AC Power Flow
+# (Newton)", ...), whether it converged, its time in seconds and objective
+# in $/hr (NaN when not printed), and the result tables as DataFrames with
+# the columns of TABLE_COLUMNS. In the tables NaN stands for the "-" of
+# MATPOWER, i.e. no generation or load at a bus, or a limit that does not
+# bind.
+Solution = namedtuple("Solution", ["title", "converged", "seconds",
+    "objective", "tables"])
+
+TABLE_COLUMNS = {
+    "bus": ["bus", "vm", "va", "pg", "qg", "pd", "qd", "lam_p", "lam_q"],
+    "branch": ["branch", "f_bus", "t_bus", "pf", "qf", "pt", "qt", "p_loss",
+        "q_loss"],
+    "gen": ["gen", "bus", "status", "pg", "qg", "mu_pmin", "mu_pmax",
+        "mu_qmin", "mu_qmax"],
+    "voltage_constraints": ["bus", "mu_vmin", "vmin", "vm", "vmax",
+        "mu_vmax"],
+    "pg_constraints": ["gen", "bus", "mu_pmin", "pmin", "pg", "pmax",
+        "mu_pmax"],
+    "qg_constraints": ["gen", "bus", "mu_qmin", "qmin", "qg", "qmax",
+        "mu_qmax"],
+}
+
+# the section headers of the MATPOWER output and the tables they hold
+_SECTIONS = {
+    "Bus Data": "bus",
+    "Branch Data": "branch",
+    "Voltage Constraints": "voltage_constraints",
+    "Generation Constraints": "pg_constraints",
+}
+
+_RUN = re.compile(r"^MATPOWER Version .* -- (.*?)\s*$")
+_SECTION = re.compile(r"^\|\s+(.*?)\s+\|$")
+_SECONDS = re.compile(r"^(Converged|Did not converge) in ([\d.]+) seconds")
+_OBJECTIVE = re.compile(r"^Objective Function Value = ([-\d.]+)")
+
+
+def _table(name, rows):
+    # all the rows of a table at once, "-" as NaN
+    widths = set(len(r) for r in rows)
+    if len(widths) > 1:
+        raise ValueError("rows of the {} table have {} columns".format(name,
+            sorted(widths)))
+    values = np.array(rows, dtype=object).reshape(len(rows), -1)
+    values[values == "-"] = "nan"
+    values = values.astype(np.float64)
+    columns = TABLE_COLUMNS[name][:values.shape[1]]
+    return pd.DataFrame(values, columns=columns)
+
+
+def parse_output(text):
+    """
+    Return the runs printed in `text`, the console output of MATPOWER (e.g.
+    MATPOWER/MATPOWER-out.txt), as a list of `Solution`. The output is read
+    in a single pass: the lines of every table are split into tokens and
+    converted by numpy at once.
+    """
+    solutions = []
+    run, table, rows = None, None, None
+
+    def close():
+        if table is not None and rows:
+            run["tables"][table] = _table(table, rows)
+
+    for line in io.StringIO(text):
+        line = line.rstrip()
+        match = _RUN.match(line)
+        if match:
+            close()
+            table, rows = None, None
+            run = {"title": match.group(1), "converged": False,
+                "seconds": np.nan, "objective": np.nan, "tables": {}}
+            solutions.append(run)
+            continue
+        if run is None:
+            continue
+
+        match = _SECTION.match(line)
+        if match:
+            close()
+            table, rows = _SECTIONS.get(match.group(1)), None
+            continue
+        match = _SECONDS.match(line)
+        if match:
+            run["converged"] = match.group(1) == "Converged"
+            run["seconds"] = float(match.group(2))
+            continue
+        match = _OBJECTIVE.match(line)
+        if match:
+            run["objective"] = float(match.group(1))
+            continue
+        if table is None:
+            continue
+
+        if "Reactive Power Limits" in line:
+            table, rows = "qg_constraints", None
+        elif rows is None:
+            # the rows start after the dashes under the column names
+            if line.startswith("-"):
+                rows = []
+        elif not line or "Total:" in line or line.lstrip().startswith("-"):
+            close()
+            rows = None
+            # the reactive limits follow the active ones in the same section
+            if table != "pg_constraints":
+                table = None
+        else:
+            # the reference bus is marked with a * after its angle
+            rows.append(line.replace("*", " ").split())
+    close()
+
+    return [Solution(r["title"], r["converged"], r["seconds"],
+        r["objective"], r["tables"]) for r in solutions]
+
+
+def read_output(path):
+    """Return the runs of a MATPOWER output file (gzip compressed when it
+    ends with '.gz') as a list of `Solution`, see `parse_output`."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        return parse_output(f.read())
+
+
+def _losses(base_mva, bus, branch):
+    # the series losses of MATPOWER's get_losses, |Vf / tap - Vt|^2 / Z*
+    index = pd.Index(bus[:, 0])
+    V = bus[:, 7] * np.exp(1j * np.pi / 180 * bus[:, 8])
+    f = index.get_indexer(branch[:, 0])
+    t = index.get_indexer(branch[:, 1])
+    tap = np.where(branch[:, 8] == 0, 1.0, branch[:, 8]) * np.exp(
+        1j * np.pi / 180 * branch[:, 9])
+    loss = base_mva * np.abs(V[f] / tap - V[t]) ** 2 / (branch[:, 2] -
+        1j * branch[:, 3])
+    return np.where(branch[:, 10] > 0, loss, 0.0)
+
+
+def from_pypower(results, title="PyPower"):
+    """
+    Return the result dict of a PyPower `runpf` or `runopf` as a `Solution`
+    with the same tables as the MATPOWER output (bus, branch, and also gen,
+    which MATPOWER does not print by default), straight from the arrays and
+    at full precision. As in the printed output, the generation of the
+    buses without units on and the load of the buses without load are
+    NaN.
+    """
+    bus = np.asarray(results["bus"], dtype=np.float64)
+    gen = np.asarray(results["gen"], dtype=np.float64)
+    branch = np.asarray(results["branch"], dtype=np.float64)
+    base_mva = results["baseMVA"]
+
+    on = gen[:, 7] > 0
+    index = pd.Index(bus[:, 0])
+    at = index.get_indexer(gen[on, 0])
+    pg = np.bincount(at, gen[on, 1], len(bus))
+    qg = np.bincount(at, gen[on, 2], len(bus))
+    has_gen = np.bincount(at, minlength=len(bus)) > 0
+    has_load = (bus[:, 2] != 0) | (bus[:, 3] != 0)
+
+    tables = {}
+    columns = [bus[:, 0], bus[:, 7], bus[:, 8], np.where(has_gen, pg,
+        np.nan), np.where(has_gen, qg, np.nan), np.where(has_load,
+        bus[:, 2], np.nan), np.where(has_load, bus[:, 3], np.nan)]
+    if bus.shape[1] > 14:
+        columns += [bus[:, 13], bus[:, 14]]
+    tables["bus"] = pd.DataFrame(dict(zip(TABLE_COLUMNS["bus"], columns)))
+
+    loss = _losses(base_mva, bus, branch)
+    tables["branch"] = pd.DataFrame(dict(zip(TABLE_COLUMNS["branch"], [
+        np.arange(1, len(branch) + 1, dtype=np.float64), branch[:, 0],
+        branch[:, 1], branch[:, 13], branch[:, 14], branch[:, 15],
+        branch[:, 16], loss.real, loss.imag])))
+
+    columns = [np.arange(1, len(gen) + 1, dtype=np.float64), gen[:, 0],
+        gen[:, 7], gen[:, 1], gen[:, 2]]
+    if gen.shape[1] > 24:
+        # MU_PMIN, MU_PMAX, MU_QMIN, MU_QMAX
+        columns += [gen[:, 22], gen[:, 21], gen[:, 24], gen[:, 23]]
+    tables["gen"] = pd.DataFrame(dict(zip(TABLE_COLUMNS["gen"], columns)))
+
+    return Solution(title, bool(results.get("success", False)),
+        float(results.get("et", np.nan)), float(results.get("f", np.nan)),
+        tables)
+
+
+def save_solution(solution, path):
+    """Store a `Solution` in the .npz file `path`, one array per column of
+    every table, so that single columns can be read back without the
+    others."""
+    arrays = {}
+    for name, table in solution.tables.items():
+        for column in table.columns:
+            arrays[name + "/" + column] = table[column].to_numpy()
+    meta = {"title": solution.title, "converged": solution.converged,
+        "seconds": solution.seconds, "objective": solution.objective,
+        "tables": dict((name, list(table.columns)) for name, table in
+        solution.tables.items())}
+    arrays["__meta__"] = np.array(json.dumps(meta))
+    np.savez(path, **arrays)
+
+
+def load_solution(path, tables=None):
+    """Return the `Solution` stored by `save_solution`, with all its tables
+    or those named in `tables`."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["__meta__"]))
+        names = meta["tables"] if tables is None else tables
+        loaded = dict((name, pd.DataFrame(dict((column, data[name + "/" +
+            column]) for column in meta["tables"][name]))) for name in names)
+    return Solution(meta["title"], meta["converged"], meta["seconds"],
+        meta["objective"], loaded)
+
+
+def compare(a, b, table="bus", on=None):
+    """
+    Return the differences of the columns of `table` that two solutions
+    have in common (b minus a), with the rows matched by `on` (the first
+    column, e.g. the bus number, by default).
+    """
+    left, right = a.tables[table], b.tables[table]
+    on = on or left.columns[0]
+    columns = [c for c in left.columns if c in right.columns and c != on]
+    left = left.set_index(on)[columns]
+    right = right.set_index(on)[columns]
+    return right.sub(left).loc[left.index.intersection(right.index)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Convert the console "
+        "output of MATPOWER into one .npz file of result tables per run.")
+    parser.add_argument("input", help="MATPOWER output, e.g. "
+        "MATPOWER/MATPOWER-out.txt")
+    parser.add_argument("output", help="output folder")
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.output):
+        os.makedirs(args.output)
+    for i, solution in enumerate(read_output(args.input)):
+        name = re.sub(r"\W+", "_", solution.title).strip("_").lower()
+        path = os.path.join(args.output, "{}_{}.npz".format(i, name))
+        save_solution(solution, path)
+        print(path)
@@ -0,0 +1,123 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+
+# default location of the RTS-GMLC source data in a cloned repository
+SOURCE_DATA_FOLDER = os.path.realpath(os.path.join(curr_dir, "..", "..",
+    "SourceData"))
+
+# Explicit dtypes for the identifier and text columns of every table. The
+# numeric columns are left to the C parser, which infers int64/float64 exactly
+# as before, so the formatted outputs do not change.
+DTYPES = {
+    "bus": {
+        "Bus ID": "int64", "Bus Name": str, "Bus Type": str, "Area": "int64",
+        "Sub Area": "float64", "Zone": "float64"},
+    "gen": {
+        "GEN UID": str, "Bus ID": "int64", "Gen ID": "int64",
+        "Unit Group": str, "Unit Type": str, "Category": str, "Fuel": str},
+    "branch": {
+        "UID": str, "From Bus": "int64", "To Bus": "int64"},
+    "dc_branch": {
+        "UID": str, "From Bus": "int64", "To Bus": "int64",
+        "Control Mode": str, "Metered end": str},
+    "storage": {
+        "GEN UID": str, "Storage": str, "position": str},
+    "reserves": {
+        "Reserve Product": str, "Eligible Regions": str,
+        "Eligible Device Categories": str,
+        "Eligible Device SubCategories": str, "Direction": str},
+    "timeseries_pointers": {
+        "Simulation": str, "Category": str, "Object": str, "Parameter": str,
+        "Scaling Factor": "float64", "Data File": str},
+    "simulation_objects": {
+        "Simulation_Parameters": str, "Description": str, "DAY_AHEAD": str,
+        "REAL_TIME": str},
+}
+
+TABLES = list(DTYPES.keys())
+
+# Dtypes of the columns that the converters carry over as extra component
+# attributes (see `compact_attributes`): the repeated labels as categoricals,
+# the identifiers as int32 and the emission and reliability data, which are
+# far from needing double precision, as float32.
+CATEGORY_COLUMNS = {"Bus Type", "Unit Group", "Unit Type", "Category",
+    "Fuel", "Control Mode", "Metered end", "position"}
+INT32_COLUMNS = {"Bus ID", "Gen ID", "Area", "Sub Area", "Zone", "From Bus",
+    "To Bus"}
+FLOAT32_COLUMNS = re.compile(r"^(Emissions |Fuel Sulfur Content|FOR$|MTT[FR] |"
+    r"Scheduled Maint|Perm OutRate$|Tran OutRate$|Duration$|Line FOR |"
+    r"Line Outage |(From|To) Station |(From|To) Switching Time )")
+
+
+# the parsed tables by path, with the modification time they were parsed at
+_TABLES = {}
+
+
+def _parse_table(path, mtime):
+    cached = _TABLES.get(path)
+    if cached is None or cached[0] != mtime:
+        # an edited file replaces its older version
+        table = os.path.splitext(os.path.basename(path))[0]
+        cached = _TABLES[path] = (mtime, pd.read_csv(path,
+            dtype=DTYPES[table]))
+    return cached[1]
+
+
+def read_table(table, folder=None):
+    """
+    Return one of the SourceData tables as a DataFrame.
+
+    Every csv file is parsed once per process and memoized by its path (and
+    parsed again when its modification time changes), so several converters
+    running in the same job share a single parse and a single frame. The
+    frame is shared: callers must not modify it in place, but copy it first
+    (or build new frames with `drop`, `assign`, ...).
+    """
+    if table not in DTYPES:
+        raise ValueError("unknown SourceData table '{}', expected one of {}"
+            .format(table, TABLES))
+
+    if folder is None:
+        folder = SOURCE_DATA_FOLDER
+    path = os.path.realpath(os.path.join(folder, table + ".csv"))
+
+    return _parse_table(path, os.path.getmtime(path))
+
+
+def clear_cache():
+    """Forget all the memoized tables."""
+    _TABLES.clear()
+
+
+def compact_attributes(data):
+    """
+    Return the columns of `data` with the dtypes of the extra attributes:
+    categoricals for CATEGORY_COLUMNS, int32 for INT32_COLUMNS (float32 if
+    they have missing values) and float32 for the columns matching
+    FLOAT32_COLUMNS. Those with text such as 'Unit-specific' among the
+    numbers become categoricals instead, so that no value is lost. The
+    other integer columns are converted to float64 and the rest are kept.
+    """
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if column in CATEGORY_COLUMNS:
+            values = values.astype("category")
+        elif column in INT32_COLUMNS:
+            values = values.astype(np.int32 if values.notna().all() else
+                np.float32)
+        elif FLOAT32_COLUMNS.match(column):
+            numbers = pd.to_numeric(values, errors="coerce")
+            if (numbers.isna() & values.notna()).any():
+                values = values.astype("category")
+            else:
+                values = numbers.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(values):
+            values = values.astype(np.float64)
+        columns[column] = values
+    return pd.DataFrame(columns, index=data.index)
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse.linalg
+from pypower.ppoption import ppoption
+
+from rts_gmlc import contingency
+from rts_gmlc.contingency import (islanding_flows, lodf, screen,
+    screen_ac, without)
+from rts_gmlc.dcpf import dc_flows, topology
+from rts_gmlc.ppc import create_ppc
+
+
+def injections(topo, hours=4):
+    # random injections balanced by the reference bus
+    p = np.random.default_rng(0).normal(scale=100.0, size=(len(topo.bus),
+        hours))
+    p[topo.ref] -= p.sum(axis=0)
+    return p
+
+
+def test_lodf_matches_resolved_outages():
+    topo = topology()
+    p = injections(topo)
+    base = dc_flows(topo, p)
+    factors, islanding = lodf(topo)
+
+    for k in np.flatnonzero(~islanding):
+        post = base + factors[:, [k]] * base[[k]]
+        post[k] = 0.0
+        expected = np.insert(dc_flows(without(topo, k), p), k, 0.0, axis=0)
+        assert np.abs(post - expected).max() < 1e-9
+
+
+def test_islanding_outages():
+    topo = topology()
+    p = injections(topo)
+    factors, islanding = lodf(topo)
+    assert sorted(topo.branch[islanding]) == ["B11", "C11"]
+    assert np.isnan(factors[:, islanding]).all()
+
+    for k in np.flatnonzero(islanding):
+        rest = without(topo, k)
+        assert len(rest.ref) == len(topo.ref) + 1
+        flows = islanding_flows(topo, k, p)
+        assert flows.shape == (len(topo.branch), p.shape[1])
+        assert (flows[k] == 0.0).all()
+        # every bus but the reference buses of the islands gets its
+        # injection through the branches left
+        served = np.zeros_like(p)
+        np.add.at(served, rest.f, np.delete(flows, k, axis=0))
+        np.subtract.at(served, rest.t, np.delete(flows, k, axis=0))
+        keep = np.setdiff1d(np.arange(len(topo.bus)), rest.ref)
+        assert np.abs(served[keep] - p[keep]).max() < 1e-9
+
+
+def test_ac_workers_reuse_the_base_layout(monkeypatch):
+    ppc = create_ppc(names=False)
+    ppopt = ppoption()
+    names = [str(k) for k in range(len(ppc["branch"]))]
+    arrays = {
+        "base_mva": np.array([ppc["baseMVA"]]),
+        "bus": ppc["bus"],
+        "gen": ppc["gen"],
+        "branch": ppc["branch"],
+        "ratings": ppc["branch"][:, 7],
+    }
+    arrays["V"], layout = contingency._ACCases(arrays, names, ppopt).base()
+    arrays.update(layout)
+
+    shm, shared = contingency._share(arrays)
+    try:
+        contingency._init_ac_worker(shm.name, shared, names, ppopt)
+        cases = contingency._CASES.pop("cases")
+        # a worker factorizes every case in the column order of the parent
+        orders = []
+        splu = scipy.sparse.linalg.splu
+
+        def spy(J, permc_spec="COLAMD"):
+            orders.append(permc_spec)
+            return splu(J, permc_spec=permc_spec)
+
+        monkeypatch.setattr(scipy.sparse.linalg, "splu", spy)
+        network = cases.network.without((0,))
+        assert np.array_equal(network._column_order, layout["column_order"])
+        assert cases.run((0,))[2]
+        assert orders and set(orders) == {"NATURAL"}
+        del cases, network
+    finally:
+        contingency._CASES.pop("shm").close()
+        shm.close()
+        shm.unlink()
+
+
+def test_ac_jobs_agree():
+    # N-1 cases, an islanding one (B11) and an N-2 one
+    ppc = create_ppc(names=False)
+    outages = [(k,) for k in range(0, len(ppc["branch"]), 7)] + [(51,),
+        (0, 1)]
+    one = screen_ac(ppc, outages, jobs=1)
+    two = screen_ac(ppc, outages, jobs=2)
+    assert one["Islanded Buses"].iloc[-2] > 0
+    pd.testing.assert_frame_equal(one, two)
+
+
+def test_screen_chunks():
+    topo = topology()
+    p = injections(topo, hours=6)
+    # overload about a tenth of the post-contingency flows
+    ratings = np.percentile(np.abs(dc_flows(topo, p)), 90, axis=1) + 1.0
+    dc_flow = np.ones(len(topo.dc_branch))
+    whole = screen(topo, p, ratings, dc_flow)
+    # one outage and hour at a time
+    cells = screen(topo, p, ratings, dc_flow, memory=1)
+    # a few outages and a few hours at a time
+    some = screen(topo, p, ratings, dc_flow, memory=9 * len(topo.f) * 8)
+
+    assert len(whole[0][0])
+    for result in (cells, some):
+        np.testing.assert_array_equal(result[1], whole[1])
+        for a, b in zip(sorted_hits(result), sorted_hits(whole)):
+            np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+
+def sorted_hits(result):
+    (branch, outage, hour, flow), _ = result
+    order = np.lexsort((branch, outage, hour))
+    return branch[order], outage[order], hour[order], flow[order]
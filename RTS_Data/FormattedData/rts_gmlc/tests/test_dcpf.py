@@ -0,0 +1,89 @@
+import numpy as np
+from pypower.ext2int import ext2int
+from pypower.idx_bus import BUS_TYPE, REF
+from pypower.makePTDF import makePTDF
+
+from rts_gmlc import dcpf
+from rts_gmlc.dcpf import dc_flows, ptdf, topology, topology_hash
+from rts_gmlc.ppc import create_ppc
+
+
+def test_ptdf_matches_pypower():
+    topo = topology()
+    ppc = ext2int(create_ppc(names=False))
+    slack = np.flatnonzero(ppc["bus"][:, BUS_TYPE] == REF)
+    assert list(slack) == list(topo.ref)
+
+    expected = makePTDF(ppc["baseMVA"], ppc["bus"], ppc["branch"], slack[0])
+    assert np.abs(ptdf(topo) - expected).max() < 1e-12
+
+
+def injections(topo, hours=3):
+    # random injections balanced by the reference bus
+    p = np.random.default_rng(0).normal(scale=100.0, size=(len(topo.bus),
+        hours))
+    p[topo.ref] -= p.sum(axis=0)
+    return p
+
+
+def served(topo, flows):
+    # net injection of every bus through its branches
+    s = np.zeros((len(topo.bus), flows.shape[1]))
+    np.add.at(s, topo.f, flows)
+    np.subtract.at(s, topo.t, flows)
+    return s
+
+
+def test_dc_flows_balance(monkeypatch):
+    topo = topology()
+    p = injections(topo)
+    keep = np.setdiff1d(np.arange(len(topo.bus)), topo.ref)
+
+    dcpf.clear_cache()
+    monkeypatch.setattr(dcpf, "PTDF_MAX_ENTRIES", 0)
+    sparse = dc_flows(topo, p)
+    assert dcpf._factor(topo).ptdf is None
+    assert np.abs(served(topo, sparse)[keep] - p[keep]).max() < 1e-9
+
+    monkeypatch.undo()
+    dcpf.clear_cache()
+    dense = dc_flows(topo, p)
+    assert dcpf._factor(topo).ptdf is not None
+    assert np.abs(dense - sparse).max() < 1e-9
+
+
+def test_dc_flows_links():
+    topo = topology()
+    p = injections(topo)
+    keep = np.setdiff1d(np.arange(len(topo.bus)), topo.ref)
+    dc_flow = np.full(len(topo.dc_branch), 50.0)
+
+    # the links take their transfer from their From Bus to their To Bus
+    withdrawn = p.copy()
+    withdrawn[topo.dc_f] -= 50.0
+    withdrawn[topo.dc_t] += 50.0
+    flows = dc_flows(topo, p, dc_flow)
+    assert np.abs(served(topo, flows)[keep] - withdrawn[keep]).max() < 1e-9
+    assert np.allclose(dc_flows(topo, p, np.full((len(topo.dc_branch), 3),
+        50.0)), flows)
+
+
+def test_factor_cache(monkeypatch):
+    topo = topology()
+    dcpf.clear_cache()
+    factor = dcpf._factor(topo)
+    assert dcpf._factor(topology()) is factor
+
+    # another reactance is another topology
+    changed = topo._replace(x=topo.x * np.r_[2.0, np.ones(len(topo.x) - 1)])
+    assert topology_hash(changed) != topology_hash(topo)
+    assert dcpf._factor(changed) is not factor
+    assert not np.allclose(ptdf(changed), ptdf(topo))
+
+    # the least recently used factorization goes first
+    monkeypatch.setattr(dcpf, "CACHE_SIZE", 1)
+    dcpf.clear_cache()
+    factor = dcpf._factor(topo)
+    assert dcpf._factor(changed) is not factor
+    assert list(dcpf._FACTORS) == [topology_hash(changed)]
+    dcpf.clear_cache()
@@ -0,0 +1,41 @@
+import importlib.util
+import io
+import os
+
+import numpy as np
+
+from rts_gmlc.matpower import parse_case
+from rts_gmlc.ppc import _round, create_ppc
+
+MATPOWER_SCRIPT = os.path.join(os.path.dirname(__file__), "..", "..",
+    "MATPOWER", "script.py")
+
+
+def matpower_script():
+    spec = importlib.util.spec_from_file_location("matpower_script",
+        MATPOWER_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_create_ppc_matches_matpower_case():
+    text = io.StringIO()
+    matpower_script().create_rts_MATPOWER_file(None, text)
+    case = parse_case(text.getvalue())
+    ppc = create_ppc()
+
+    assert sorted(case) == sorted(ppc)
+    for key, value in ppc.items():
+        if isinstance(value, np.ndarray):
+            assert case[key].shape == value.shape, key
+            assert (case[key] == value).all(), key
+        else:
+            assert case[key] == value, key
+
+
+def test_round_as_formatted():
+    values = np.r_[np.random.default_rng(0).normal(scale=100.0, size=1000),
+        0.000005, 0.000015, 1.234565, -2.5000050, 1e-7]
+    expected = [float("%.5f" % v) for v in values]
+    assert list(_round(values)) == expected
@@ -0,0 +1,24 @@
+import os
+import shutil
+
+from rts_gmlc import source_data
+from rts_gmlc.source_data import SOURCE_DATA_FOLDER, read_table
+
+
+def test_read_table_is_shared(tmp_path):
+    shutil.copy(os.path.join(SOURCE_DATA_FOLDER, "bus.csv"), tmp_path)
+    source_data.clear_cache()
+    bus = read_table("bus", str(tmp_path))
+    assert read_table("bus", str(tmp_path)) is bus
+
+    # an edited table is parsed again and replaces the older version
+    path = os.path.join(str(tmp_path), "bus.csv")
+    with open(path, "a") as f:
+        f.write(open(path).read().splitlines()[-1] + "\n")
+    mtime = os.path.getmtime(path) + 10
+    os.utime(path, (mtime, mtime))
+    edited = read_table("bus", str(tmp_path))
+    assert edited is not bus
+    assert len(edited) == len(bus) + 1
+    assert list(source_data._TABLES) == [os.path.realpath(path)]
+    source_data.clear_cache()
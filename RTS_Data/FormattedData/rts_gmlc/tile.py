@@ -0,0 +1,303 @@
+import os
+import re
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from .source_data import SOURCE_DATA_FOLDER, read_table
+from .timeseries import DATE_COLUMNS, read_timeseries, resolve_data_file
+
+# tables that are copied to every tile, the other tables are written as is
+TILED_TABLES = ["bus", "branch", "gen", "storage", "dc_branch", "reserves",
+    "timeseries_pointers"]
+
+
+class Tiling(object):
+    """
+    Renumbering of the SourceData objects of each tile.
+
+    Tile 0 keeps the original identifiers, so a system with one tile is the
+    source system. In tile k the areas are shifted by k times the number of
+    areas and the buses keep the RTS-GMLC convention that the hundreds give
+    the area (bus 101 of area 1 becomes bus 401 of area 4 in tile 1); the
+    identifiers that start with a bus number (generators, storage) follow
+    their bus, and the others get a ``_k`` suffix.
+    """
+
+    def __init__(self, bus):
+        areas = bus["Area"].astype(np.int64)
+        self.n_areas = int(areas.max())
+        ids = bus["Bus ID"].astype(np.int64)
+        if (ids // 100 == areas).all():
+            self.bus_offset = 100 * self.n_areas
+        else:
+            self.bus_offset = 10 ** len(str(int(ids.max())))
+
+    def area(self, area, k):
+        return area + k * self.n_areas
+
+    def bus(self, bus_id, k):
+        return bus_id + k * self.bus_offset
+
+    def uid(self, uid, bus_id, k):
+        # 101_CT_1 -> 401_CT_1, 122_HYDRO_1_RESERVOIR -> 422_HYDRO_1_RESERVOIR
+        if k == 0:
+            return uid
+        prefix = "{}_".format(bus_id)
+        if uid.startswith(prefix):
+            return "{}_{}".format(self.bus(bus_id, k), uid[len(prefix):])
+        return self.suffix(uid, k)
+
+    def suffix(self, name, k):
+        return name if k == 0 else "{}_{}".format(name, k)
+
+    def letter(self, area):
+        # areas are named A, B, C, ... Z, AA, AB, ... in the branch names
+        name = ""
+        while area > 0:
+            area, rest = divmod(area - 1, 26)
+            name = chr(ord("A") + rest) + name
+        return name
+
+    def reserve(self, name, k):
+        # regional products end with their area, e.g. Spin_Up_R1
+        match = re.match(r"^(.*R)(\d+)$", name)
+        if k == 0 or match is None:
+            return name
+        return match.group(1) + str(self.area(int(match.group(2)), k))
+
+
+def _tile_bus(bus, tiling, n):
+    # the tiles are laid side by side from west to east
+    width = 1.1 * (bus["lng"].max() - bus["lng"].min())
+    tiles = []
+    for k in range(n):
+        t = bus.copy()
+        t["Bus ID"] = tiling.bus(t["Bus ID"], k)
+        t["Bus Name"] = [tiling.suffix(x, k) for x in t["Bus Name"]]
+        t["Area"] = tiling.area(t["Area"], k)
+        t["lng"] = t["lng"] + k * width
+        # Sub Area and Zone are numbered area * 10 + i
+        for col in ("Sub Area", "Zone"):
+            t[col] = t[col] + 10 * k * tiling.n_areas
+        if k > 0:
+            # one reference bus for the whole system
+            t.loc[t["Bus Type"] == "Ref", "Bus Type"] = "PV"
+        tiles.append(t)
+    return pd.concat(tiles, ignore_index=True)
+
+
+def _tile_branches(branch, tiling, n):
+    tiles = []
+    for k in range(n):
+        t = branch.copy()
+        t["UID"] = [tiling.suffix(x, k) for x in t["UID"]]
+        t["From Bus"] = tiling.bus(t["From Bus"], k)
+        t["To Bus"] = tiling.bus(t["To Bus"], k)
+        tiles.append(t)
+    return pd.concat(tiles, ignore_index=True)
+
+
+def _tie_lines(branch, bus, tiling, n, ring):
+    # Each inter-area line of the source (AB1, CA-1, ...) is repeated between
+    # consecutive tiles, from its bus in tile k to its bus in tile k + 1, with
+    # the same impedance, ratings and length.
+    area = dict(zip(bus["Bus ID"], bus["Area"]))
+    inter = branch[branch["From Bus"].map(area) != branch["To Bus"].map(area)]
+
+    pairs = [(k, k + 1) for k in range(n - 1)]
+    if ring and n > 2:
+        pairs.append((n - 1, 0))
+
+    ties = []
+    used = set(branch["UID"])
+    for k, l in pairs:
+        t = inter.copy()
+        from_area = t["From Bus"].map(area)
+        to_area = t["To Bus"].map(area)
+        t["From Bus"] = tiling.bus(t["From Bus"], k)
+        t["To Bus"] = tiling.bus(t["To Bus"], l)
+        uids = []
+        for fa, ta in zip(from_area, to_area):
+            prefix = tiling.letter(tiling.area(fa, k)) + \
+                tiling.letter(tiling.area(ta, l))
+            i = 1
+            while "{}-{}".format(prefix, i) in used:
+                i += 1
+            uids.append("{}-{}".format(prefix, i))
+            used.add(uids[-1])
+        t["UID"] = uids
+        ties.append(t)
+
+    return pd.concat(ties, ignore_index=True) if ties else branch.iloc[:0]
+
+
+def _object_maps(gen, storage, reserves, tiling, n):
+    # Return for each tile the new name of every object that can appear in
+    # timeseries_pointers.csv and as a column of a time series file.
+    bus_of = dict(zip(gen["GEN UID"], gen["Bus ID"]))
+    maps = []
+    for k in range(n):
+        names = {}
+        for uid, bus_id in bus_of.items():
+            names[uid] = tiling.uid(uid, bus_id, k)
+        for uid, name in zip(storage["GEN UID"], storage["Storage"]):
+            names[name] = tiling.uid(name, bus_of[uid], k)
+        for area in range(1, tiling.n_areas + 1):
+            names[str(area)] = str(tiling.area(area, k))
+        for name in reserves["Reserve Product"]:
+            names[name] = tiling.reserve(name, k)
+        maps.append(names)
+    return maps
+
+
+def _tile_reserves(reserves, tiling, n):
+    regional = reserves["Reserve Product"].str.match(r"^.*R\d+$")
+    tiles = []
+    for k in range(n):
+        t = reserves[regional].copy()
+        t["Reserve Product"] = [tiling.reserve(x, k) for x in
+            t["Reserve Product"]]
+        t["Eligible Regions"] = [str(tiling.area(int(x), k)) for x in
+            t["Eligible Regions"]]
+        tiles.append(t)
+
+    # the system wide products cover every area of every tile
+    system = reserves[~regional].copy()
+    system["Requirement (MW)"] = system["Requirement (MW)"] * n
+    system["Eligible Regions"] = "({})".format(",".join(str(a) for a in
+        range(1, tiling.n_areas * n + 1)))
+
+    return pd.concat(tiles + [system], ignore_index=True)
+
+
+def tile_source_data(n, out, source=None, simulations=None, ties=True,
+        ring=False, perturb=0.0, seed=None):
+    """
+    Write a system made of `n` copies of the RTS-GMLC into `out`, with the
+    same layout as RTS_Data (``out/SourceData`` and
+    ``out/timeseries_data_files``), so that every converter accepts it.
+
+    The bus, branch, gen, storage, dc_branch, reserves and
+    timeseries_pointers tables are repeated with the identifiers of each tile
+    renumbered (see `Tiling`). With `ties` consecutive tiles are connected by
+    copies of the inter-area lines (and the last tile to the first one with
+    `ring`), so the system stays one synchronous grid with one reference bus.
+
+    The columns of the time series files are repeated under the new names;
+    with `perturb` the copies are multiplied by ``1 + perturb * N(0, 1)``
+    noise (drawn with `seed`) and clipped between 0 and the peak of the
+    original column. Files with a single value column (the regional
+    reserves, the CSP inflow) are shared by all the tiles. `simulations`
+    restricts the time series to some simulations, e.g. ``["DAY_AHEAD"]``.
+    """
+    if source is None:
+        source = SOURCE_DATA_FOLDER
+    source = os.path.realpath(source)
+    source_root = os.path.dirname(source)
+    out_source = os.path.join(out, "SourceData")
+    os.makedirs(out_source, exist_ok=True)
+
+    tables = {t: read_table(t, source) for t in TILED_TABLES}
+    tiling = Tiling(tables["bus"])
+    maps = _object_maps(tables["gen"], tables["storage"], tables["reserves"],
+        tiling, n)
+
+    out_tables = {
+        "bus": _tile_bus(tables["bus"], tiling, n),
+        "branch": pd.concat([_tile_branches(tables["branch"], tiling, n),
+            _tie_lines(tables["branch"], tables["bus"], tiling, n, ring)
+            if ties else tables["branch"].iloc[:0]], ignore_index=True),
+        "dc_branch": _tile_branches(tables["dc_branch"], tiling, n),
+        "reserves": _tile_reserves(tables["reserves"], tiling, n),
+    }
+
+    gens, storages, pointers = [], [], []
+    ptr = tables["timeseries_pointers"]
+    if simulations is not None:
+        ptr = ptr[ptr["Simulation"].isin(simulations)]
+    for k in range(n):
+        t = tables["gen"].copy()
+        t["GEN UID"] = [maps[k][x] for x in t["GEN UID"]]
+        t["Bus ID"] = tiling.bus(t["Bus ID"], k)
+        gens.append(t)
+
+        t = tables["storage"].copy()
+        t["GEN UID"] = [maps[k][x] for x in t["GEN UID"]]
+        t["Storage"] = [maps[k][x] for x in t["Storage"]]
+        storages.append(t)
+
+        t = ptr.copy()
+        t["Object"] = [maps[k].get(x, x) for x in t["Object"]]
+        if k > 0:
+            # objects shared by all the tiles, e.g. the Flex reserves
+            t = t[t["Object"] != ptr["Object"]]
+        pointers.append(t)
+    out_tables["gen"] = pd.concat(gens, ignore_index=True)
+    out_tables["storage"] = pd.concat(storages, ignore_index=True)
+    out_tables["timeseries_pointers"] = pd.concat(pointers,
+        ignore_index=True)
+
+    for table, df in out_tables.items():
+        df.to_csv(os.path.join(out_source, table + ".csv"), index=False)
+    shutil.copy(os.path.join(source, "simulation_objects.csv"), out_source)
+
+    rng = np.random.default_rng(seed)
+    for data_file in ptr["Data File"].unique():
+        try:
+            path = resolve_data_file(data_file, source)
+        except FileNotFoundError:
+            continue
+        target = os.path.join(out, os.path.relpath(path, source_root))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        _tile_timeseries(path, target, maps, perturb, rng)
+
+    return out
+
+
+def _tile_timeseries(path, target, maps, perturb=0.0, rng=None):
+    df = read_timeseries(path)
+    date_cols = [c for c in df.columns if c in DATE_COLUMNS]
+    value_cols = [c for c in df.columns if c not in DATE_COLUMNS]
+    if len(value_cols) == 1 or "Period" not in df.columns:
+        shutil.copy(path, target)
+        return
+
+    values = df[value_cols].to_numpy()
+    peak = values.max(axis=0)
+    frames = [df[date_cols]]
+    for k, names in enumerate(maps):
+        data = values
+        if k > 0 and perturb:
+            noise = 1 + perturb * rng.standard_normal(values.shape)
+            data = np.clip(values * noise, 0, peak)
+        frames.append(pd.DataFrame(data, columns=[names.get(c, c if k == 0
+            else "{}_{}".format(c, k)) for c in value_cols]))
+    pd.concat(frames, axis=1).to_csv(target, index=False)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Tile the RTS-GMLC into a '
+        'larger system.')
+    parser.add_argument('n', type=int, help='number of tiles')
+    parser.add_argument('output', help='output folder, laid out like RTS_Data')
+    parser.add_argument('--folder', default=None,
+                        help='source data folder path')
+    parser.add_argument('--simulations', nargs='+', default=None,
+                        help='simulations whose time series are tiled')
+    parser.add_argument('--no-ties', dest='ties', action='store_false',
+                        help='leave the tiles disconnected')
+    parser.add_argument('--ring', action='store_true',
+                        help='connect the last tile to the first one')
+    parser.add_argument('--perturb', type=float, default=0.0,
+                        help='relative noise of the time series copies')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the noise')
+
+    args = parser.parse_args()
+
+    tile_source_data(args.n, args.output, args.folder, args.simulations,
+        args.ties, args.ring, args.perturb, args.seed)
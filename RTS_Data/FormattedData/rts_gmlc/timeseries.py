@@ -0,0 +1,462 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .source_data import SOURCE_DATA_FOLDER, read_table
+
+curr_dir = os.path.dirname(os.path.realpath(__file__))
+
+# default location of the RTS-GMLC time series in a cloned repository
+TIMESERIES_FOLDER = os.path.realpath(os.path.join(curr_dir, "..", "..",
+    "timeseries_data_files"))
+
+# leading columns that locate each row in time
+DATE_COLUMNS = ["Year", "Month", "Day", "Period"]
+
+CACHE_VERSION = 1
+
+_loaded = {}  # keys are (path, mtime), values are (columns, memmap)
+
+
+def _cache_paths(path):
+    root = os.path.splitext(path)[0]
+    return root + ".cache.npy", root + ".cache.json"
+
+
+def _file_hash(path):
+    sha = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _atomic_write(path, write):
+    # write to a temporary file in the same folder and rename it, so that
+    # concurrent workers never see a half written cache
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+        prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"mtime": stat.st_mtime, "size": stat.st_size}
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_valid(path, npy_path, meta):
+    if meta is None or meta.get("version") != CACHE_VERSION:
+        return False
+    if not os.path.exists(npy_path):
+        return False
+    stamp = _source_stamp(path)
+    if meta["size"] != stamp["size"]:
+        return False
+    if meta["mtime"] == stamp["mtime"]:
+        return True
+    # the file was touched (e.g. by a git checkout) but maybe not modified
+    return meta["sha1"] == _file_hash(path)
+
+
+def build_cache(path):
+    """
+    Convert the time series csv file at `path` into a column-major float64
+    ``.cache.npy`` array next to it, plus a ``.cache.json`` header with the
+    column names and the source mtime, size and hash.
+    """
+    path = os.path.realpath(path)
+    npy_path = _cache_paths(path)[0]
+
+    df = pd.read_csv(path)
+    data = np.asfortranarray(df.to_numpy(dtype=np.float64))
+
+    _atomic_write(npy_path, lambda f: np.save(f, data))
+
+    return _write_meta(path, df.columns, data.shape)
+
+
+def _write_meta(path, columns, shape, sha1=None):
+    # the header is written last, so a cache is only valid once complete
+    meta = _source_stamp(path)
+    meta.update({
+        "version": CACHE_VERSION,
+        "sha1": _file_hash(path) if sha1 is None else sha1,
+        "columns": [str(c) for c in columns],
+        "shape": list(shape),
+    })
+    _atomic_write(_cache_paths(path)[1],
+        lambda f: f.write(json.dumps(meta, indent=1).encode()))
+
+    return meta
+
+
+def load_array(path):
+    """
+    Return ``(columns, values)`` for a time series csv file, where `values`
+    is a column-major memory map of the whole table (date columns included)
+    as float64.
+
+    The binary cache is built on first use and rebuilt whenever the source
+    changes. The map is copy-on-write: its pages are shared by every process
+    that opens the same file, so workers in a pool do not hold private copies
+    of the data, and a caller writing into it never modifies the cache.
+    """
+    path = os.path.realpath(path)
+    key = (path, os.path.getmtime(path))
+    if key in _loaded:
+        return _loaded[key]
+
+    npy_path, meta_path = _cache_paths(path)
+    meta = _read_meta(meta_path)
+    if not _is_valid(path, npy_path, meta):
+        meta = build_cache(path)
+    elif meta["mtime"] != _source_stamp(path)["mtime"]:
+        # same content, only refresh the stamp to skip hashing next time
+        meta.update(_source_stamp(path))
+        _atomic_write(meta_path,
+            lambda f: f.write(json.dumps(meta, indent=1).encode()))
+
+    values = np.load(npy_path, mmap_mode="c")
+    _loaded[key] = (meta["columns"], values)
+
+    return _loaded[key]
+
+
+def read_timeseries(path):
+    """
+    Return a time series csv file as a DataFrame backed by the binary cache.
+
+    The value columns are views of the memory map; only the leading date
+    columns are converted back to integers.
+    """
+    columns, values = load_array(path)
+
+    data = {}
+    for i, col in enumerate(columns):
+        if col in DATE_COLUMNS:
+            data[col] = values[:, i].astype(np.int64)
+        else:
+            data[col] = values[:, i]
+
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def datetime_index(year, month, day, period, resolution):
+    """
+    Return the DatetimeIndex of Year/Month/Day/Period arrays, where Period 1
+    starts at midnight and each period lasts `resolution` seconds (3600 for
+    the hourly files with Period 1-24, 300 for the 5-minute files with Period
+    1-288). The datetimes are computed as one array operation.
+    """
+    year, month, day, period = (np.asarray(x, dtype=np.int64)
+        for x in (year, month, day, period))
+    months = (year - 1970) * 12 + month - 1
+    dates = months.astype("datetime64[M]").astype("datetime64[D]") + \
+        (day - 1).astype("timedelta64[D]")
+    stamps = dates.astype("datetime64[s]") + \
+        ((period - 1) * int(resolution)).astype("timedelta64[s]")
+
+    return pd.DatetimeIndex(stamps.astype("datetime64[ns]"), name="DateTime")
+
+
+def load_levels(month, day, period):
+    """
+    Return the LoadLevel keys used by openTEPES, i.e. the zero padded
+    Month, Day and Period concatenated (``"{:02}{:02}{:02}"``, so Period
+    100-288 of the 5-minute files takes three digits), as one array
+    operation.
+    """
+    month, day, period = (np.asarray(x, dtype=np.int64)
+        for x in (month, day, period))
+    keys = np.where(period > 99, (month * 100 + day) * 1000 + period,
+        (month * 100 + day) * 100 + period).astype(str)
+
+    return np.where(month < 10, np.char.add("0", keys), keys)
+
+
+@lru_cache(maxsize=None)
+def _calendar(t0, res, n):
+    # all files of a resolution share the same calendar, build it once
+    return pd.date_range(t0, periods=n, freq=res, name="DateTime")
+
+
+def file_index(path, resolution=None):
+    """
+    Return the DatetimeIndex of a time series file with one row per period.
+    Without `resolution` it is inferred from the number of periods per day
+    (24 or 288). The index is cached per resolution and calendar.
+    """
+    columns, values = load_array(path)
+    if "Period" not in columns:
+        raise ValueError("'{}' has one column per period".format(path))
+    period = values[:, columns.index("Period")]
+    if resolution is None:
+        resolution = 86400 // int(period.max())
+    res = pd.Timedelta(seconds=int(resolution))
+
+    year, month, day = (int(v) for v in values[0, :3])
+    t0 = pd.Timestamp(year, month, day) + (int(period[0]) - 1) * res
+    index = _calendar(t0, res, values.shape[0])
+    if not index.equals(datetime_index(values[:, 0], values[:, 1],
+            values[:, 2], period, resolution)):
+        # not regular, e.g. a gap in the data
+        index = datetime_index(values[:, 0], values[:, 1], values[:, 2],
+            period, resolution)
+
+    return index
+
+
+def clear_cache(folder=None):
+    """
+    Forget the loaded memory maps and delete the binary cache files under
+    `folder` (the time series folder by default).
+    """
+    _loaded.clear()
+
+    if folder is None:
+        folder = TIMESERIES_FOLDER
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith(".cache.npy") or name.endswith(".cache.json"):
+                os.remove(os.path.join(root, name))
+
+
+def resolve_data_file(data_file, folder=None):
+    """
+    Return the absolute path of a `Data File` entry of timeseries_pointers.csv,
+    which is relative to the SourceData `folder`.
+
+    The folder names in the pointers do not always match the case of the
+    folders on disk (HYDRO vs Hydro), so components that are not found are
+    matched case-insensitively.
+    """
+    if folder is None:
+        folder = SOURCE_DATA_FOLDER
+    path = os.path.normpath(os.path.join(folder, data_file))
+    if os.path.exists(path):
+        return path
+
+    resolved = os.path.sep if os.path.isabs(path) else ""
+    for part in path.split(os.path.sep):
+        if not part:
+            continue
+        candidate = os.path.join(resolved, part)
+        if not os.path.exists(candidate) and os.path.isdir(resolved or "."):
+            matches = [x for x in os.listdir(resolved or ".")
+                if x.lower() == part.lower()]
+            if matches:
+                candidate = os.path.join(resolved, matches[0])
+        resolved = candidate
+    if not os.path.exists(resolved):
+        raise FileNotFoundError("time series file '{}' not found".format(
+            path))
+
+    return resolved
+
+
+def period_resolution(simulation, folder=None):
+    """Return the period resolution in seconds of a simulation."""
+    sim = read_table("simulation_objects", folder).set_index(
+        "Simulation_Parameters")
+    return int(sim.loc["Period_Resolution", simulation])
+
+
+def get_pointer(component, simulation, folder=None):
+    """
+    Return the row of timeseries_pointers.csv for a (component, simulation)
+    pair, e.g. ("122_HYDRO_1", "DAY_AHEAD") or ("1", "REAL_TIME") for the
+    load of area 1.
+    """
+    pointers = read_table("timeseries_pointers", folder)
+    match = pointers[(pointers["Object"] == str(component)) &
+        (pointers["Simulation"] == simulation)]
+    if match.empty:
+        raise KeyError("no time series pointer for ({}, {})".format(
+            component, simulation))
+
+    return match.iloc[0]
+
+
+def _value_columns(columns):
+    return [c for c in columns if c not in DATE_COLUMNS]
+
+
+def _locate(columns, values, simulation, start, end, folder):
+    # Return the first timestamp, the resolution and the [lo, hi) range of
+    # periods of a file for start <= t < end. The files are regular, so the
+    # offsets follow directly from Year/Month/Day/Period of the first row.
+    year, month, day = (int(v) for v in values[0, :3])
+    t0 = pd.Timestamp(year, month, day)
+
+    if "Period" in columns:
+        # one row per period
+        res = pd.Timedelta(seconds=period_resolution(simulation, folder))
+        t0 += (int(values[0, 3]) - 1) * res
+        n = values.shape[0]
+    else:
+        # one row per day and one column per period
+        periods = len(_value_columns(columns))
+        res = pd.Timedelta(days=1) / periods
+        n = values.shape[0] * periods
+
+    lo = 0 if start is None else \
+        min(max(int(np.ceil((pd.Timestamp(start) - t0) / res)), 0), n)
+    hi = n if end is None else \
+        min(max(int(np.ceil((pd.Timestamp(end) - t0) / res)), lo), n)
+
+    return t0, res, n, lo, hi
+
+
+def _check_regular(path, values, t0, res, lo, hi):
+    # the files are regular, check the first row of the window anyway
+    if hi <= lo:
+        return
+    first = t0 + lo * res
+    y, m, d, p = (int(v) for v in values[lo, :4])
+    if pd.Timestamp(y, m, d) + (p - 1) * res != first:
+        raise ValueError("'{}' is not a regular time series".format(path))
+
+
+def _column(component, columns, path):
+    if component in columns:
+        return columns.index(component)
+    # single value files, e.g. the regional Spin_Up reserves
+    value_cols = _value_columns(columns)
+    if len(value_cols) != 1:
+        raise KeyError("column '{}' not found in '{}'".format(component,
+            path))
+    return columns.index(value_cols[0])
+
+
+def _take(path, columns, values, components, lo, hi):
+    # Return the [lo, hi) periods of several components as a 2D array with
+    # one column per component, reading only the rows of the window.
+    if "Period" in columns:
+        cols = [_column(c, columns, path) for c in components]
+        return values[lo:hi, cols]
+
+    periods = _value_columns(columns)
+    first, last = columns.index(periods[0]), columns.index(periods[-1])
+    first_day, last_day = lo // len(periods), -(-hi // len(periods))
+    offset = first_day * len(periods)
+    block = np.asarray(values[first_day:last_day, first:last + 1])
+    data = block.ravel()[lo - offset:hi - offset]
+    return np.repeat(data[:, None], len(components), axis=1)
+
+
+def read_window(component, simulation, start, end, folder=None):
+    """
+    Return the time series of a component for ``start <= t < end`` as a
+    Series indexed by DateTime.
+
+    The data file is resolved through timeseries_pointers.csv and only the
+    rows inside the window are read from the binary cache. Since the files
+    are regular, the row offsets follow directly from Year/Month/Day/Period
+    of the first row and the simulation resolution. Files with one column per
+    period (Year, Month, Day, 1, 2, ...) are supported as well.
+    """
+    pointer = get_pointer(component, simulation, folder)
+    path = resolve_data_file(pointer["Data File"], folder)
+    columns, values = load_array(path)
+
+    t0, res, n, lo, hi = _locate(columns, values, simulation, start, end,
+        folder)
+    if "Period" in columns:
+        _check_regular(path, values, t0, res, lo, hi)
+    data = _take(path, columns, values, [str(component)], lo, hi)[:, 0]
+
+    index = _calendar(t0, res, n)[lo:hi]
+
+    return pd.Series(np.array(data), index=index, name=str(component))
+
+
+def read_pointers(simulation, category=None, parameter=None, start=None,
+        end=None, normalize=True, skip_missing=False, folder=None):
+    """
+    Return the time series of every pointer of a simulation as a DataFrame
+    indexed by DateTime with one column per `Object`, optionally filtered by
+    `Category` (Generator, Area, Reserve) and `Parameter` (PMax MW, ...) and
+    restricted to ``start <= t < end``.
+
+    The pointers are grouped by `Data File`, so each file is opened once no
+    matter how many components point to it, and all its columns are taken
+    in one slice. With `normalize` the values are divided by the `Scaling
+    Factor` of each pointer (its normalization factor, i.e. the peak of the
+    profile) in a single vectorized step. Pointers whose data file does not
+    exist raise, unless `skip_missing` is set. An object with several
+    pointers (e.g. PMin MW and PMax MW) gets one column when they point to
+    the same data, otherwise a ValueError asks for a `parameter`.
+    """
+    pointers = read_table("timeseries_pointers", folder)
+    pointers = pointers[pointers["Simulation"] == simulation]
+    if category is not None:
+        pointers = pointers[pointers["Category"] == category]
+    if parameter is not None:
+        pointers = pointers[pointers["Parameter"] == parameter]
+    # e.g. PMin MW and PMax MW of RTPV point to the same column, which is
+    # read once; the pointers of an object to different data (or, with
+    # `normalize`, with different scaling factors) need a `parameter`
+    same = ["Object", "Data File"] + (["Scaling Factor"] if normalize else [])
+    pointers = pointers.drop_duplicates(subset=same)
+    ambiguous = pointers.loc[pointers["Object"].duplicated(), "Object"]
+    if len(ambiguous):
+        raise ValueError("the pointers of {} point to different data, "
+            "select one with `parameter`".format(", ".join(map(str,
+            ambiguous.unique()))))
+
+    frames = []
+    index = None
+    for data_file, group in pointers.groupby("Data File", sort=False):
+        try:
+            path = resolve_data_file(data_file, folder)
+        except FileNotFoundError:
+            if skip_missing:
+                continue
+            raise
+        columns, values = load_array(path)
+        t0, res, n, lo, hi = _locate(columns, values, simulation, start,
+            end, folder)
+        if "Period" in columns:
+            _check_regular(path, values, t0, res, lo, hi)
+
+        this_index = _calendar(t0, res, n)[lo:hi]
+        if index is None:
+            index = this_index
+        elif not index.equals(this_index):
+            raise ValueError("'{}' does not cover the same periods as the "
+                "other {} files".format(path, simulation))
+
+        components = list(group["Object"])
+        frames.append((components, _take(path, columns, values, components,
+            lo, hi), group["Scaling Factor"].to_numpy()))
+
+    if not frames:
+        return pd.DataFrame(index=index)
+
+    components = [c for f in frames for c in f[0]]
+    data = np.concatenate([f[1] for f in frames], axis=1)
+    if normalize:
+        scale = np.concatenate([f[2] for f in frames])
+        data = data / scale[None, :]
+
+    return pd.DataFrame(data, index=index, columns=components)